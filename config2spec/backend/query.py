@@ -36,6 +36,9 @@ class Query(object):
         elif self.type == PolicyType.LoadBalancingSimple:
             self.str_type = "loadbalancing"
             negate = False
+        elif self.type == PolicyType.LoadBalancingEdgeDisjoint:
+            self.str_type = "edgedisjointlb"
+            negate = False
         elif self.type == PolicyType.LoadBalancingNodeDisjoint:
             self.str_type = "nodedisjointlb"
             negate = False
@@ -56,7 +59,8 @@ class Query(object):
                 self.attributes["Waypoints"] = ",".join(self.specifics)
             else:
                 self.attributes["Waypoints"] = self.specifics
-        elif self.type == PolicyType.LoadBalancingSimple or self.type == PolicyType.LoadBalancingNodeDisjoint:
+        elif self.type in [PolicyType.LoadBalancingSimple, PolicyType.LoadBalancingEdgeDisjoint,
+                           PolicyType.LoadBalancingNodeDisjoint]:
             self.attributes["NumPaths"] = self.specifics
 
     def to_dict(self):
@@ -3,14 +3,20 @@
 
 import networkx as nx
 import os
-import re
 import sys
 from collections import defaultdict
 from ipaddress import IPv4Network
 
 from config2spec.utils.logger import get_logger
-from config2spec.dataplane.fecs import FECFinder
+from config2spec.dataplane.fecs import compute_fec_ranges
+from config2spec.dataplane.fecs import EquivalenceClass
 from config2spec.dataplane.fib import ForwardingTable
+from config2spec.dataplane.fib_parser import FIBParser
+from config2spec.dataplane.dominators import DominatorGraphs
+from config2spec.dataplane.dominators import immediate_dominators
+from config2spec.dataplane.forwarding_graphs import build_forwarding_graphs
+from config2spec.dataplane.forwarding_graphs import ForwardingGraphs
+from config2spec.dataplane.forwarding_graphs import VRFGraphs
 
 
 # Network topology that relies on Batfish for the dataplane computation and
@@ -18,7 +24,8 @@ from config2spec.dataplane.fib import ForwardingTable
 
 
 class BatfishEngine(object):
-    def __init__(self, nodes, next_hops, simple_acls, fib_path, debug=False):
+    def __init__(self, nodes, next_hops, simple_acls, fib_path, max_cached_edges=None, dataplane_cache=None,
+                 num_workers=1, debug=False):
         self.debug = debug
         self.logger = get_logger("BatfishEngine", "DEBUG" if debug else "INFO")
 
@@ -30,87 +37,188 @@ class BatfishEngine(object):
         self.forwarding_graphs = defaultdict(nx.DiGraph)
         self.dominator_graphs = defaultdict(nx.DiGraph)
 
+        # subnets whose forwarding graph changed with the last sample (None if all of them have to be considered)
+        self.changed_subnets = None
+
+        # the same for all VRFs at once, keyed by (vrf, prefix)
+        self.vrf_forwarding_graphs = None
+        self.vrf_dominator_graphs = None
+        self.vrf_changed_subnets = None
+
+        # node ids of the forwarding graphs, stable across samples to compare them
+        self.node_ids = dict()
+
+        # number of forwarding graphs per distinct forwarding graph of the last sample
+        self.dedup_ratio = 1.0
+
+        # bound on the total number of edges of the NetworkX graphs cached for the current sample (None: no bound).
+        # Only the graphs of the current sample are kept, the ones of previous samples are either reused or dropped.
+        self.max_cached_edges = max_cached_edges
+
         # path to the directory where batfish writes the FIBs to
         self.fib_path = fib_path
+        self.fib_parser = FIBParser(next_hops, debug=debug)
+
+        # persistent cache of parsed dataplanes (DataplaneCache), repeated samples skip the backend and the parsing
+        self.dataplane_cache = dataplane_cache
 
-    def get_forwarding_graphs(self, fib_file_name, vrf="default"):
+        # with more than one worker, the FECs and dominators are computed by a pool of worker processes
+        self.worker_pool = None
+        if num_workers > 1:
+            # imported here, as the parallel computation is optional and relies on newer multiprocessing features
+            from config2spec.dataplane.parallel import WorkerPool
+            self.worker_pool = WorkerPool(num_workers, debug=debug)
 
+    def get_forwarding_graphs(self, fib_file_name, vrf="default", failed_links=None):
+        """
+        :param failed_links: links that failed in this sample, if given, the parsed dataplane is added to the cache
+        """
         fib_file = os.path.join(self.fib_path, fib_file_name)
 
         self.logger.debug("Read FIBs from {fibs}.".format(fibs=fib_file))
 
-        fibs, fecs = self.read_fib_file(fib_file, vrf)
+        tables, prefixes = self.fib_parser.parse(fib_file, vrf)
+        if self.dataplane_cache is not None and failed_links is not None:
+            self.dataplane_cache.put(failed_links, tables, prefixes, vrf=vrf)
 
-        # build forwarding graphs from FIBS
-        self.forwarding_graphs = defaultdict(nx.DiGraph)
+        return self.build_graphs(tables, prefixes)
 
-        for fec in fecs:
-            prefix = fec.get_prefix()
+    def get_cached_forwarding_graphs(self, failed_links, vrf="default"):
+        """
+        :return: the forwarding graphs of the sample with these failed links if its dataplane is in the cache, else None
+        """
+        if self.dataplane_cache is None:
+            return None
 
-            if prefix in self.simple_acls:
-                blocked_edges = self.simple_acls[prefix]
-            else:
-                blocked_edges = None
+        dataplane = self.dataplane_cache.get(failed_links, vrf=vrf)
+        if dataplane is None:
+            return None
+
+        self.logger.debug("Took the FIBs from the dataplane cache.")
+        tables, prefixes = dataplane
+        return self.build_graphs(tables, prefixes)
+
+    def get_sample_graphs(self, failed_edges, ms_manager):
+        """
+        Computes the forwarding and dominator graphs of a sample. Repeated samples take the dataplane from the cache
+        instead of the backend.
+        :param failed_edges: links that are down in this sample
+        :param ms_manager: backend manager that computes the dataplane
+        :return: tuple of the sample id, the forwarding graphs, the dominator graphs and the subnets that changed
+        compared to the previous sample, or None if the backend could not compute the dataplane
+        """
+        forwarding_graphs = self.get_cached_forwarding_graphs(failed_edges)
+        if forwarding_graphs is None:
+            fib_file_name = ms_manager.get_dataplane(failed_edges)
+            if not fib_file_name:
+                return None
+            forwarding_graphs = self.get_forwarding_graphs(fib_file_name, failed_links=failed_edges)
 
-            fwd_graph = self.build_forwarding_graph(prefix, blocked_edges, fibs)
+        dominator_graphs = self.get_dominator_graphs()
 
-            if fwd_graph.edges:
-                self.forwarding_graphs[prefix] = fwd_graph
+        # the failed links identify the sample, such that a restored policy db knows which samples it has seen
+        sample = tuple(sorted(link.name for link in failed_edges))
+
+        return sample, forwarding_graphs, dominator_graphs, self.changed_subnets
+
+    def get_vrf_forwarding_graphs(self, fib_file_name, vrfs=None, failed_links=None):
+        """
+        Builds the forwarding graphs of several VRFs with a single pass over the FIB file.
+        :param vrfs: the VRFs to consider, all VRFs in the FIB file if None
+        :param failed_links: links that failed in this sample, if given, the parsed dataplanes are added to the cache
+        :return: VRFGraphs mapping (vrf, prefix) to the forwarding graph
+        """
+        fib_file = os.path.join(self.fib_path, fib_file_name)
+
+        self.logger.debug("Read FIBs of all VRFs from {fibs}.".format(fibs=fib_file))
+
+        dataplanes = self.fib_parser.parse_vrfs(fib_file, vrfs=vrfs)
+
+        vrf_forwarding_graphs = dict()
+        vrf_changed_subnets = set()
+        for vrf, (tables, prefixes) in dataplanes.items():
+            if self.dataplane_cache is not None and failed_links is not None:
+                self.dataplane_cache.put(failed_links, tables, prefixes, vrf=vrf)
+
+            previous = self.vrf_forwarding_graphs.vrf_graphs.get(vrf) if self.vrf_forwarding_graphs else None
+            forwarding_graphs, changed_subnets = self.create_forwarding_graphs(tables, prefixes, previous)
+            vrf_forwarding_graphs[vrf] = forwarding_graphs
+
+            # a VRF without a previous sample changed completely
+            if vrf_changed_subnets is not None and changed_subnets is not None:
+                vrf_changed_subnets.update((vrf, subnet) for subnet in changed_subnets)
             else:
-                self.logger.debug("No forwarding graph for {fec} - {prefix}".format(fec=fec, prefix=prefix))
+                vrf_changed_subnets = None
+
+        # the prefixes of VRFs that are gone since the previous sample changed as well
+        if vrf_changed_subnets is not None and self.vrf_forwarding_graphs:
+            for vrf, forwarding_graphs in self.vrf_forwarding_graphs.vrf_graphs.items():
+                if vrf not in dataplanes:
+                    vrf_changed_subnets.update((vrf, subnet) for subnet in forwarding_graphs)
+
+        self.vrf_forwarding_graphs = VRFGraphs(vrf_forwarding_graphs)
+        self.vrf_changed_subnets = vrf_changed_subnets
+
+        self.logger.debug("Built {num_graphs} forwarding graphs in {num_vrfs} VRFs.".format(
+            num_graphs=len(self.vrf_forwarding_graphs), num_vrfs=len(vrf_forwarding_graphs)))
+
+        return self.vrf_forwarding_graphs
+
+    def build_graphs(self, tables, prefixes):
+        forwarding_graphs, changed_subnets = self.create_forwarding_graphs(tables, prefixes, self.forwarding_graphs)
+
+        # only the graphs of FECs whose forwarding changed since the previous sample need to be rebuilt
+        self.changed_subnets = changed_subnets
+        self.forwarding_graphs = forwarding_graphs
 
         if self.debug:
             self.logger.debug(self.debug_output())
 
         return self.forwarding_graphs
 
+    def create_forwarding_graphs(self, tables, prefixes, previous=None):
+        """
+        :param previous: forwarding graphs of the previous sample
+        :return: ForwardingGraphs of all FECs, and the set of subnets whose forwarding graph changed compared to the
+        previous sample (None if there is no previous sample)
+        """
+        firsts, lasts = compute_fec_ranges(prefixes)
+
+        # build the forwarding graphs of all FECs at once from the FIBs
+        forwarding_graphs = build_forwarding_graphs(list(self.nodes), tables, firsts, lasts, self.simple_acls,
+                                                    node_ids=self.node_ids, max_cached_edges=self.max_cached_edges,
+                                                    worker_pool=self.worker_pool)
+
+        if isinstance(previous, ForwardingGraphs):
+            changed_subnets = forwarding_graphs.update_from(previous)
+        else:
+            changed_subnets = None
+
+        self.logger.debug("Built {num_graphs} forwarding graphs for {num_fecs} FECs, {num_changed} changed.".format(
+            num_graphs=len(forwarding_graphs), num_fecs=len(firsts),
+            num_changed="all" if changed_subnets is None else len(changed_subnets)))
+
+        return forwarding_graphs, changed_subnets
+
     def read_fib_file(self, fib_file, vrf="default"):
 
-        fec_finder = FECFinder()
-        fibs = defaultdict(ForwardingTable)
+        tables, prefixes = self.fib_parser.parse(fib_file, vrf)
 
-        with open(fib_file, "r") as infile:
-            router = "unknown"
-            current_vrf = "unknown"
-
-            for line in infile:
-                line = line.strip()
-
-                if line.startswith("# "):
-                    router_match = re.match("^# Router:([a-zA-Z0-9\-_&]+)$", line)
-                    router = router_match.group(1) if router_match else "unknown"
-
-                elif line.startswith("## "):
-                    vrf_match = re.match("^## VRF:([a-zA-Z0-9\-]+)$", line)
-                    current_vrf = vrf_match.group(1) if vrf_match else "unknown"
-
-                elif current_vrf == vrf:
-                    # only keep forwarding entries if they belong to the VRF under investigation
-                    raw_prefix, interface, route_type = line.split(';')
-
-                    # keep track of all prefixes to later compute all forwarding equivalence classes
-                    prefix = IPv4Network(raw_prefix)
-                    fec_finder.insert_prefix(prefix)
-
-                    # set next hop as sink if it is a directly connected route
-                    if route_type == "ConnectedRoute":
-                        next_hop = "sink"
-                    # don't do anything if route points to the null interface (blackholed)
-                    elif interface == "null_interface":
-                        continue
-                    elif router in self.next_hops and interface in self.next_hops[router]:
-                        next_hop = self.next_hops[router][interface]
-                    else:
-                        self.logger.error("Prefix: {prefix} - Unknown interface {intf} or "
-                                          "router {router}.".format(prefix=prefix, intf=interface, router=router))
-                        next_hop = "external"
-                        # sys.exit(1)
-
-                    # add entry to forwarding table
-                    fibs[router].add_entry(prefix, interface, route_type, next_hop)
+        # every distinct prefix is only turned into an IPv4Network once
+        networks = {(address, prefixlen): IPv4Network((address, prefixlen)) for address, prefixlen in prefixes.tolist()}
+
+        fibs = defaultdict(ForwardingTable)
+        for router, table in tables.items():
+            fib = fibs[router]
+            for address, prefixlen, interface, route_type, next_hop in table.entries():
+                fib.add_entry(networks[(address, prefixlen)], interface, route_type, next_hop)
 
         # get all forwarding equivalence classes
-        fecs = fec_finder.get_all_fecs()
+        fecs = list()
+        for first, last in zip(*[addresses.tolist() for addresses in compute_fec_ranges(prefixes)]):
+            fec = EquivalenceClass()
+            fec.add_range(first, last)
+            fecs.append(fec)
 
         return fibs, fecs
 
@@ -151,24 +259,116 @@ class BatfishEngine(object):
     def get_dominator_graphs(self):
         assert self.forwarding_graphs, "Forwarding Graph needs to be built before the Dominator Graphs"
 
-        for subnet, forwarding_graph in self.forwarding_graphs.items():
-            rev_graph = forwarding_graph.reverse(copy=True)
+        # forwarding graphs that were not built from FIBs are brought into CSR format first
+        forwarding_graphs = self.forwarding_graphs
+        if not isinstance(forwarding_graphs, ForwardingGraphs):
+            forwarding_graphs = ForwardingGraphs.from_graphs(forwarding_graphs, self.node_ids)
 
-            try:
-                dominators = set(nx.immediate_dominators(rev_graph, 'sink').items())
-            except nx.NetworkXError as e:
-                self.logger.error("Sink node is not in the forwarding graph for {subnet}. "
-                                  "Official error message: {error}".format(subnet=subnet, error=e))
-                # sys.exit(1)
+        self.dominator_graphs = self.create_dominator_graphs(forwarding_graphs, self.dominator_graphs)
+        return self.dominator_graphs
+
+    def get_vrf_dominator_graphs(self):
+        """
+        :return: VRFGraphs mapping (vrf, prefix) to the dominator graph, for the VRFs of get_vrf_forwarding_graphs()
+        """
+        assert self.vrf_forwarding_graphs, "Forwarding Graph needs to be built before the Dominator Graphs"
+
+        previous = self.vrf_dominator_graphs
+        self.vrf_dominator_graphs = VRFGraphs({
+            vrf: self.create_dominator_graphs(forwarding_graphs, previous.vrf_graphs.get(vrf) if previous else None)
+            for vrf, forwarding_graphs in self.vrf_forwarding_graphs.vrf_graphs.items()})
+        return self.vrf_dominator_graphs
+
+    def create_dominator_graphs(self, forwarding_graphs, previous=None):
+        """
+        :param forwarding_graphs: ForwardingGraphs
+        :param previous: dominator graphs of the previous sample
+        :return: DominatorGraphs of all forwarding graphs that contain the sink
+        """
+        sink = self.node_ids["sink"]
+
+        # identical forwarding graphs have the same dominators, hence they are only computed once per distinct graph.
+        # The fingerprints are stable across samples, such that the dominators of graphs that already existed in the
+        # previous sample are taken over.
+        if not isinstance(previous, DominatorGraphs):
+            previous = None
+        fingerprints = dict()
+        parents = dict()
+        graph_ids = list()
+        new_fingerprints = list()
+        for subnet in forwarding_graphs:
+            fingerprint = fingerprints[subnet] = forwarding_graphs.get_fingerprint(subnet)
+            if fingerprint in parents:
+                continue
+            elif previous and fingerprint in previous.parents:
+                parents[fingerprint] = previous.parents[fingerprint]
+            else:
+                parents[fingerprint] = None
+                graph_ids.append(forwarding_graphs.index[subnet])
+                new_fingerprints.append((subnet, fingerprint))
+
+        # compute the dominators of all new forwarding graphs at once
+        if self.worker_pool is not None:
+            new_parents = self.worker_pool.immediate_dominators(forwarding_graphs.graph_ptr, forwarding_graphs.srcs,
+                                                                forwarding_graphs.dsts, graph_ids,
+                                                                len(forwarding_graphs.nodes), sink)
+        else:
+            new_parents = immediate_dominators(forwarding_graphs.graph_ptr, forwarding_graphs.srcs,
+                                               forwarding_graphs.dsts, graph_ids, len(forwarding_graphs.nodes), sink)
+        for (subnet, fingerprint), subnet_parents in zip(new_fingerprints, new_parents):
+            parents[fingerprint] = subnet_parents
+            if subnet_parents[sink] < 0:
+                self.logger.error("Sink node is not in the forwarding graph for {subnet}.".format(subnet=subnet))
+
+        # subnets whose forwarding graph does not contain the sink have no dominator graph
+        fingerprints = {subnet: fingerprint for subnet, fingerprint in fingerprints.items()
+                        if parents[fingerprint][sink] >= 0}
+
+        dominator_graphs = DominatorGraphs(forwarding_graphs.nodes, sink, fingerprints, parents,
+                                           max_cached_edges=self.max_cached_edges)
+        if previous:
+            dominator_graphs.graphs.take_over(previous.graphs, parents)
+
+        if parents:
+            self.dedup_ratio = len(forwarding_graphs) / len(parents)
+        self.logger.debug("{num_graphs} forwarding graphs, {num_classes} distinct ones (dedup ratio {ratio:.2f}), "
+                          "computed the dominators of {num_new}.".format(
+                            num_graphs=len(forwarding_graphs), num_classes=len(parents), ratio=self.dedup_ratio,
+                            num_new=len(graph_ids)))
+
+        return dominator_graphs
+
+    def get_memory_usage(self):
+        """
+        :return: dict with the memory usage of the forwarding and the dominator graphs of the current sample
+        """
+        memory_usage = dict()
+        for name, graphs in [("forwarding_graphs", self.forwarding_graphs), ("dominator_graphs", self.dominator_graphs)]:
+            if isinstance(graphs, (ForwardingGraphs, DominatorGraphs)):
+                memory_usage[name] = graphs.get_memory_usage()
             else:
+                memory_usage[name] = {"array_bytes": 0, "cached_graphs": len(graphs),
+                                      "cached_edges": sum(graph.number_of_edges() for graph in graphs.values())}
+        return memory_usage
 
-                if ("sink", "sink") in dominators:
-                    dominators.remove(("sink", "sink"))
+    def clear(self):
+        """
+        Drops all graphs, e.g., in between runs on different networks.
+        """
+        self.forwarding_graphs = defaultdict(nx.DiGraph)
+        self.dominator_graphs = defaultdict(nx.DiGraph)
+        self.changed_subnets = None
 
-                tmp_dominator_graph = nx.DiGraph(list(dominators))
-                self.dominator_graphs[subnet] = tmp_dominator_graph
+        self.vrf_forwarding_graphs = None
+        self.vrf_dominator_graphs = None
+        self.vrf_changed_subnets = None
 
-        return self.dominator_graphs
+    def close(self):
+        """
+        Stops the worker processes.
+        """
+        if self.worker_pool is not None:
+            self.worker_pool.close()
 
     def debug_output(self):
         output = '\n'
@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# Author: Ruediger Birkner (Networked Systems Group at ETH Zurich)
+
+import hashlib
+import os
+import zipfile
+
+import numpy as np
+
+from config2spec.dataplane.fib_parser import ArrayForwardingTable
+from config2spec.utils.logger import get_logger
+
+
+def hash_configs(config_path):
+    """
+    :return: hash over the names and contents of all config files in the directory
+    """
+    config_hash = hashlib.sha256()
+    for file_name in sorted(os.listdir(config_path)):
+        file_path = os.path.join(config_path, file_name)
+        if os.path.isfile(file_path):
+            config_hash.update(file_name.encode("utf-8"))
+            with open(file_path, "rb") as infile:
+                config_hash.update(hashlib.sha256(infile.read()).digest())
+    return config_hash.hexdigest()
+
+
+def encode_strings(strings):
+    """
+    :return: array of the distinct strings and the id of each string in it
+    """
+    names, ids = np.unique(np.array(strings, dtype=np.str_), return_inverse=True)
+    return names, ids.astype(np.int32)
+
+
+class DataplaneCache(object):
+    """
+    Persistent cache of parsed dataplanes, such that repeated samples neither need the backend to compute the dataplane
+    nor the FIB file to be parsed again. An entry holds the parsed forwarding tables and prefixes of a single VRF and it
+    is identified by the hash of the configs, the set of failed links and the VRF. The least recently used entries are
+    evicted once the cache exceeds its size.
+    """
+    def __init__(self, cache_path, config_hash, max_size=1 << 30, debug=False):
+        self.debug = debug
+        self.logger = get_logger("DataplaneCache", "DEBUG" if debug else "INFO")
+
+        self.cache_path = cache_path
+        os.makedirs(cache_path, exist_ok=True)
+
+        self.config_hash = config_hash
+        self.max_size = max_size  # in bytes
+
+        # statistics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_key(self, failed_links, vrf="default"):
+        # the links are identified by their endpoints, as their names depend on the order in which they were created
+        failed_edges = sorted("{}-{}".format(*sorted(link.edge)) for link in failed_links) if failed_links else list()
+        key = "{config_hash};{failed_edges};{vrf}".format(
+            config_hash=self.config_hash, failed_edges=",".join(failed_edges), vrf=vrf)
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def get_file_path(self, key):
+        return os.path.join(self.cache_path, "{key}.npz".format(key=key))
+
+    def get(self, failed_links, vrf="default"):
+        """
+        :return: dict mapping router to ArrayForwardingTable and the array of all prefixes, as returned by
+        FIBParser.parse(), or None if the dataplane is not in the cache
+        """
+        file_path = self.get_file_path(self.get_key(failed_links, vrf=vrf))
+
+        try:
+            with np.load(file_path) as data:
+                arrays = {name: data[name] for name in data.files}
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile) as e:
+            # a damaged entry (e.g., truncated) is dropped, such that it is replaced by the next put()
+            if os.path.exists(file_path):
+                self.logger.error("Failed to read cached dataplane {file}: {error}".format(file=file_path, error=e))
+                try:
+                    os.remove(file_path)
+                except OSError:
+                    pass
+            self.misses += 1
+            return None
+
+        # mark the entry as recently used
+        os.utime(file_path)
+        self.hits += 1
+
+        interfaces = arrays["interface_names"][arrays["interface_ids"]].tolist()
+        route_types = arrays["route_type_names"][arrays["route_type_ids"]].tolist()
+        next_hops = arrays["next_hop_names"][arrays["next_hop_ids"]].tolist()
+
+        tables = dict()
+        router_ptr = arrays["router_ptr"].tolist()
+        for i, router in enumerate(arrays["routers"].tolist()):
+            start, end = router_ptr[i], router_ptr[i + 1]
+            tables[router] = ArrayForwardingTable(arrays["addresses"][start:end], arrays["prefixlens"][start:end],
+                                                  interfaces[start:end], route_types[start:end],
+                                                  next_hops[start:end])
+
+        return tables, arrays["prefixes"]
+
+    def put(self, failed_links, tables, prefixes, vrf="default"):
+        """
+        Stores the parsed dataplane (see get()) and evicts the least recently used entries if the cache is too large.
+        """
+        file_path = self.get_file_path(self.get_key(failed_links, vrf=vrf))
+
+        routers = list(tables.keys())
+        router_ptr = np.cumsum([0] + [len(tables[router]) for router in routers])
+
+        def concatenate(column):
+            return [value for router in routers for value in getattr(tables[router], column)]
+
+        interface_names, interface_ids = encode_strings(concatenate("interfaces"))
+        route_type_names, route_type_ids = encode_strings(concatenate("route_types"))
+        next_hop_names, next_hop_ids = encode_strings(concatenate("next_hops"))
+
+        tmp_path = "{}.tmp".format(file_path)
+        with open(tmp_path, "wb") as outfile:
+            np.savez_compressed(outfile,
+                                routers=np.array(routers, dtype=np.str_),
+                                router_ptr=router_ptr,
+                                addresses=np.array(concatenate("addresses"), dtype=np.int64),
+                                prefixlens=np.array(concatenate("prefixlens"), dtype=np.int8),
+                                interface_names=interface_names,
+                                interface_ids=interface_ids,
+                                route_type_names=route_type_names,
+                                route_type_ids=route_type_ids,
+                                next_hop_names=next_hop_names,
+                                next_hop_ids=next_hop_ids,
+                                prefixes=prefixes)
+        os.replace(tmp_path, file_path)
+
+        self.evict(keep=os.path.basename(file_path))
+
+    def evict(self, keep=None):
+        """
+        Removes the least recently used entries until the cache fits into its size.
+        :param keep: file name of an entry which is never removed (e.g., the one just added)
+        """
+        entries = list()
+        total_size = 0
+        for file_name in os.listdir(self.cache_path):
+            if file_name.endswith(".npz"):
+                stat = os.stat(os.path.join(self.cache_path, file_name))
+                total_size += stat.st_size
+                if file_name != keep:
+                    entries.append((stat.st_mtime, stat.st_size, file_name))
+
+        entries.sort()
+        for _, size, file_name in entries:
+            if total_size <= self.max_size:
+                break
+            os.remove(os.path.join(self.cache_path, file_name))
+            total_size -= size
+            self.evictions += 1
+
+    def get_statistics(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
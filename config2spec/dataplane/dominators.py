@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+# Author: Ruediger Birkner (Networked Systems Group at ETH Zurich)
+
+from collections.abc import Mapping
+
+import networkx as nx
+import numpy as np
+
+from config2spec.dataplane.graph_cache import GraphCache
+
+
+def immediate_dominators(graph_ptr, srcs, dsts, graph_ids, num_nodes, root):
+    """
+    Computes the immediate dominators of the reverse of forwarding graphs in CSR format (see ForwardingGraphs) with the
+    iterative algorithm of Cooper, Harvey and Kennedy. In the reverse graph, the predecessors of a node are its next
+    hops, hence they are directly given by the CSR rows.
+    :param graph_ptr: array of the first edge of each graph
+    :param srcs: array of the source node ids of all edges, sorted by source within each graph
+    :param dsts: array of the destination node ids of all edges
+    :param graph_ids: ids of the graphs to compute the dominators for
+    :param num_nodes: number of node ids
+    :param root: node id of the root of the reverse graphs (i.e., the sink)
+    :return: array with a row of parents per graph: the immediate dominator of each node, -1 for nodes that cannot
+    reach the root. The root is its own parent, unless it is not part of the graph at all.
+    """
+    graph_ptr = graph_ptr.tolist()
+    parents = np.full((len(graph_ids), num_nodes), -1, dtype=np.int64)
+
+    for row, graph_id in enumerate(graph_ids):
+        start, end = graph_ptr[graph_id], graph_ptr[graph_id + 1]
+        graph_srcs = srcs[start:end].tolist()
+        graph_dsts = dsts[start:end].tolist()
+
+        # next hops (predecessors in the reverse graph) and previous hops (successors in the reverse graph)
+        next_hops = dict()
+        previous_hops = dict()
+        for src, dst in zip(graph_srcs, graph_dsts):
+            next_hops.setdefault(src, list()).append(dst)
+            previous_hops.setdefault(dst, list()).append(src)
+
+        if root not in previous_hops:
+            continue
+
+        # postorder of a depth-first search from the root in the reverse graph
+        postorder = list()
+        order = dict()
+        visited = {root}
+        stack = [(root, iter(previous_hops[root]))]
+        while stack:
+            node, children = stack[-1]
+            for child in children:
+                if child not in visited:
+                    visited.add(child)
+                    stack.append((child, iter(previous_hops.get(child, list()))))
+                    break
+            else:
+                stack.pop()
+                order[node] = len(postorder)
+                postorder.append(node)
+
+        idom = {root: root}
+        changed = True
+        while changed:
+            changed = False
+            # reverse postorder without the root
+            for node in reversed(postorder[:-1]):
+                new_idom = None
+                for next_hop in next_hops[node]:
+                    if next_hop not in idom:
+                        continue
+                    if new_idom is None:
+                        new_idom = next_hop
+                        continue
+
+                    # walk up the dominator tree until both fingers meet
+                    finger1, finger2 = next_hop, new_idom
+                    while finger1 != finger2:
+                        while order[finger1] < order[finger2]:
+                            finger1 = idom[finger1]
+                        while order[finger2] < order[finger1]:
+                            finger2 = idom[finger2]
+                    new_idom = finger1
+
+                if idom.get(node) != new_idom:
+                    idom[node] = new_idom
+                    changed = True
+
+        parents[row, list(idom.keys())] = list(idom.values())
+
+    return parents
+
+
+class DominatorGraphs(Mapping):
+    """
+    Dominator graphs of all FECs of a sample stored as parent arrays, one per distinct forwarding graph. It maps the
+    prefix of each FEC to its dominator graph, in which every node has an edge to its immediate dominator. The NetworkX
+    graphs are only built once they are accessed.
+    """
+    def __init__(self, nodes, root, fingerprints, parents, max_cached_edges=None):
+        self.nodes = nodes  # node id -> name
+        self.root = root
+
+        self.fingerprints = fingerprints  # prefix -> fingerprint of its forwarding graph
+        self.parents = parents  # fingerprint -> array of the immediate dominator of each node id
+
+        # NetworkX graphs that have already been built per fingerprint
+        self.graphs = GraphCache(max_edges=max_cached_edges)
+
+    def __getitem__(self, prefix):
+        fingerprint = self.fingerprints[prefix]
+        graph = self.graphs.get(fingerprint)
+        if graph is None:
+            graph = self.build_graph(self.parents[fingerprint])
+            self.graphs.put(fingerprint, graph)
+        return graph
+
+    def __contains__(self, prefix):
+        return prefix in self.fingerprints
+
+    def __iter__(self):
+        return iter(self.fingerprints)
+
+    def __len__(self):
+        return len(self.fingerprints)
+
+    def get_parents(self, prefix):
+        return self.parents[self.fingerprints[prefix]]
+
+    def get_memory_usage(self):
+        """
+        :return: dict with the bytes used by the arrays, and the number of cached NetworkX graphs and their edges
+        """
+        return {
+            "array_bytes": sum(parents.nbytes for parents in self.parents.values()),
+            "cached_graphs": len(self.graphs),
+            "cached_edges": self.graphs.num_edges,
+        }
+
+    def build_graph(self, parents):
+        nodes = np.flatnonzero(parents >= 0)
+        nodes = nodes[nodes != self.root]
+        return nx.DiGraph([(self.nodes[node], self.nodes[parent])
+                           for node, parent in zip(nodes.tolist(), parents[nodes].tolist())])
+
+
+class DominatorTree(object):
+    """
+    Dominator tree indexed by an Euler tour: order lists the nodes in preorder, and the subtree of a node, i.e., all
+    nodes it dominates, is the range order[entry[node]:exit[node]]. Hence, whether a node dominates another one, and
+    all nodes dominated by a node, are range queries.
+    """
+    def __init__(self, children, root="sink"):
+        """
+        :param children: dict mapping each node to the nodes it immediately dominates
+        """
+        self.root = root
+
+        self.order = list()
+        self.entry = dict()
+        self.exit = dict()
+
+        # iterative depth-first search, the exit time is set once all descendants are in the order
+        stack = [(root, iter(children.get(root, list())))]
+        self.entry[root] = 0
+        self.order.append(root)
+        while stack:
+            node, node_children = stack[-1]
+            for child in node_children:
+                self.entry[child] = len(self.order)
+                self.order.append(child)
+                stack.append((child, iter(children.get(child, list()))))
+                break
+            else:
+                stack.pop()
+                self.exit[node] = len(self.order)
+
+    @classmethod
+    def from_graph(cls, graph, root="sink"):
+        """
+        :param graph: NetworkX dominator graph, in which every node has an edge to its immediate dominator
+        """
+        children = dict()
+        for node, parent in graph.edges():
+            children.setdefault(parent, list()).append(node)
+        return cls(children, root=root)
+
+    def __contains__(self, node):
+        return node in self.entry
+
+    def __len__(self):
+        return len(self.order)
+
+    def dominates(self, dominator, node):
+        return self.entry[dominator] <= self.entry[node] < self.exit[dominator]
+
+    def get_dominated(self, node):
+        """
+        :return: all nodes that are strictly dominated by the node
+        """
+        return self.order[self.entry[node] + 1:self.exit[node]]
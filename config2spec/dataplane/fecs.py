@@ -6,20 +6,61 @@ import struct
 from ipaddress import IPv4Network
 from ipaddress import IPv4Address
 
+import numpy as np
+
 from config2spec.utils.logger import get_logger
 
 
-class TrieNode(object):
-    def __init__(self, bitstring):
-        super(TrieNode, self).__init__()
-        self.children = dict()
-        self.bitstring = bitstring
-        self.is_rule = False
+# largest IPv4 address
+MAX_ADDRESS = 2 ** 32 - 1
+
+
+def compute_fec_ranges(prefixes):
+    """
+    Computes all forwarding equivalence classes (FECs) of a set of prefixes with a sweep over the sorted prefix
+    boundaries. A FEC is a maximal continuous range of addresses that share the same longest matching prefix,
+    addresses that are not covered by any prefix are not part of a FEC.
+    :param prefixes: (n, 2) array-like of (network address, prefix length) rows
+    :return: arrays with the first and the last address of every FEC in ascending order
+    """
+    prefixes = np.asarray(prefixes, dtype=np.int64).reshape(-1, 2)
+    if len(prefixes) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    # remove duplicates and sort by address and prefix length in one go
+    keys = np.unique((prefixes[:, 0] << 6) | prefixes[:, 1])
+    addresses = keys >> 6
+    lengths = keys & 63
+    lasts = addresses + np.left_shift(1, 32 - lengths) - 1
+
+    # the boundaries split the address space into segments that are covered by exactly the same prefixes
+    starts = np.unique(np.concatenate([addresses, lasts + 1]))
+    starts = starts[starts <= MAX_ADDRESS]
+    ends = np.append(starts[1:] - 1, MAX_ADDRESS)
+
+    # longest matching prefix of every segment, going from short to long prefixes. The prefixes are sorted by
+    # address, hence also the addresses of a single prefix length.
+    owners = np.full(len(starts), -1, dtype=np.int64)
+    for length in np.unique(lengths).tolist():
+        indexes = np.flatnonzero(lengths == length)
+        networks = addresses[indexes]
+
+        masked_starts = starts & (MAX_ADDRESS ^ ((1 << (32 - length)) - 1))
+        positions = np.minimum(np.searchsorted(networks, masked_starts), len(networks) - 1)
+        matches = networks[positions] == masked_starts
+        owners[matches] = indexes[positions[matches]]
+
+    # merge neighboring segments with the same longest matching prefix and drop the uncovered ones
+    first_segments = np.flatnonzero(np.append(True, owners[1:] != owners[:-1]))
+    last_segments = np.append(first_segments[1:] - 1, len(starts) - 1)
+    covered = owners[first_segments] >= 0
+
+    return starts[first_segments[covered]], ends[last_segments[covered]]
 
 
 class FECFinder(object):
     """
-    Builds a trie with all supplied rule prefixes and provides all continuous equivalence classes.
+    Collects all rule prefixes and provides all continuous equivalence classes.
     """
     def __init__(self):
         super(FECFinder, self).__init__()
@@ -27,105 +68,43 @@ class FECFinder(object):
         # initialize logging
         self.logger = get_logger('FECFinder', 'INFO')
 
-        # init Trie
-        self.root = TrieNode('')
         self.max_depth = 32
 
+        # all prefixes as (network address, prefix length)
         self.prefixes = set()
 
     def insert_prefix(self, prefix):
         """
-        Inserts an IPv4 prefix into the trie
+        Inserts an IPv4 prefix
         :param prefix:IPv4 prefix in the form '192.168.1.0/24'
         :return:
         """
 
         assert isinstance(prefix, IPv4Network)
 
-        if prefix not in self.prefixes:
-            self.prefixes.add(prefix)
-
-            bitstring, length = self.ipv4_to_bitstring(prefix)
-
-            current_node = self.root
-            for i in range(0, length):
-                current_bit = bitstring[i]
-                if current_bit in current_node.children:
-                    current_node = current_node.children[current_bit]
-                else:
-                    current_node.children[current_bit] = TrieNode(bitstring[0:i+1])
-                    current_node = current_node.children[current_bit]
-
-            current_node.is_rule = True
+        self.prefixes.add((int(prefix.network_address), prefix.prefixlen))
 
     def get_all_prefixes(self):
         """
-        :return:a list of all rule prefixes currently in the trie
+        :return:a list of all rule prefixes
         """
-        rules = list()
-
-        stack = [self.root]
-        while stack:
-            node = stack.pop()
-
-            if node.is_rule:
-                prefix = self.bitstring_to_ipv4(node.bitstring)
-                rules.append(prefix)
+        return [IPv4Network((address, length)) for address, length in self.prefixes]
 
-            for child in node.children.values():
-                stack.append(child)
-
-        return rules
+    def get_fec_ranges(self):
+        """
+        :return: arrays with the first and the last address of all equivalence classes
+        """
+        return compute_fec_ranges(list(self.prefixes))
 
     def get_all_fecs(self):
         """
-        :return:returns a list of all equivalence classes currently in the trie
+        :return:returns a list of all equivalence classes
         """
         fecs = list()
-
-        current_fec = 0
-        last_fec = 0
-
-        stack = [(self.root, 0, False)]
-
-        while stack:
-            item = stack.pop()
-
-            if isinstance(item[0], TrieNode):
-                node, fec, active = item
-
-                # only nodes that are a rule can have no children
-                if not node.is_rule and not node.children:
-                    self.logger.error('get_all_ecs: "no rule" node without children')
-                    continue
-
-                if node.is_rule:
-                    last_fec += 1
-                    fec = last_fec
-                    active = True
-
-                if node.children:
-                    bits = ['0', '1']
-                    for bit in bits:
-                        if bit in node.children:
-                            child = node.children[bit]
-                            stack.append((child, fec, active))
-                        elif active:
-                            bitstring = node.bitstring + bit
-                            stack.append((bitstring, fec, None))
-                else:
-                    current_fec = fec
-                    tmp_fec = EquivalenceClass()
-                    tmp_fec.add_bitstring(node.bitstring)
-                    fecs.append(tmp_fec)
-
-            else:
-                prefix, fec, _ = item
-                if not fecs or fec != current_fec:
-                    current_fec = fec
-                    fecs.append(EquivalenceClass())
-
-                fecs[-1].add_bitstring(prefix)
+        for first, last in zip(*[addresses.tolist() for addresses in self.get_fec_ranges()]):
+            fec = EquivalenceClass()
+            fec.add_range(first, last)
+            fecs.append(fec)
 
         return fecs
 
@@ -149,19 +128,19 @@ class EquivalenceClass(object):
     """
     An equivalence class is a continuous range of ip address which are handled the same way
     """
+    # one instance per FEC and sample, hence no per-instance dict or logger
+    __slots__ = ("first", "last", "current")
+
+    # maximum number of bits in an address
+    max_length = 32
+
     def __init__(self):
         super(EquivalenceClass, self).__init__()
 
-        # initialize logging
-        self.logger = get_logger('EquivalenceClass', 'INFO')
-
         # first and last address of the equivalence class
         self.first = None
         self.last = None
 
-        # maximum number of bits in an address
-        self.max_length = 32
-
         # needed for the iterator to keep track of the current ip address
         self.current = 0
 
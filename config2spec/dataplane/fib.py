@@ -4,19 +4,17 @@
 from ipaddress import IPv4Network
 from pytricia import PyTricia
 
-from config2spec.utils.logger import get_logger
-
 
 class ForwardingTable(object):
     """
     Builds a trie with all supplied rule prefixes and provides all continuous equivalence classes.
     """
+    # one table per router and sample, hence no per-instance dict or logger
+    __slots__ = ("fib",)
+
     def __init__(self):
         super(ForwardingTable, self).__init__()
 
-        # initialize logging
-        self.logger = get_logger('FECFinder', 'INFO')
-
         # init Trie
         self.fib = PyTricia()
 
@@ -55,6 +53,8 @@ class ForwardingTable(object):
 
 
 class ForwardingTableEntry(object):
+    __slots__ = ("prefix", "interface", "route_type", "next_hop")
+
     def __init__(self, prefix, interface, route_type, next_hop):
         self.prefix = prefix
         self.interface = interface
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+# Author: Ruediger Birkner (Networked Systems Group at ETH Zurich)
+
+import re
+
+import numpy as np
+
+from config2spec.utils.logger import get_logger
+
+
+# header lines of the FIB files written by Batfish
+ROUTER_LINE = re.compile(r"^# (.*)$", re.MULTILINE)
+VRF_LINE = re.compile(r"^## (.*)$", re.MULTILINE)
+ROUTER_NAME = re.compile(r"Router:([a-zA-Z0-9\-_&]+)")
+VRF_NAME = re.compile(r"VRF:([a-zA-Z0-9\-]+)")
+
+
+def parse_prefix(raw_prefix):
+    """
+    :param raw_prefix: prefix in the form '192.168.1.0/24'
+    :return: tuple of the network address as int and the prefix length
+    """
+    address, prefixlen = raw_prefix.split("/")
+    a, b, c, d = address.split(".")
+    prefixlen = int(prefixlen)
+    mask = (0xFFFFFFFF << (32 - prefixlen)) & 0xFFFFFFFF
+    return ((int(a) << 24) | (int(b) << 16) | (int(c) << 8) | int(d)) & mask, prefixlen
+
+
+class ArrayForwardingTable(object):
+    """
+    Forwarding table of a single router in array form: entry i forwards the prefix addresses[i]/prefixlens[i] out of
+    interfaces[i] to next_hops[i]. Blackholed prefixes are not part of the table.
+    """
+    def __init__(self, addresses, prefixlens, interfaces, route_types, next_hops):
+        self.addresses = np.array(addresses, dtype=np.int64)
+        self.prefixlens = np.array(prefixlens, dtype=np.int8)
+        self.interfaces = interfaces
+        self.route_types = route_types
+        self.next_hops = next_hops
+
+    def __len__(self):
+        return len(self.next_hops)
+
+    def entries(self):
+        return zip(self.addresses.tolist(), self.prefixlens.tolist(), self.interfaces, self.route_types,
+                   self.next_hops)
+
+
+class FIBParser(object):
+    """
+    Parses the FIB files written by Batfish in bulk. The prefixes are kept as integer (address, prefix length) pairs
+    and each distinct prefix string is only parsed once, even across files.
+    """
+    def __init__(self, next_hops, debug=False):
+        self.debug = debug
+        self.logger = get_logger("FIBParser", "DEBUG" if debug else "INFO")
+
+        # mapping of router and interface to the next hop router
+        self.next_hops = next_hops
+
+        # raw prefix string -> (address, prefix length)
+        self.prefix_cache = dict()
+
+    def parse(self, fib_file, vrf="default"):
+        """
+        :param fib_file: path to the FIB file
+        :param vrf: only entries of this VRF are parsed
+        :return: dict mapping router to ArrayForwardingTable, and an (n, 2) array of all distinct prefixes as
+        (address, prefix length) rows - including the blackholed ones
+        """
+        dataplanes = self.parse_vrfs(fib_file, vrfs=[vrf])
+        if vrf in dataplanes:
+            return dataplanes[vrf]
+        return dict(), np.zeros((0, 2), dtype=np.int64)
+
+    def parse_vrfs(self, fib_file, vrfs=None):
+        """
+        Parses the entries of several VRFs with a single pass over the FIB file.
+        :param fib_file: path to the FIB file
+        :param vrfs: only entries of these VRFs are parsed, all VRFs if None
+        :return: dict mapping each VRF found in the file to its tables and prefixes (see parse())
+        """
+        with open(fib_file, "r") as infile:
+            text = infile.read()
+
+        vrf_tables = dict()
+        vrf_prefixes = dict()
+
+        # the split alternates between router headers and their content: [preamble, header, content, header, ...]
+        router_sections = ROUTER_LINE.split(text)
+        for i in range(1, len(router_sections), 2):
+            router_match = ROUTER_NAME.fullmatch(router_sections[i].strip())
+            router = router_match.group(1) if router_match else "unknown"
+
+            vrf_sections = VRF_LINE.split(router_sections[i + 1])
+            for j in range(1, len(vrf_sections), 2):
+                vrf_match = VRF_NAME.fullmatch(vrf_sections[j].strip())
+                if not vrf_match:
+                    continue
+
+                vrf = vrf_match.group(1)
+                if vrfs is None or vrf in vrfs:
+                    if vrf not in vrf_tables:
+                        vrf_tables[vrf] = dict()
+                        vrf_prefixes[vrf] = set()
+                    self.parse_entries(router, vrf_sections[j + 1], vrf_tables[vrf], vrf_prefixes[vrf])
+
+        dataplanes = dict()
+        for vrf, tables in vrf_tables.items():
+            prefix_array = np.array(sorted(vrf_prefixes[vrf]), dtype=np.int64).reshape(-1, 2)
+            tables = {router: ArrayForwardingTable(*columns) for router, columns in tables.items()}
+            dataplanes[vrf] = (tables, prefix_array)
+
+        return dataplanes
+
+    def parse_entries(self, router, entries, tables, prefixes):
+        prefix_cache = self.prefix_cache
+        router_next_hops = self.next_hops[router] if router in self.next_hops else dict()
+
+        if router not in tables:
+            tables[router] = (list(), list(), list(), list(), list())
+        addresses, prefixlens, interfaces, route_types, next_hops = tables[router]
+
+        for line in entries.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+
+            raw_prefix, interface, route_type = line.split(";")
+
+            # keep track of all prefixes to later compute all forwarding equivalence classes
+            prefix = prefix_cache.get(raw_prefix)
+            if prefix is None:
+                prefix = prefix_cache[raw_prefix] = parse_prefix(raw_prefix)
+            prefixes.add(prefix)
+
+            # set next hop as sink if it is a directly connected route
+            if route_type == "ConnectedRoute":
+                next_hop = "sink"
+            # don't do anything if route points to the null interface (blackholed)
+            elif interface == "null_interface":
+                continue
+            elif interface in router_next_hops:
+                next_hop = router_next_hops[interface]
+            else:
+                self.logger.error("Prefix: {prefix} - Unknown interface {intf} or router {router}.".format(
+                    prefix=raw_prefix, intf=interface, router=router))
+                next_hop = "external"
+
+            addresses.append(prefix[0])
+            prefixlens.append(prefix[1])
+            interfaces.append(interface)
+            route_types.append(route_type)
+            next_hops.append(next_hop)
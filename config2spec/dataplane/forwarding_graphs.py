@@ -0,0 +1,397 @@
+#!/usr/bin/env python
+# Author: Ruediger Birkner (Networked Systems Group at ETH Zurich)
+
+from collections import defaultdict
+from collections.abc import Mapping
+from ipaddress import IPv4Network
+
+import networkx as nx
+import numpy as np
+
+from config2spec.dataplane.graph_cache import GraphCache
+
+
+def get_fec_prefix(first, last):
+    """
+    :return: the largest prefix that starts at the first address of the FEC and lies within it, the same as
+    EquivalenceClass.get_prefix()
+    """
+    alignment = (first & -first).bit_length() - 1 if first else 32
+    size = (last - first + 1).bit_length() - 1
+    return IPv4Network((first, 32 - min(alignment, size)))
+
+
+def longest_prefix_match(table_addresses, table_prefixlens, addresses):
+    """
+    Looks up the longest matching prefix of all addresses in the forwarding table at once.
+    :param table_addresses: array of the network addresses of the entries of the forwarding table
+    :param table_prefixlens: array of the prefix lengths of the entries of the forwarding table
+    :param addresses: sorted array of addresses
+    :return: for each address the index of its matching prefix (-1 if there is none), and for each prefix the
+    rows of its entries as entry_order[entry_ptr[i]:entry_ptr[i + 1]]
+    """
+    keys = (table_addresses << 6) | table_prefixlens
+    entry_order = np.argsort(keys, kind="stable")
+    prefix_keys, entry_ptr = np.unique(keys[entry_order], return_index=True)
+    entry_ptr = np.append(entry_ptr, len(keys))
+
+    prefix_addresses = prefix_keys >> 6
+    prefix_lengths = prefix_keys & 63
+
+    # going from short to long prefixes, such that longer matches overwrite shorter ones
+    matches = np.full(len(addresses), -1, dtype=np.int64)
+    for length in np.unique(prefix_lengths).tolist():
+        indexes = np.flatnonzero(prefix_lengths == length)
+        networks = prefix_addresses[indexes]
+
+        masked_addresses = addresses & (0xFFFFFFFF ^ ((1 << (32 - length)) - 1))
+        positions = np.minimum(np.searchsorted(networks, masked_addresses), len(networks) - 1)
+        found = networks[positions] == masked_addresses
+        matches[found] = indexes[positions[found]]
+
+    return matches, entry_order, entry_ptr
+
+
+def get_table_arrays(routers, tables, node_ids):
+    """
+    Concatenates the forwarding tables of all routers into plain arrays: the entries of the i-th router are in the rows
+    table_ptr[i]:table_ptr[i + 1]. The next hops get their node ids on the way.
+    :return: dict of the arrays
+    """
+    router_tables = [(router, tables[router]) for router in routers if tables.get(router)]
+
+    next_hop_ids = [node_ids.setdefault(next_hop, len(node_ids))
+                    for _, table in router_tables for next_hop in table.next_hops]
+
+    return {
+        "router_ids": np.array([node_ids[router] for router, _ in router_tables], dtype=np.int64),
+        "table_ptr": np.cumsum([0] + [len(table) for _, table in router_tables]),
+        "addresses": np.concatenate([table.addresses for _, table in router_tables] + [np.zeros(0, dtype=np.int64)]),
+        "prefixlens": np.concatenate([table.prefixlens for _, table in router_tables] + [np.zeros(0, dtype=np.int8)]),
+        "next_hop_ids": np.array(next_hop_ids, dtype=np.int64),
+    }
+
+
+def get_edge_keys(table_arrays, firsts, num_nodes, fec_offset=0):
+    """
+    :param table_arrays: forwarding tables of all routers as returned by get_table_arrays()
+    :param firsts: array of the first address of the FECs
+    :param num_nodes: number of node ids
+    :param fec_offset: index of the first of the FECs
+    :return: array of all edges of the forwarding graphs of the FECs as (fec * num_nodes + source) * num_nodes + next
+    hop keys
+    """
+    table_ptr = table_arrays["table_ptr"].tolist()
+
+    # all edges, looked up one router at a time
+    all_keys = list()
+    for i, router_id in enumerate(table_arrays["router_ids"].tolist()):
+        start, end = table_ptr[i], table_ptr[i + 1]
+        matches, entry_order, entry_ptr = longest_prefix_match(table_arrays["addresses"][start:end],
+                                                               table_arrays["prefixlens"][start:end], firsts)
+        fecs = np.flatnonzero(matches >= 0)
+        starts = entry_ptr[matches[fecs]]
+        counts = entry_ptr[matches[fecs] + 1] - starts
+
+        # a FEC gets an edge for each of the entries of its matching prefix
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        dsts = table_arrays["next_hop_ids"][start:end][entry_order[np.repeat(starts, counts) + offsets]]
+        all_keys.append(((np.repeat(fecs, counts) + fec_offset) * num_nodes + router_id) * num_nodes + dsts)
+
+    if all_keys:
+        return np.concatenate(all_keys)
+    return np.zeros(0, dtype=np.int64)
+
+
+def build_forwarding_graphs(routers, tables, firsts, lasts, simple_acls=None, node_ids=None, max_cached_edges=None,
+                            worker_pool=None):
+    """
+    Builds the forwarding graphs of all FECs at once.
+    :param routers: list of all routers
+    :param tables: dict mapping router to ArrayForwardingTable
+    :param firsts: array of the first address of every FEC
+    :param lasts: array of the last address of every FEC
+    :param simple_acls: PyTricia of prefix to the edges which are blocked for it
+    :param node_ids: dict mapping node to id, pass the same dict for all samples to keep the ids stable
+    :param max_cached_edges: bound on the total number of edges of the cached NetworkX graphs
+    :param worker_pool: WorkerPool to look up the FECs in parallel
+    :return: ForwardingGraphs
+    """
+    if node_ids is None:
+        node_ids = dict()
+    for node in list(routers) + ["sink"]:
+        node_ids.setdefault(node, len(node_ids))
+
+    # all node ids are assigned before the lookup, such that the FECs can be looked up independently of each other
+    table_arrays = get_table_arrays(routers, tables, node_ids)
+
+    nodes = sorted(node_ids, key=node_ids.get)
+    num_nodes = len(nodes)
+
+    prefixes = [get_fec_prefix(first, last) for first, last in zip(firsts.tolist(), lasts.tolist())]
+
+    if worker_pool is not None:
+        edge_keys = worker_pool.get_edge_keys(table_arrays, firsts, num_nodes)
+    else:
+        edge_keys = get_edge_keys(table_arrays, firsts, num_nodes)
+
+    # remove edges that are blocked by ACLs, their endpoints stay in the forwarding graph
+    blocked_nodes = defaultdict(set)
+    if simple_acls:
+        blocked_keys = list()
+        for fec, prefix in enumerate(prefixes):
+            if prefix in simple_acls:
+                for r1, r2 in simple_acls[prefix]:
+                    if r1 in node_ids and r2 in node_ids:
+                        blocked_keys.append((fec * num_nodes + node_ids[r1]) * num_nodes + node_ids[r2])
+        if blocked_keys:
+            blocked = np.isin(edge_keys, blocked_keys)
+            for edge_key in np.unique(edge_keys[blocked]).tolist():
+                blocked_nodes[edge_key // (num_nodes * num_nodes)].add(nodes[edge_key % num_nodes])
+            edge_keys = edge_keys[~blocked]
+
+    # sorting the edges by FEC and source gives the CSR format, duplicate edges (e.g., ECMP over parallel links)
+    # are removed on the way
+    edge_keys = np.unique(edge_keys)
+    edge_fecs = edge_keys // (num_nodes * num_nodes)
+    srcs = (edge_keys // num_nodes) % num_nodes
+    dsts = edge_keys % num_nodes
+
+    # only FECs with at least one edge have a forwarding graph
+    fecs = np.unique(edge_fecs)
+    graph_ptr = np.searchsorted(edge_fecs, np.append(fecs, len(prefixes)))
+
+    extra_nodes = {graph_id: blocked_nodes[fec] for graph_id, fec in enumerate(fecs.tolist()) if fec in blocked_nodes}
+
+    return ForwardingGraphs(nodes, list(routers), [prefixes[fec] for fec in fecs.tolist()], graph_ptr, srcs, dsts,
+                            extra_nodes=extra_nodes, max_cached_edges=max_cached_edges)
+
+
+class ForwardingGraphs(Mapping):
+    """
+    Forwarding graphs of all FECs of a sample stored as a single edge list in CSR format: the edges of graph i are
+    srcs[graph_ptr[i]:graph_ptr[i + 1]] -> dsts[graph_ptr[i]:graph_ptr[i + 1]], sorted by source. It maps the prefix
+    of each FEC to its forwarding graph, the NetworkX graphs are only built once they are accessed.
+    """
+    def __init__(self, nodes, routers, prefixes, graph_ptr, srcs, dsts, extra_nodes=None, max_cached_edges=None):
+        self.nodes = nodes  # node id -> name
+        self.routers = routers  # all routers are part of every forwarding graph
+
+        # graph id -> nodes that are in the graph without an edge (e.g., the endpoints of edges blocked by ACLs)
+        self.extra_nodes = extra_nodes if extra_nodes else dict()
+
+        self.prefixes = prefixes
+        self.index = {prefix: graph_id for graph_id, prefix in enumerate(prefixes)}
+
+        self.graph_ptr = graph_ptr
+        self.srcs = srcs
+        self.dsts = dsts
+
+        # NetworkX graphs that have already been built per fingerprint, such that prefixes with identical forwarding
+        # graphs share the same one
+        self.graphs = GraphCache(max_edges=max_cached_edges)
+
+        # graph id -> fingerprint of the forwarding graph, identical graphs have the same fingerprint
+        self.fingerprints = None
+
+    @classmethod
+    def from_graphs(cls, graphs, node_ids=None):
+        """
+        :param graphs: dict mapping prefix to NetworkX forwarding graph
+        :param node_ids: dict mapping node to id, extended by the nodes of the graphs
+        :return: ForwardingGraphs of the given graphs
+        """
+        if node_ids is None:
+            node_ids = dict()
+        node_ids.setdefault("sink", len(node_ids))
+
+        prefixes = list()
+        graph_ptr = [0]
+        srcs = list()
+        dsts = list()
+        extra_nodes = dict()
+        for prefix, graph in graphs.items():
+            edges = sorted(set((node_ids.setdefault(src, len(node_ids)), node_ids.setdefault(dst, len(node_ids)))
+                               for src, dst in graph.edges))
+            srcs.extend(src for src, _ in edges)
+            dsts.extend(dst for _, dst in edges)
+            graph_ptr.append(len(srcs))
+
+            isolated_nodes = set(nx.isolates(graph))
+            if isolated_nodes:
+                extra_nodes[len(prefixes)] = isolated_nodes
+            prefixes.append(prefix)
+
+        for graph in graphs.values():
+            for node in graph.nodes:
+                node_ids.setdefault(node, len(node_ids))
+        nodes = sorted(node_ids, key=node_ids.get)
+
+        forwarding_graphs = cls(nodes, list(), prefixes, np.array(graph_ptr, dtype=np.int64),
+                                np.array(srcs, dtype=np.int64), np.array(dsts, dtype=np.int64), extra_nodes=extra_nodes)
+        for prefix, graph in graphs.items():
+            forwarding_graphs.graphs.put(forwarding_graphs.get_fingerprint(prefix), graph)
+        return forwarding_graphs
+
+    def __getitem__(self, prefix):
+        fingerprint = self.get_fingerprint(prefix)
+        graph = self.graphs.get(fingerprint)
+        if graph is None:
+            graph = self.build_graph(self.index[prefix])
+            self.graphs.put(fingerprint, graph)
+        return graph
+
+    def __contains__(self, prefix):
+        return prefix in self.index
+
+    def __iter__(self):
+        return iter(self.prefixes)
+
+    def __len__(self):
+        return len(self.prefixes)
+
+    def get_edges(self, prefix):
+        """
+        :return: arrays of the source and destination node ids of all edges of the forwarding graph
+        """
+        graph_id = self.index[prefix]
+        start, end = self.graph_ptr[graph_id], self.graph_ptr[graph_id + 1]
+        return self.srcs[start:end], self.dsts[start:end]
+
+    def get_fingerprint(self, prefix):
+        """
+        :return: hashable fingerprint of the forwarding graph, which is the same for all identical forwarding graphs
+        """
+        if self.fingerprints is None:
+            self.compute_fingerprints()
+        return self.fingerprints[self.index[prefix]]
+
+    def compute_fingerprints(self):
+        # the edges of a graph are sorted by source and next hop, hence their ids already are a canonical form
+        graph_ptr = self.graph_ptr.tolist()
+        srcs = self.srcs.astype(np.int32).tobytes()
+        dsts = self.dsts.astype(np.int32).tobytes()
+
+        self.fingerprints = list()
+        for graph_id in range(len(self.prefixes)):
+            start, end = graph_ptr[graph_id] * 4, graph_ptr[graph_id + 1] * 4
+            extra_nodes = frozenset(self.extra_nodes.get(graph_id, list()))
+            self.fingerprints.append((srcs[start:end], dsts[start:end], extra_nodes))
+
+    def get_graph_classes(self):
+        """
+        :return: dict mapping the fingerprint of each distinct forwarding graph to the prefixes which have it
+        """
+        if self.fingerprints is None:
+            self.compute_fingerprints()
+
+        graph_classes = defaultdict(list)
+        for prefix, fingerprint in zip(self.prefixes, self.fingerprints):
+            graph_classes[fingerprint].append(prefix)
+        return graph_classes
+
+    def update_from(self, previous):
+        """
+        Compares the forwarding graphs to the ones of the previous sample and takes over the NetworkX graphs that are
+        still in use, all others are dropped with the previous sample. Both need to use the same node ids.
+        :param previous: ForwardingGraphs of the previous sample
+        :return: set of the prefixes whose forwarding graph changed, is new or disappeared
+        """
+        common = [prefix for prefix in self.prefixes if prefix in previous.index]
+        new_ids = np.array([self.index[prefix] for prefix in common], dtype=np.int64)
+        old_ids = np.array([previous.index[prefix] for prefix in common], dtype=np.int64)
+
+        new_starts = self.graph_ptr[new_ids]
+        old_starts = previous.graph_ptr[old_ids]
+        lengths = self.graph_ptr[new_ids + 1] - new_starts
+        same_length = lengths == previous.graph_ptr[old_ids + 1] - old_starts
+
+        # compare the edges of all graphs with the same number of edges at once
+        lengths = lengths[same_length]
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        new_edges = np.repeat(new_starts[same_length], lengths) + offsets
+        old_edges = np.repeat(old_starts[same_length], lengths) + offsets
+        different = (self.srcs[new_edges] != previous.srcs[old_edges]) | \
+            (self.dsts[new_edges] != previous.dsts[old_edges])
+        same_edges = np.bincount(np.repeat(np.arange(len(lengths)), lengths)[different], minlength=len(lengths)) == 0
+
+        unchanged = np.zeros(len(common), dtype=bool)
+        unchanged[np.flatnonzero(same_length)[same_edges]] = True
+
+        changed_prefixes = set(self.prefixes).symmetric_difference(previous.prefixes)
+        for prefix, new_id, old_id, is_unchanged in zip(common, new_ids.tolist(), old_ids.tolist(), unchanged.tolist()):
+            if not is_unchanged or self.extra_nodes.get(new_id) != previous.extra_nodes.get(old_id):
+                changed_prefixes.add(prefix)
+
+        # the fingerprints are stable across samples, hence also graphs of other prefixes can be reused
+        if len(previous.graphs):
+            if self.fingerprints is None:
+                self.compute_fingerprints()
+            self.graphs.take_over(previous.graphs, set(self.fingerprints))
+
+        return changed_prefixes
+
+    def get_memory_usage(self):
+        """
+        :return: dict with the bytes used by the arrays, and the number of cached NetworkX graphs and their edges
+        """
+        return {
+            "array_bytes": self.graph_ptr.nbytes + self.srcs.nbytes + self.dsts.nbytes,
+            "cached_graphs": len(self.graphs),
+            "cached_edges": self.graphs.num_edges,
+        }
+
+    def build_graph(self, graph_id):
+        start, end = self.graph_ptr[graph_id], self.graph_ptr[graph_id + 1]
+
+        # all routers are part of every forwarding graph, even if they don't have a route
+        graph = nx.DiGraph()
+        graph.add_nodes_from(self.routers)
+        graph.add_nodes_from(self.extra_nodes.get(graph_id, list()))
+        graph.add_edges_from((self.nodes[src], self.nodes[dst])
+                             for src, dst in zip(self.srcs[start:end].tolist(), self.dsts[start:end].tolist()))
+        return graph
+
+
+class VRFGraphs(Mapping):
+    """
+    Forwarding (or dominator) graphs of several VRFs of the same sample. It maps (vrf, prefix) to the graph of the FEC
+    in that VRF, the graphs of a single VRF are available through get_vrf().
+    """
+    def __init__(self, vrf_graphs):
+        self.vrf_graphs = vrf_graphs  # vrf -> graphs of all FECs of the VRF
+
+    def __getitem__(self, key):
+        vrf, prefix = key
+        return self.vrf_graphs[vrf][prefix]
+
+    def __contains__(self, key):
+        if not isinstance(key, tuple) or len(key) != 2:
+            return False
+        vrf, prefix = key
+        return vrf in self.vrf_graphs and prefix in self.vrf_graphs[vrf]
+
+    def __iter__(self):
+        for vrf, graphs in self.vrf_graphs.items():
+            for prefix in graphs:
+                yield vrf, prefix
+
+    def __len__(self):
+        return sum(len(graphs) for graphs in self.vrf_graphs.values())
+
+    @property
+    def vrfs(self):
+        return list(self.vrf_graphs.keys())
+
+    def get_vrf(self, vrf):
+        return self.vrf_graphs[vrf]
+
+    def get_memory_usage(self):
+        """
+        :return: the memory usage (see ForwardingGraphs.get_memory_usage()) summed over all VRFs
+        """
+        memory_usage = defaultdict(int)
+        for graphs in self.vrf_graphs.values():
+            for key, value in graphs.get_memory_usage().items():
+                memory_usage[key] += value
+        return dict(memory_usage)
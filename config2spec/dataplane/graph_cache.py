@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# Author: Ruediger Birkner (Networked Systems Group at ETH Zurich)
+
+from collections import OrderedDict
+
+
+class GraphCache(object):
+    """
+    LRU cache of the NetworkX graphs that are built from the arrays of a sample, bounded by the total number of edges
+    of the cached graphs. Without a bound, it keeps all graphs of the sample.
+    """
+    def __init__(self, max_edges=None):
+        self.max_edges = max_edges
+
+        self.graphs = OrderedDict()
+        self.num_edges = 0
+
+    def __contains__(self, key):
+        return key in self.graphs
+
+    def __len__(self):
+        return len(self.graphs)
+
+    def get(self, key):
+        graph = self.graphs.get(key)
+        if graph is not None and self.max_edges is not None:
+            self.graphs.move_to_end(key)
+        return graph
+
+    def put(self, key, graph):
+        if key in self.graphs:
+            self.num_edges -= self.graphs.pop(key).number_of_edges()
+
+        self.graphs[key] = graph
+        self.num_edges += graph.number_of_edges()
+
+        # evict the least recently used graphs, but always keep the new one
+        if self.max_edges is not None:
+            while self.num_edges > self.max_edges and len(self.graphs) > 1:
+                _, evicted_graph = self.graphs.popitem(last=False)
+                self.num_edges -= evicted_graph.number_of_edges()
+
+    def take_over(self, other, keys):
+        """
+        Takes over the graphs of the cache of the previous sample that are still in use, the stale ones are dropped.
+        :param other: GraphCache of the previous sample
+        :param keys: keys that are still in use
+        """
+        for key, graph in other.graphs.items():
+            if key in keys and key not in self.graphs:
+                self.put(key, graph)
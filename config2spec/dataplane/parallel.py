@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# Author: Ruediger Birkner (Networked Systems Group at ETH Zurich)
+
+import multiprocessing
+
+import numpy as np
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # shared memory is only available from Python 3.8 on, before that the arrays are pickled for every task
+    shared_memory = None
+
+from config2spec.dataplane.dominators import immediate_dominators
+from config2spec.dataplane.forwarding_graphs import get_edge_keys
+from config2spec.utils.logger import get_logger
+
+
+class SharedArrays(object):
+    """
+    Copies numpy arrays into shared memory, such that the worker processes can access them by name instead of getting
+    them pickled for every task. Without shared memory support, the arrays themselves are passed on and pickled.
+    """
+    def __init__(self, arrays):
+        self.blocks = list()
+        self.specs = dict()  # name -> (name of the shared memory block, shape, dtype) or the array itself
+
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            if shared_memory is None:
+                self.specs[name] = array
+                continue
+
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+
+            self.blocks.append(block)
+            self.specs[name] = (block.name, array.shape, array.dtype.str)
+
+    def close(self):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = list()
+
+
+def attach_shared_arrays(specs):
+    """
+    :param specs: SharedArrays.specs
+    :return: dict of the shared arrays and the list of the shared memory blocks, which need to be closed afterwards
+    """
+    blocks = list()
+    arrays = dict()
+    for name, spec in specs.items():
+        if isinstance(spec, np.ndarray):
+            arrays[name] = spec
+            continue
+
+        block_name, shape, dtype = spec
+        block = shared_memory.SharedMemory(name=block_name)
+        blocks.append(block)
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+    return arrays, blocks
+
+
+def edge_keys_worker(specs, start, end, num_nodes):
+    arrays, blocks = attach_shared_arrays(specs)
+    try:
+        return get_edge_keys(arrays, arrays["firsts"][start:end], num_nodes, fec_offset=start)
+    finally:
+        del arrays
+        for block in blocks:
+            block.close()
+
+
+def dominators_worker(specs, graph_ids, num_nodes, root):
+    arrays, blocks = attach_shared_arrays(specs)
+    try:
+        return immediate_dominators(arrays["graph_ptr"], arrays["srcs"], arrays["dsts"], graph_ids, num_nodes, root)
+    finally:
+        del arrays
+        for block in blocks:
+            block.close()
+
+
+class WorkerPool(object):
+    """
+    Pool of worker processes that look up the FECs and compute the dominators of a sample in parallel. The input
+    arrays of a sample are put into shared memory once and each worker processes a shard of the FECs or graphs. The
+    results are exactly the same as the ones of the serial computation.
+    """
+    def __init__(self, num_workers, debug=False):
+        self.debug = debug
+        self.logger = get_logger("WorkerPool", "DEBUG" if debug else "INFO")
+
+        self.num_workers = num_workers
+
+        # the processes are only started when they are needed for the first time
+        self.pool = None
+
+    def get_pool(self):
+        if self.pool is None:
+            self.pool = multiprocessing.Pool(self.num_workers)
+            self.logger.debug("Started {num_workers} worker processes.".format(num_workers=self.num_workers))
+        return self.pool
+
+    def get_shards(self, num_items):
+        """
+        :return: list of (start, end) tuples that split the items into one contiguous shard per worker
+        """
+        bounds = np.linspace(0, num_items, min(self.num_workers, num_items) + 1).astype(np.int64).tolist()
+        return [(start, end) for start, end in zip(bounds[:-1], bounds[1:]) if start < end]
+
+    def get_edge_keys(self, table_arrays, firsts, num_nodes):
+        """
+        Parallel version of forwarding_graphs.get_edge_keys(), the FECs are sharded across the workers.
+        """
+        shards = self.get_shards(len(firsts))
+        if not shards:
+            return np.zeros(0, dtype=np.int64)
+
+        shared_arrays = SharedArrays(dict(table_arrays, firsts=firsts))
+        try:
+            results = self.get_pool().starmap(
+                edge_keys_worker, [(shared_arrays.specs, start, end, num_nodes) for start, end in shards])
+        finally:
+            shared_arrays.close()
+
+        return np.concatenate(results)
+
+    def immediate_dominators(self, graph_ptr, srcs, dsts, graph_ids, num_nodes, root):
+        """
+        Parallel version of dominators.immediate_dominators(), the graphs are sharded across the workers.
+        """
+        shards = self.get_shards(len(graph_ids))
+        if not shards:
+            return np.full((0, num_nodes), -1, dtype=np.int64)
+
+        shared_arrays = SharedArrays({"graph_ptr": graph_ptr, "srcs": srcs, "dsts": dsts})
+        try:
+            results = self.get_pool().starmap(
+                dominators_worker, [(shared_arrays.specs, graph_ids[start:end], num_nodes, root)
+                                    for start, end in shards])
+        finally:
+            shared_arrays.close()
+
+        return np.concatenate(results)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# Author: Ruediger Birkner (Networked Systems Group at ETH Zurich)
+
+import networkx as nx
+
+
+def count_paths(graph, target="sink"):
+    """
+    Counts the simple paths from every node of a forwarding graph to the target. Where the forwarding is loop-free,
+    the counts are computed in a single pass over the nodes in reverse topological order: the number of paths of a
+    node is the sum over its next hops. Only nodes that can reach a forwarding loop on their way to the target fall
+    back to enumerating their simple paths, as the loop makes the counts of their next hops overlap.
+    :param graph: NetworkX forwarding graph
+    :param target: node to count the paths to
+    :return: dict mapping every node that can reach the target (including the target itself) to the number of simple
+    paths from it to the target, and the set of nodes that are part of a forwarding loop on the way to the target
+    """
+    if target not in graph:
+        return dict(), set()
+
+    # only the nodes that can reach the target matter and the paths end as soon as they reach it
+    reaching_graph = nx.DiGraph(graph.subgraph(nx.ancestors(graph, target) | {target}))
+    reaching_graph.remove_edges_from(list(reaching_graph.out_edges(target)))
+
+    loop_nodes = set()
+    for component in nx.strongly_connected_components(reaching_graph):
+        if len(component) > 1:
+            loop_nodes.update(component)
+    loop_nodes.update(node for node in nx.nodes_with_selfloops(reaching_graph))
+
+    # all nodes upstream of a loop
+    looping_nodes = set(loop_nodes)
+    for node in loop_nodes:
+        looping_nodes.update(nx.ancestors(reaching_graph, node))
+
+    num_paths = dict()
+    loop_free_graph = reaching_graph.subgraph(node for node in reaching_graph if node not in looping_nodes)
+    for node in reversed(list(nx.topological_sort(loop_free_graph))):
+        if node == target:
+            num_paths[node] = 1
+        else:
+            num_paths[node] = sum(num_paths[next_hop] for next_hop in loop_free_graph.successors(node))
+
+    for node in looping_nodes:
+        num_paths[node] = sum(1 for _ in nx.all_simple_paths(reaching_graph, node, target))
+
+    return num_paths, loop_nodes
+
+
+class DisjointPaths(object):
+    """
+    Maximum number of edge- or node-disjoint paths from the nodes of a forwarding graph to the target, computed as a
+    unit-capacity max-flow. The residual graph is built once per forwarding graph and only its capacities are reset
+    between the sources. For node-disjoint paths, every node is split into an in- and an out-node connected by an edge
+    of capacity 1.
+    """
+    def __init__(self, graph, target="sink", node_disjoint=False):
+        self.target = target
+        self.node_disjoint = node_disjoint
+
+        # residual graph: edge i and its reverse edge i ^ 1 are stored next to each other
+        self.index = {node: i for i, node in enumerate(graph.nodes())}
+        self.num_vertices = 2 * len(self.index) if node_disjoint else len(self.index)
+        self.heads = list()
+        self.capacities = list()
+        self.adjacency = [list() for _ in range(self.num_vertices)]
+
+        # source -> number of disjoint paths, as several subnets can share the same forwarding graph
+        self.num_paths = dict()
+
+        if node_disjoint:
+            for node in graph.nodes():
+                self.add_edge(self.get_in(node), self.get_out(node))
+        for src, dst in graph.edges():
+            if src != target:
+                self.add_edge(self.get_out(src), self.get_in(dst))
+
+    def get_in(self, node):
+        return 2 * self.index[node] if self.node_disjoint else self.index[node]
+
+    def get_out(self, node):
+        return 2 * self.index[node] + 1 if self.node_disjoint else self.index[node]
+
+    def add_edge(self, src, dst):
+        self.adjacency[src].append(len(self.heads))
+        self.heads.append(dst)
+        self.capacities.append(1)
+        self.adjacency[dst].append(len(self.heads))
+        self.heads.append(src)
+        self.capacities.append(0)
+
+    def get(self, source):
+        """
+        :return: the maximum number of disjoint paths from the source to the target
+        """
+        if source not in self.index or self.target not in self.index or source == self.target:
+            return 0
+        if source in self.num_paths:
+            return self.num_paths[source]
+
+        start = self.get_out(source)
+        end = self.get_in(self.target)
+        residual = list(self.capacities)
+
+        # there can't be more paths than next hops of the source
+        num_paths = 0
+        max_paths = sum(residual[edge] for edge in self.adjacency[start])
+        while num_paths < max_paths:
+            # shortest augmenting path by breadth-first search
+            parent_edges = [-1] * self.num_vertices
+            parent_edges[start] = -2
+            queue = [start]
+            for vertex in queue:
+                for edge in self.adjacency[vertex]:
+                    head = self.heads[edge]
+                    if residual[edge] and parent_edges[head] == -1:
+                        parent_edges[head] = edge
+                        queue.append(head)
+                if parent_edges[end] != -1:
+                    break
+
+            if parent_edges[end] == -1:
+                break
+
+            vertex = end
+            while vertex != start:
+                edge = parent_edges[vertex]
+                residual[edge] -= 1
+                residual[edge ^ 1] += 1
+                vertex = self.heads[edge ^ 1]
+            num_paths += 1
+
+        self.num_paths[source] = num_paths
+        return num_paths
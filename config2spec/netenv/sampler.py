@@ -3,6 +3,7 @@
 
 import random
 
+from config2spec.netenv.network_environment import ConcreteEnvironment
 from config2spec.utils.logger import get_logger
 
 
@@ -41,6 +42,20 @@ class Sampler(object):
         else:
             return False
 
+    def use_failed_links(self, samples):
+        """
+        Marks the environments in which exactly the given links failed as used (e.g., when resuming from a checkpoint).
+        :param samples: list of failed link name collections
+        :return: number of newly used environments
+        """
+        links = list(self.netenv.links.values())
+
+        num_used = 0
+        for failed_links in samples:
+            if self.use_env(ConcreteEnvironment.from_failed_links(links, failed_links)):
+                num_used += 1
+        return num_used
+
     def get_all_up(self):
         concrete_env = self.netenv.get_concrete_env(0)
         self.use_env(concrete_env)
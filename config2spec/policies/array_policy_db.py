@@ -0,0 +1,745 @@
+#!/usr/bin/env python
+# Author: Ruediger Birkner (Networked Systems Group at ETH Zurich)
+
+import csv
+import json
+import os
+import time
+from collections import Counter
+from collections import defaultdict
+from ipaddress import IPv4Network
+
+import numpy as np
+
+from config2spec.backend.query import Query
+
+from config2spec.policies.export import write_chunks
+from config2spec.policies.policy import Policy
+from config2spec.policies.policy import PolicyDestination
+from config2spec.policies.policy import PolicySource
+from config2spec.policies.policy import PolicyType
+from config2spec.policies.policy_db import PolicyStatus
+from config2spec.policies.policy_guesser import PolicyGuesser
+
+from config2spec.utils.logger import get_logger
+
+
+# status codes as they are stored in the status array
+STATUS_CODES = {
+    PolicyStatus.UNKNOWN: 0,
+    PolicyStatus.HOLDS: 1,
+    PolicyStatus.HOLDSNOT: 2,
+}
+CODE_STATUS = {code: status for status, code in STATUS_CODES.items()}
+
+
+class KeyRegistry(object):
+    """
+    Assigns a stable small integer id to every key it has seen (e.g., subnets, sources, specifics).
+    """
+    def __init__(self):
+        self.ids = dict()
+        self.keys = list()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def get_id(self, key):
+        key_id = self.ids.get(key)
+        if key_id is None:
+            key_id = len(self.keys)
+            self.ids[key] = key_id
+            self.keys.append(key)
+        return key_id
+
+    def lookup(self, key):
+        return self.ids.get(key, -1)
+
+    def get_key(self, key_id):
+        return self.keys[key_id]
+
+
+class SampleBitmap(object):
+    """
+    Stores for every row a bitmap of the samples (environments) in which the policy held. Each sample is mapped to a
+    bit, the bits are packed into 64 bit words.
+    """
+    # number of set bits for each possible byte value
+    POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def __init__(self):
+        self.samples = KeyRegistry()
+        self.bits = np.zeros((0, 0), dtype=np.uint64)
+
+    def reserve(self, num_rows, num_samples):
+        num_words = (num_samples + 63) // 64
+        if num_rows <= self.bits.shape[0] and num_words <= self.bits.shape[1]:
+            return
+
+        rows = max(num_rows, self.bits.shape[0])
+        words = max(num_words, self.bits.shape[1])
+
+        bits = np.zeros((rows, words), dtype=np.uint64)
+        bits[:self.bits.shape[0], :self.bits.shape[1]] = self.bits
+        self.bits = bits
+
+    def add(self, rows, sample):
+        """
+        Marks the given sample for all the rows
+        :param rows: array of rows
+        :param sample: sample identifier
+        """
+        bit = self.samples.get_id(sample)
+        self.reserve(self.bits.shape[0], len(self.samples))
+
+        self.bits[rows, bit // 64] |= np.uint64(1 << (bit % 64))
+
+    def count(self, rows):
+        """
+        :return: array with the number of samples for each of the rows
+        """
+        return self.POPCOUNT[self.bits[rows].view(np.uint8)].reshape(len(rows), -1).sum(axis=1)
+
+    def contains(self, row, sample):
+        bit = self.samples.lookup(sample)
+        if bit < 0:
+            return False
+        return bool(self.bits[row, bit // 64] & np.uint64(1 << (bit % 64)))
+
+    def get_all_samples(self):
+        return list(self.samples.keys)
+
+    def get_samples(self, rows):
+        """
+        :return: list of all samples which are set for all the given rows
+        """
+        common = np.bitwise_and.reduce(self.bits[rows], axis=0)
+
+        # unpackbits() only yields the most significant bit first, hence the bits of each byte are reversed. The
+        # words are cast to little-endian such that bit i of the bitmap is bit i of the result on any host.
+        set_bits = np.flatnonzero(np.unpackbits(common.astype("<u8").view(np.uint8)).reshape(-1, 8)[:, ::-1].ravel())
+        return [self.samples.get_key(bit) for bit in set_bits]
+
+
+class ArrayPolicyDB(object):
+    """
+    Policy database that stores the integer-interned key of every policy (type, subnet, specifics, source) and its
+    status in NumPy arrays. A hash index maps each key to its row. It provides the same interface as the pandas
+    based PolicyDB.
+
+    If a checkpoint path is given, the full state is periodically written to disk from where it can be restored
+    with load().
+    """
+    def __init__(self, network, waypoints=None, debug=False, checkpoint_path=None, checkpoint_interval=300,
+                 edge_disjoint=False, node_disjoint=False):
+        # initialize logging
+        self.debug = debug
+        self.logger = get_logger("ArrayPolicyDB", "DEBUG" if debug else "INFO")
+
+        self.init = False
+
+        self.policy_guesser = PolicyGuesser(network, waypoints=waypoints, edge_disjoint=edge_disjoint,
+                                            node_disjoint=node_disjoint, debug=debug)
+        self.keys = ["type", "subnet", "specifics", "source"]
+
+        # registries for all the parts of a policy key
+        self.subnets = KeyRegistry()
+        self.specifics = KeyRegistry()
+        self.sources = KeyRegistry()
+
+        # interned destination/source id -> subnet/source id in the db
+        self.destination_subnet_ids = dict()
+        self.source_ids_by_id = dict()
+
+        # policies are queried in groups of the same (type, subnet, specifics)
+        self.groups = KeyRegistry()
+
+        # routers of the sources and destinations, needed to trim the policies
+        self.routers = KeyRegistry()
+
+        # hash index from the interned key to the row in the arrays
+        self.index = dict()
+
+        # one entry per policy, the arrays are over-allocated such that adding policies is amortized O(1)
+        self.size = 0
+        self.capacity = 0
+        self.types = np.zeros(0, dtype=np.int8)
+        self.subnet_ids = np.zeros(0, dtype=np.int32)
+        self.specifics_ids = np.zeros(0, dtype=np.int32)
+        self.source_ids = np.zeros(0, dtype=np.int32)
+        self.group_ids = np.zeros(0, dtype=np.int32)
+        self.dst_router_ids = np.zeros(0, dtype=np.int32)  # -1 if the destinations are on multiple routers
+        self.status = np.zeros(0, dtype=np.int8)
+        self.environments = SampleBitmap()
+        self.destinations = list()
+
+        # rows of all policies per status (insertion ordered), their sizes are the per status counters
+        self.status_rows = {code: dict() for code in CODE_STATUS}
+
+        # rows of each group and the queue of all groups with unknown policies (group id -> unknown rows)
+        self.group_rows = list()
+        self.query_queue = dict()
+
+        # number of policies per status, subnet and source (status -> subnet id -> Counter of sources)
+        self.source_counts = {code: dict() for code in CODE_STATUS}
+
+        self.previous_size = -1  # stores the size of the current policy guess
+
+        self.trim_counts = Counter()  # number of trimmed policies per policy type
+
+        self.tmp_state = None
+
+        # periodic checkpoints to disk
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval  # in seconds
+        self.last_checkpoint = time.time()
+
+    def update_policies(self, sample, forwarding_graphs, dominator_graphs, node_local_reachability=False,
+                        changed_subnets=None):
+        # get the policy guess
+        policies = self.policy_guesser.get_policies(forwarding_graphs, dominator_graphs,
+                                                    node_local_reachability=node_local_reachability,
+                                                    changed_subnets=changed_subnets)
+        change, previous_size = self.update_policies2(policies, sample)
+        return change, previous_size
+
+    def update_policies2(self, policies, sample):
+        # make sure that we have unique keys and collect the destinations of each key. Sources and destinations are
+        # interned, hence their ids map directly to the ids used in the db.
+        subnet_ids = self.destination_subnet_ids
+        source_ids = self.source_ids_by_id
+        specifics_ids = self.specifics.ids
+
+        unique_policies = defaultdict(set)
+        for ptype, destination, specifics, source in policies:
+            subnet_id = subnet_ids.get(destination.id)
+            if subnet_id is None:
+                subnet_id = subnet_ids[destination.id] = self.subnets.get_id(destination.subnet)
+            source_id = source_ids.get(source.id)
+            if source_id is None:
+                source_id = source_ids[source.id] = self.sources.get_id(source)
+            specifics_id = specifics_ids.get(specifics)
+            if specifics_id is None:
+                specifics_id = self.specifics.get_id(specifics)
+
+            unique_policies[(ptype.value, subnet_id, specifics_id, source_id)].add(destination)
+
+        # all policies that are in the db and hold for the given sample, the others are new. Only touch the
+        # destinations if the sample actually adds a new one.
+        seen_rows = set()
+        new_keys = list()
+        for key, destinations in unique_policies.items():
+            row = self.index.get(key)
+            if row is None:
+                new_keys.append(key)
+            else:
+                seen_rows.add(row)
+                if not destinations <= self.destinations[row]:
+                    self.destinations[row] |= destinations
+                    self.dst_router_ids[row] = self.get_router_id(self.destinations[row])
+
+        self.environments.add(np.fromiter(seen_rows, dtype=np.int64, count=len(seen_rows)), sample)
+
+        # if this is the first policy guess, all policies are unknown, else new policies don't hold in all samples
+        if not self.init:
+            new_status = STATUS_CODES[PolicyStatus.UNKNOWN]
+        else:
+            new_status = STATUS_CODES[PolicyStatus.HOLDSNOT]
+
+            # all policies which are part of the current guess, but don't hold for the given sample
+            missing_rows = [row for code in [STATUS_CODES[PolicyStatus.UNKNOWN], STATUS_CODES[PolicyStatus.HOLDS]]
+                            for row in self.status_rows[code] if row not in seen_rows]
+            if missing_rows:
+                self.set_status(np.fromiter(missing_rows, dtype=np.int64, count=len(missing_rows)),
+                                STATUS_CODES[PolicyStatus.HOLDSNOT])
+
+        self.add_rows(new_keys, [unique_policies[key] for key in new_keys], sample, new_status)
+
+        # computing the size of the policy guess
+        current_size = len(self.status_rows[STATUS_CODES[PolicyStatus.UNKNOWN]]) + \
+            len(self.status_rows[STATUS_CODES[PolicyStatus.HOLDS]])
+
+        if not self.init:
+            self.init = True
+            change = 1.0
+        elif self.previous_size == 0:
+            change = 0.0
+        else:
+            change = float(self.previous_size - current_size)/float(self.previous_size)
+
+        self.previous_size = current_size
+
+        self.periodic_save()
+
+        return change, self.previous_size
+
+    def reserve(self, num_rows):
+        required = self.size + num_rows
+        if required <= self.capacity:
+            return
+
+        # grow geometrically to keep the cost of adding a row amortized constant
+        capacity = max(required, 2 * self.capacity, 1024)
+        for name in ["types", "subnet_ids", "specifics_ids", "source_ids", "group_ids", "dst_router_ids", "status"]:
+            old_array = getattr(self, name)
+            new_array = np.zeros(capacity, dtype=old_array.dtype)
+            new_array[:self.size] = old_array[:self.size]
+            setattr(self, name, new_array)
+
+        self.environments.reserve(capacity, len(self.environments.samples))
+
+        self.capacity = capacity
+
+    def add_rows(self, keys, destinations, sample, status):
+        if not keys:
+            return
+
+        self.reserve(len(keys))
+
+        first_row = self.size
+        last_row = first_row + len(keys)
+
+        key_array = np.array(keys, dtype=np.int32).reshape(-1, 4)
+        self.types[first_row:last_row] = key_array[:, 0]
+        self.subnet_ids[first_row:last_row] = key_array[:, 1]
+        self.specifics_ids[first_row:last_row] = key_array[:, 2]
+        self.source_ids[first_row:last_row] = key_array[:, 3]
+        self.status[first_row:last_row] = status
+
+        self.environments.add(np.arange(first_row, last_row), sample)
+        self.destinations.extend(set(dsts) for dsts in destinations)
+
+        self.size = last_row
+
+        self.index_rows(first_row, last_row)
+
+    def index_rows(self, first_row, last_row):
+        """
+        Adds the given rows to the hash index and all the indexes derived from the key and status of a row.
+        """
+        unknown = STATUS_CODES[PolicyStatus.UNKNOWN]
+
+        keys = zip(self.types[first_row:last_row].tolist(), self.subnet_ids[first_row:last_row].tolist(),
+                   self.specifics_ids[first_row:last_row].tolist(), self.source_ids[first_row:last_row].tolist())
+        statuses = self.status[first_row:last_row].tolist()
+
+        group_ids = list()
+        for row, key, status in zip(range(first_row, last_row), keys, statuses):
+            self.index[key] = row
+
+            group_id = self.groups.get_id(key[:3])
+            if group_id == len(self.group_rows):
+                self.group_rows.append(list())
+            self.group_rows[group_id].append(row)
+            group_ids.append(group_id)
+
+            self.status_rows[status][row] = None
+            if status == unknown:
+                self.query_queue.setdefault(group_id, dict())[row] = None
+
+        self.count_sources(np.arange(first_row, last_row), self.status[first_row:last_row], 1)
+
+        self.group_ids[first_row:last_row] = group_ids
+        self.dst_router_ids[first_row:last_row] = [self.get_router_id(self.destinations[row])
+                                                   for row in range(first_row, last_row)]
+
+    def get_router_id(self, destinations):
+        routers = {destination.router for destination in destinations}
+        if len(routers) == 1:
+            return self.routers.get_id(routers.pop())
+        return -1
+
+    def set_status(self, rows, status):
+        """
+        All status changes go through here to keep the derived state consistent.
+        :param rows: array of rows
+        :param status: status code
+        """
+        unknown = STATUS_CODES[PolicyStatus.UNKNOWN]
+
+        old_statuses = self.status[rows]
+        changed = old_statuses != status
+        self.count_sources(rows[changed], old_statuses[changed], -1)
+        self.count_sources(rows[changed], np.full(np.count_nonzero(changed), status), 1)
+
+        new_rows = self.status_rows[status]
+        for row, old_status, group_id in zip(rows.tolist(), old_statuses.tolist(), self.group_ids[rows].tolist()):
+            if old_status != status:
+                del self.status_rows[old_status][row]
+                new_rows[row] = None
+
+                # keep the query queue up to date: groups leave the queue once they have no unknown policy left
+                if old_status == unknown:
+                    group_rows = self.query_queue[group_id]
+                    del group_rows[row]
+                    if not group_rows:
+                        del self.query_queue[group_id]
+                elif status == unknown:
+                    self.query_queue.setdefault(group_id, dict())[row] = None
+
+        self.status[rows] = status
+
+    def count_sources(self, rows, statuses, delta):
+        """
+        Adds delta to the source counts of the given rows with the given statuses, empty counts are removed.
+        """
+        source_keys = self.sources.keys
+        for subnet_id, source_id, status in zip(self.subnet_ids[rows].tolist(), self.source_ids[rows].tolist(),
+                                                statuses.tolist()):
+            subnet_counts = self.source_counts[status].get(subnet_id)
+            if subnet_counts is None:
+                subnet_counts = self.source_counts[status][subnet_id] = Counter()
+
+            source = source_keys[source_id]
+            subnet_counts[source] += delta
+            if subnet_counts[source] == 0:
+                del subnet_counts[source]
+                if not subnet_counts:
+                    del self.source_counts[status][subnet_id]
+
+    def get_row(self, policy_type, subnet, specifics, source):
+        key = (policy_type.value, self.subnets.lookup(subnet), self.specifics.lookup(specifics),
+               self.sources.lookup(source))
+        return self.index.get(key)
+
+    def get_group_rows(self, policy_type, subnet, specifics):
+        group_id = self.groups.lookup((policy_type.value, self.subnets.lookup(subnet), self.specifics.lookup(specifics)))
+        if group_id < 0:
+            return np.zeros(0, dtype=np.int64)
+        return np.array(self.group_rows[group_id], dtype=np.int64)
+
+    def get_rows(self, status=None):
+        if status:
+            rows = self.status_rows[STATUS_CODES[status]]
+            return np.sort(np.fromiter(rows, dtype=np.int64, count=len(rows)))
+        else:
+            return np.arange(self.size)
+
+    def num_environments(self, policy_type, subnet, specifics, source):
+        """
+        :return: number of samples in which the policy held
+        """
+        row = self.get_row(policy_type, subnet, specifics, source)
+        if row is None:
+            return 0
+        return int(self.environments.count(np.array([row]))[0])
+
+    def get_environments(self, policies):
+        """
+        :param policies: list of policy keys (type, subnet, specifics, source)
+        :return: list of all samples in which all the given policies held
+        """
+        rows = [self.get_row(*policy) for policy in policies]
+        if not rows or None in rows:
+            return list()
+        return self.environments.get_samples(np.array(rows))
+
+    def get_key(self, row):
+        policy_type = PolicyType(int(self.types[row]))
+        subnet = self.subnets.get_key(self.subnet_ids[row])
+        specifics = self.specifics.get_key(self.specifics_ids[row])
+        source = self.sources.get_key(self.source_ids[row])
+        return policy_type, subnet, specifics, source
+
+    def use_response(self, response):
+        if response.holds_all():
+            self.update_policy(response.type, response.destination, response.specifics, PolicyStatus.HOLDS)
+        else:
+            for failed_source in response.failed_sources():
+                self.update_policy(response.type, response.destination, response.specifics, PolicyStatus.HOLDSNOT, source=failed_source)
+
+    def update_policy(self, policy_type, destination, specifics, status, source=None):
+        if source:
+            row = self.get_row(policy_type, destination, specifics, source)
+            if row is None:
+                raise KeyError((policy_type, destination, specifics, source))
+            self.set_status(np.array([row]), STATUS_CODES[status])
+        else:
+            self.set_status(self.get_group_rows(policy_type, destination, specifics), STATUS_CODES[status])
+
+        self.periodic_save()
+
+    def change_status(self, current_status, next_status):
+        self.set_status(self.get_rows(status=current_status), STATUS_CODES[next_status])
+
+    def num_policies(self, status=None):
+        if not self.init:
+            return 0
+        if status:
+            num_policies = len(self.status_rows[STATUS_CODES[status]])
+        else:
+            num_policies = self.size
+        return num_policies
+
+    def get_raw_policy(self, status=None, group=False):
+        if not self.init:
+            return None
+
+        # the unknown groups are readily available in the query queue
+        if group and status == PolicyStatus.UNKNOWN:
+            if not self.query_queue:
+                return None
+            group_rows = np.fromiter(next(iter(self.query_queue.values())), dtype=np.int64)
+            first_row = group_rows[0]
+        elif status:
+            rows = self.status_rows[STATUS_CODES[status]]
+            if not rows:
+                return None
+            first_row = next(iter(rows))
+        elif self.size > 0:
+            first_row = 0
+        else:
+            return None
+
+        if group:
+            policy_type, _, specifics, _ = self.get_key(first_row)
+            if status != PolicyStatus.UNKNOWN:
+                group_rows = np.array(self.group_rows[self.group_ids[first_row]], dtype=np.int64)
+                if status:
+                    group_rows = group_rows[self.status[group_rows] == STATUS_CODES[status]]
+
+            sources = [self.sources.get_key(source_id) for source_id in self.source_ids[group_rows]]
+            destination = set.union(*[self.destinations[row] for row in group_rows])
+
+            raw_policy = (policy_type, sources, destination, specifics)
+        else:
+            policy_type, _, specifics, source = self.get_key(first_row)
+            destination = set(self.destinations[first_row])
+            raw_policy = (policy_type, [source], destination, specifics)
+
+        return raw_policy
+
+    def get_policy(self, status=None, group=False):
+        raw_policy = self.get_raw_policy(status=status, group=group)
+        policy = Policy.get_policy(raw_policy[0], raw_policy[1], [raw_policy[2]], raw_policy[3])
+        return policy
+
+    def get_all_policies(self, status=None):
+        if not self.init:
+            return list()
+
+        policies = list()
+        for row in self.get_rows(status=status):
+            policy_type, _, specifics, source = self.get_key(row)
+            policies.append(Policy.get_policy(policy_type, [source], list(self.destinations[row]), specifics))
+        return policies
+
+    def get_query(self, environment, group=False):
+        policy_type, sources, destinations, specifics = self.get_raw_policy(status=PolicyStatus.UNKNOWN, group=group)
+        query = Query(policy_type, sources, destinations, specifics, environment, negate=False)
+        return query
+
+    def get_source_counts(self, status=None):
+        if not self.init:
+            return None
+
+        # the counts are maintained on every status change, the counters must not be modified by the caller
+        if status:
+            return {self.subnets.get_key(subnet_id): counts
+                    for subnet_id, counts in self.source_counts[STATUS_CODES[status]].items()}
+
+        counts = defaultdict(Counter)
+        for status_counts in self.source_counts.values():
+            for subnet_id, subnet_counts in status_counts.items():
+                counts[self.subnets.get_key(subnet_id)].update(subnet_counts)
+        return dict(counts)
+
+    def trim_policies(self, k_connected_pairs):
+        # all unknown policies that depend on the connectivity between the source and the destination router
+        rows = self.get_rows(status=PolicyStatus.UNKNOWN)
+        rows = rows[self.types[rows] != PolicyType.Isolation.value]
+
+        dst_routers = self.dst_router_ids[rows]
+        assert np.all(dst_routers >= 0), "There is more than one router connected to this subnet"
+
+        source_routers = np.array([self.routers.get_id(source.router) for source in self.sources.keys],
+                                  dtype=np.int64)
+        src_routers = source_routers[self.source_ids[rows]]
+
+        # symmetric adjacency matrix of the k-connected router pairs
+        pairs = np.array([(self.routers.get_id(router1), self.routers.get_id(router2))
+                          for router1, router2 in k_connected_pairs], dtype=np.int64).reshape(-1, 2)
+        connected = np.zeros((len(self.routers), len(self.routers)), dtype=bool)
+        connected[pairs[:, 0], pairs[:, 1]] = True
+        connected[pairs[:, 1], pairs[:, 0]] = True
+
+        trimmed_rows = rows[~connected[src_routers, dst_routers]]
+        self.set_status(trimmed_rows, STATUS_CODES[PolicyStatus.HOLDSNOT])
+
+        types, counts = np.unique(self.types[trimmed_rows], return_counts=True)
+        self.trim_counts = Counter({PolicyType(int(ptype)): int(count) for ptype, count in zip(types, counts)})
+
+        return len(trimmed_rows)
+
+    def create_checkpoint(self):
+        self.tmp_state = self.status[:self.size].copy()
+
+    def restore_checkpoint(self):
+        # rows added after the checkpoint was created are reset to unknown
+        status = np.full(self.size, STATUS_CODES[PolicyStatus.UNKNOWN], dtype=self.tmp_state.dtype)
+        num_rows = min(len(self.tmp_state), self.size)
+        status[:num_rows] = self.tmp_state[:num_rows]
+
+        for code in STATUS_CODES.values():
+            self.set_status(np.flatnonzero(status == code), code)
+
+    def periodic_save(self):
+        if self.checkpoint_path and time.time() - self.last_checkpoint >= self.checkpoint_interval:
+            self.save(self.checkpoint_path)
+
+    def save(self, file_path):
+        """
+        Writes the full state of the db to a compressed .npz file. The file is replaced atomically, such that a crash
+        while writing never destroys the previous checkpoint.
+        """
+        start_time = time.time()
+
+        # destinations of all rows in CSR format
+        destinations = KeyRegistry()
+        destination_ids = [destinations.get_id(destination)
+                           for row in range(self.size) for destination in sorted(self.destinations[row])]
+        destination_ptr = np.cumsum([0] + [len(self.destinations[row]) for row in range(self.size)])
+
+        meta = {
+            "init": self.init,
+            "previous_size": self.previous_size,
+            "subnets": [str(subnet) for subnet in self.subnets.keys],
+            "specifics": self.specifics.keys,
+            "sources": [source.router for source in self.sources.keys],
+            "destinations": [(destination.router, getattr(destination.interface, "name", destination.interface),
+                              str(destination.subnet)) for destination in destinations.keys],
+            "samples": self.environments.get_all_samples(),
+        }
+
+        tmp_path = "{}.tmp".format(file_path)
+        with open(tmp_path, "wb") as outfile:
+            np.savez_compressed(outfile,
+                                meta=np.array(json.dumps(meta)),
+                                types=self.types[:self.size],
+                                subnet_ids=self.subnet_ids[:self.size],
+                                specifics_ids=self.specifics_ids[:self.size],
+                                source_ids=self.source_ids[:self.size],
+                                status=self.status[:self.size],
+                                destination_ptr=destination_ptr,
+                                destination_ids=np.array(destination_ids, dtype=np.int32),
+                                environments=self.environments.bits[:self.size])
+            outfile.flush()
+            os.fsync(outfile.fileno())
+        os.replace(tmp_path, file_path)
+
+        self.last_checkpoint = time.time()
+        self.logger.debug("Saved {num_policies} policies to {path} in {time:.4f}s.".format(
+            num_policies=self.size, path=file_path, time=self.last_checkpoint - start_time))
+
+    def load(self, file_path):
+        """
+        Restores the state of the db from a file written by save().
+        """
+        with np.load(file_path) as data:
+            meta = json.loads(str(data["meta"]))
+            arrays = {name: data[name] for name in data.files if name != "meta"}
+
+        # registries
+        self.subnets = KeyRegistry()
+        for subnet in meta["subnets"]:
+            self.subnets.get_id(IPv4Network(subnet))
+        self.specifics = KeyRegistry()
+        for specifics in meta["specifics"]:
+            self.specifics.get_id(specifics)
+        self.sources = KeyRegistry()
+        for router in meta["sources"]:
+            self.sources.get_id(PolicySource(router))
+        self.groups = KeyRegistry()
+        self.routers = KeyRegistry()
+        self.destination_subnet_ids = dict()
+        self.source_ids_by_id = dict()
+
+        all_destinations = [PolicyDestination(router, interface, IPv4Network(subnet))
+                            for router, interface, subnet in meta["destinations"]]
+
+        # policies
+        size = len(arrays["types"])
+        self.size = 0
+        self.capacity = 0
+        self.reserve(size)
+        self.size = size
+
+        self.types[:size] = arrays["types"]
+        self.subnet_ids[:size] = arrays["subnet_ids"]
+        self.specifics_ids[:size] = arrays["specifics_ids"]
+        self.source_ids[:size] = arrays["source_ids"]
+        self.status[:size] = arrays["status"]
+
+        destination_ptr = arrays["destination_ptr"].tolist()
+        destination_ids = arrays["destination_ids"].tolist()
+        self.destinations = [{all_destinations[i] for i in destination_ids[destination_ptr[row]:destination_ptr[row + 1]]}
+                             for row in range(size)]
+
+        self.environments = SampleBitmap()
+        for sample in meta["samples"]:
+            self.environments.samples.get_id(tuple(sample) if isinstance(sample, list) else sample)
+        self.environments.bits = arrays["environments"].copy()
+        self.environments.reserve(self.capacity, len(self.environments.samples))
+
+        # rebuild all indexes
+        self.index = dict()
+        self.status_rows = {code: dict() for code in CODE_STATUS}
+        self.group_rows = list()
+        self.query_queue = dict()
+        self.source_counts = {code: dict() for code in CODE_STATUS}
+        self.index_rows(0, size)
+
+        self.init = meta["init"]
+        self.previous_size = meta["previous_size"]
+
+        self.logger.info("Loaded {num_policies} policies and {num_samples} samples from {path}.".format(
+            num_policies=size, num_samples=len(self.environments.samples), path=file_path))
+
+    def iter_chunks(self, status=None, policy_types=None, chunk_size=10000):
+        """
+        Yields the policies column-wise in chunks of at most chunk_size rows.
+        :param status: only policies with this status (e.g., PolicyStatus.HOLDS for the specification)
+        :param policy_types: only policies of these types
+        """
+        rows = self.get_rows(status=status)
+        if policy_types:
+            rows = rows[np.isin(self.types[rows], [ptype.value for ptype in policy_types])]
+
+        for start in range(0, len(rows), chunk_size):
+            chunk_rows = rows[start:start + chunk_size]
+            keys = [self.get_key(row) for row in chunk_rows]
+
+            yield {
+                "type": [policy_type.name for policy_type, _, _, _ in keys],
+                "subnet": [str(subnet) for _, subnet, _, _ in keys],
+                "specifics": [specifics for _, _, specifics, _ in keys],
+                "source": [source.router for _, _, _, source in keys],
+                "status": [CODE_STATUS[code].value for code in self.status[chunk_rows].tolist()],
+                "destinations": [sorted("{}:{}".format(dst.router, dst.interface) for dst in self.destinations[row])
+                                 for row in chunk_rows],
+                "environments": self.environments.count(chunk_rows).tolist(),
+            }
+
+    def export(self, file_path, status=None, policy_types=None, file_format=None, chunk_size=10000):
+        """
+        Streams the selected policies to a csv, jsonl, parquet or arrow file.
+        :return: number of exported policies
+        """
+        start_time = time.time()
+        num_policies = write_chunks(self.iter_chunks(status=status, policy_types=policy_types, chunk_size=chunk_size),
+                                    file_path, file_format=file_format)
+        self.logger.debug("Exported {num_policies} policies to {path} in {time:.4f}s.".format(
+            num_policies=num_policies, path=file_path, time=time.time() - start_time))
+        return num_policies
+
+    def dump(self, file_path):
+        with open(file_path, "w", newline="") as outfile:
+            writer = csv.writer(outfile)
+            writer.writerow(self.keys + ["Status", "Environments", "Destinations", "Sources"])
+
+            for row in range(self.size):
+                policy_type, subnet, specifics, source = self.get_key(row)
+                writer.writerow([policy_type, subnet, specifics, source, CODE_STATUS[int(self.status[row])],
+                                 "{{{}}}".format(", ".join(str(env) for env in self.environments.get_samples([row]))),
+                                 "{{{}}}".format(", ".join(str(dst) for dst in self.destinations[row])),
+                                 source])
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# Author: Ruediger Birkner (Networked Systems Group at ETH Zurich)
+
+import csv
+import json
+import os
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pa = None
+
+# columns of an exported specification, every chunk is a dict of column name to list of values
+EXPORT_COLUMNS = ["type", "subnet", "specifics", "source", "status", "destinations", "environments"]
+
+EXPORT_FORMATS = {
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".json": "jsonl",
+    ".parquet": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+}
+
+
+def get_export_format(file_path, file_format=None):
+    if file_format is None:
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension not in EXPORT_FORMATS:
+            raise ValueError("Unknown export format for {path}, expected one of {extensions}.".format(
+                path=file_path, extensions=", ".join(sorted(EXPORT_FORMATS))))
+        file_format = EXPORT_FORMATS[extension]
+
+    if file_format not in EXPORT_FORMATS.values():
+        raise ValueError("Unknown export format: {}".format(file_format))
+
+    if file_format in ("parquet", "arrow") and pa is None:
+        raise ImportError("Exporting to {} requires pyarrow.".format(file_format))
+
+    return file_format
+
+
+def write_chunks(chunks, file_path, file_format=None):
+    """
+    Writes the chunks of policies to the file one chunk at a time, such that the whole specification never has to
+    be materialized.
+    :param chunks: iterable of dicts mapping each of the EXPORT_COLUMNS to a list of values
+    :param file_path: output file
+    :param file_format: csv, jsonl, parquet or arrow - inferred from the file extension if not given
+    :return: number of written policies
+    """
+    file_format = get_export_format(file_path, file_format=file_format)
+
+    if file_format == "csv":
+        return write_csv(chunks, file_path)
+    elif file_format == "jsonl":
+        return write_jsonl(chunks, file_path)
+    else:
+        return write_arrow(chunks, file_path, parquet=file_format == "parquet")
+
+
+def write_csv(chunks, file_path):
+    num_rows = 0
+    with open(file_path, "w", newline="") as outfile:
+        writer = csv.writer(outfile)
+        writer.writerow(EXPORT_COLUMNS)
+
+        for chunk in chunks:
+            chunk["destinations"] = [";".join(destinations) for destinations in chunk["destinations"]]
+            writer.writerows(zip(*[chunk[column] for column in EXPORT_COLUMNS]))
+            num_rows += len(chunk["type"])
+    return num_rows
+
+
+def write_jsonl(chunks, file_path):
+    num_rows = 0
+    with open(file_path, "w") as outfile:
+        for chunk in chunks:
+            for values in zip(*[chunk[column] for column in EXPORT_COLUMNS]):
+                outfile.write(json.dumps(dict(zip(EXPORT_COLUMNS, values))))
+                outfile.write("\n")
+            num_rows += len(chunk["type"])
+    return num_rows
+
+
+def write_arrow(chunks, file_path, parquet=True):
+    schema = pa.schema([
+        ("type", pa.string()),
+        ("subnet", pa.string()),
+        ("specifics", pa.string()),  # mixes the waypoint names and the number of paths
+        ("source", pa.string()),
+        ("status", pa.string()),
+        ("destinations", pa.list_(pa.string())),
+        ("environments", pa.int64()),
+    ])
+
+    num_rows = 0
+    if parquet:
+        writer = pa.parquet.ParquetWriter(file_path, schema)
+    else:
+        writer = pa.ipc.new_file(file_path, schema)
+
+    try:
+        for chunk in chunks:
+            chunk["specifics"] = [str(specifics) for specifics in chunk["specifics"]]
+            table = pa.Table.from_pydict(chunk, schema=schema)
+            writer.write_table(table)
+            num_rows += table.num_rows
+    finally:
+        writer.close()
+    return num_rows
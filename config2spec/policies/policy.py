@@ -35,8 +35,30 @@ class PolicyType(Enum):
 
 
 class PolicySource(object):
-    def __init__(self, router):
-        self.router = router
+    """
+    Sources are interned: there is exactly one object per router, which carries a stable small integer id. The id
+    serves as hash and equality is identity.
+    """
+    instances = dict()  # router -> source
+    by_id = list()  # id -> source
+
+    def __new__(cls, router):
+        source = cls.instances.get(router)
+        if source is None:
+            source = super(PolicySource, cls).__new__(cls)
+            source.router = router
+            source.id = len(cls.by_id)
+            cls.instances[router] = source
+            cls.by_id.append(source)
+        return source
+
+    def __reduce__(self):
+        # unpickled and copied sources are interned again
+        return PolicySource, (self.router, )
+
+    @classmethod
+    def from_id(cls, source_id):
+        return cls.by_id[source_id]
 
     def __str__(self):
         return self.router
@@ -62,20 +84,40 @@ class PolicySource(object):
         return NotImplemented
 
     def __eq__(self, other):
-        if type(other) == PolicySource:
-            return self.router == other.router
-        else:
-            return False
+        return self is other
 
     def __hash__(self):
-        return hash(self.__str__())
+        return self.id
 
 
 class PolicyDestination(object):
-    def __init__(self, router, interface, subnet):
-        self.router = router
-        self.interface = interface
-        self.subnet = subnet
+    """
+    Destinations are interned just like the sources: one object with a stable small integer id per router, interface
+    and subnet.
+    """
+    instances = dict()  # (router, interface, subnet) -> destination
+    by_id = list()  # id -> destination
+
+    def __new__(cls, router, interface, subnet):
+        key = (router, interface, subnet)
+        destination = cls.instances.get(key)
+        if destination is None:
+            destination = super(PolicyDestination, cls).__new__(cls)
+            destination.router = router
+            destination.interface = interface
+            destination.subnet = subnet
+            destination.id = len(cls.by_id)
+            cls.instances[key] = destination
+            cls.by_id.append(destination)
+        return destination
+
+    def __reduce__(self):
+        # unpickled and copied destinations are interned again
+        return PolicyDestination, (self.router, self.interface, self.subnet)
+
+    @classmethod
+    def from_id(cls, destination_id):
+        return cls.by_id[destination_id]
 
     def __str__(self):
         return "{router}:{interface} ({subnet})".format(
@@ -102,13 +144,10 @@ class PolicyDestination(object):
         return NotImplemented
 
     def __eq__(self, other):
-        if type(other) == PolicyDestination:
-            return self.router == other.router and self.interface == other.interface and self.subnet == other.subnet
-        else:
-            return False
+        return self is other
 
     def __hash__(self):
-        return hash(self.__str__())
+        return self.id
 
 
 class Policy(object):
@@ -149,6 +188,10 @@ class Policy(object):
             policy = WaypointPolicy(sources, destinations, waypoints=specifics)
         elif policy_type == PolicyType.LoadBalancingSimple:
             policy = LoadBalancingPolicy(sources, destinations, num_paths=specifics)
+        elif policy_type == PolicyType.LoadBalancingEdgeDisjoint:
+            policy = LoadBalancingPolicy(sources, destinations, num_paths=specifics, name="edgedisjointlb")
+        elif policy_type == PolicyType.LoadBalancingNodeDisjoint:
+            policy = LoadBalancingPolicy(sources, destinations, num_paths=specifics, name="nodedisjointlb")
         else:
             policy = None
         return policy
@@ -160,8 +203,8 @@ class ReachabilityPolicy(Policy):
 
 
 class LoadBalancingPolicy(Policy):
-    def __init__(self, sources, destinations, num_paths):
-        super(LoadBalancingPolicy, self).__init__("loadbalancing", sources, destinations)
+    def __init__(self, sources, destinations, num_paths, name="loadbalancing"):
+        super(LoadBalancingPolicy, self).__init__(name, sources, destinations)
         self.num_paths = num_paths
 
     def __str__(self):
@@ -8,6 +8,7 @@ import pandas as pd
 
 from config2spec.backend.query import Query
 
+from config2spec.policies.export import write_chunks
 from config2spec.policies.policy import Policy
 from config2spec.policies.policy import PolicyType
 from config2spec.policies.policy_guesser import PolicyGuesser
@@ -22,24 +23,30 @@ class PolicyStatus(Enum):
 
 
 class PolicyDB(object):
-    def __init__(self, network, waypoints=None, debug=False):
+    def __init__(self, network, waypoints=None, debug=False, edge_disjoint=False, node_disjoint=False):
         # initialize logging
         self.debug = debug
         self.logger = get_logger("PolicyDB", "DEBUG" if debug else "INFO")
 
         self.init = False
 
-        self.policy_guesser = PolicyGuesser(network, waypoints=waypoints, debug=debug)
+        self.policy_guesser = PolicyGuesser(network, waypoints=waypoints, edge_disjoint=edge_disjoint,
+                                            node_disjoint=node_disjoint, debug=debug)
         self.keys = ["type", "subnet", "specifics", "source"]
 
         self.policies = None  # dataframe with the columns - type, src, dst, specifics, policy status, environments
         self.previous_size = -1  # stores the size of the current policy guess
 
+        self.trim_counts = Counter()  # number of trimmed policies per policy type
+
         self.tmp_state = None
 
-    def update_policies(self, sample, forwarding_graphs, dominator_graphs, node_local_reachability=False):
+    def update_policies(self, sample, forwarding_graphs, dominator_graphs, node_local_reachability=False,
+                        changed_subnets=None):
         # get the policy guess
-        policies = self.policy_guesser.get_policies(forwarding_graphs, dominator_graphs, node_local_reachability=node_local_reachability)
+        policies = self.policy_guesser.get_policies(forwarding_graphs, dominator_graphs,
+                                                    node_local_reachability=node_local_reachability,
+                                                    changed_subnets=changed_subnets)
         change, previous_size = self.update_policies2(policies, sample)
         return change, previous_size
 
@@ -204,6 +211,7 @@ class PolicyDB(object):
 
     def trim_policies(self, k_connected_pairs):
         policy_count = 0
+        self.trim_counts = Counter()
 
         policies = self.policies[self.policies["Status"] == PolicyStatus.UNKNOWN]
         for row in policies.iterrows():
@@ -228,6 +236,7 @@ class PolicyDB(object):
 
                 if pair not in k_connected_pairs:
                     self.policies.at[index, "Status"] = PolicyStatus.HOLDSNOT
+                    self.trim_counts[policy_type] += 1
                     policy_count += 1
 
         return policy_count
@@ -238,5 +247,34 @@ class PolicyDB(object):
     def restore_checkpoint(self):
         self.policies["Status"] = self.tmp_state
 
+    def iter_chunks(self, status=None, policy_types=None, chunk_size=10000):
+        if not self.init:
+            return
+
+        policies = self.policies
+        if status:
+            policies = policies[policies["Status"] == status]
+        if policy_types:
+            policies = policies[policies.index.get_level_values("type").isin(policy_types)]
+
+        for start in range(0, len(policies), chunk_size):
+            chunk = policies.iloc[start:start + chunk_size]
+            keys = chunk.index.tolist()
+
+            yield {
+                "type": [policy_type.name for policy_type, _, _, _ in keys],
+                "subnet": [str(subnet) for _, subnet, _, _ in keys],
+                "specifics": [specifics for _, _, specifics, _ in keys],
+                "source": [source.router for _, _, _, source in keys],
+                "status": [status.value for status in chunk["Status"]],
+                "destinations": [sorted("{}:{}".format(dst.router, dst.interface) for dst in destinations)
+                                 for destinations in chunk["Destinations"]],
+                "environments": [len(envs) for envs in chunk["Environments"]],
+            }
+
+    def export(self, file_path, status=None, policy_types=None, file_format=None, chunk_size=10000):
+        return write_chunks(self.iter_chunks(status=status, policy_types=policy_types, chunk_size=chunk_size),
+                            file_path, file_format=file_format)
+
     def dump(self, file_path):
         self.policies.to_csv(file_path, index=True)
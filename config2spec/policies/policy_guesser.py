@@ -3,18 +3,20 @@
 
 import time
 
-import networkx as nx
+from collections import deque
 
+from config2spec.dataplane.dominators import DominatorTree
+from config2spec.dataplane.paths import DisjointPaths
+from config2spec.dataplane.paths import count_paths
 from config2spec.policies.policy import PolicyDestination
 from config2spec.policies.policy import PolicySource
 from config2spec.policies.policy import PolicyType
-from config2spec.topology.links import Link
 
 from config2spec.utils.logger import get_logger
 
 
 class PolicyGuesser(object):
-    def __init__(self, network, waypoints=None, debug=False):
+    def __init__(self, network, waypoints=None, edge_disjoint=False, node_disjoint=False, debug=False):
 
         # initialize logging
         self.debug = debug
@@ -28,16 +30,52 @@ class PolicyGuesser(object):
             waypoints = list()
         self.waypoints = waypoints
 
-    def get_policies(self, forwarding_graphs, dominator_graphs, node_local_reachability=False):
+        # also guess loadbalancing policies over edge- and node-disjoint paths
+        self.edge_disjoint = edge_disjoint
+        self.node_disjoint = node_disjoint
+
+        # policies of the previous guess per subnet
+        self.subnet_policies = dict()
+        self.node_local_reachability = None
+
+        # parts of the policies that only depend on the forwarding graph, shared by all subnets with identical
+        # forwarding graphs and only kept for a single guess
+        self.templates = dict()
+
+        # destinations of every subnet, shared by all policy types and only kept for a single guess
+        self.destination_index = dict()
+
+        # subnets of the last guess whose forwarding graph contains a loop, mapped to the nodes of the loop
+        self.forwarding_loops = dict()
+
+    def get_policies(self, forwarding_graphs, dominator_graphs, node_local_reachability=False, changed_subnets=None):
+        """
+        :param changed_subnets: subnets whose forwarding changed since the previous call, the policies of all other
+        subnets are taken from the previous guess. If None, the policies of all subnets are computed.
+        """
+        if changed_subnets is None or node_local_reachability != self.node_local_reachability:
+            self.subnet_policies = dict()
+            changed_subnets = set()
+        self.node_local_reachability = node_local_reachability
+
+        # the dominator graphs are built lazily, hence only the ones of the subnets to recompute are looked up
+        all_dominator_graphs = dominator_graphs
+        dominator_graphs = {subnet: all_dominator_graphs[subnet] for subnet in all_dominator_graphs
+                            if subnet not in self.subnet_policies or subnet in changed_subnets}
+
         # a policy is a tuple of (PolicyType, Destination, Specifics, Source)
         policies = list()
+        self.templates = dict()
+        self.destination_index = dict()
+        self.forwarding_loops = dict()
 
         # get reachability/isolation policies
         self.get_reachability_policies(policies, forwarding_graphs, dominator_graphs, node_local_reachability=node_local_reachability)
         num_reachability = len(policies)
 
         # get loadbalancing policies
-        self.get_loadbalancing_policies(policies, forwarding_graphs, dominator_graphs, node_local_reachability=node_local_reachability)
+        self.get_loadbalancing_policies(policies, forwarding_graphs, dominator_graphs, node_local_reachability=node_local_reachability,
+                                        edge_disjoint=self.edge_disjoint, node_disjoint=self.node_disjoint)
         num_loadbalancing = len(policies) - num_reachability
 
         # get waypoint policies
@@ -48,12 +86,24 @@ class PolicyGuesser(object):
 
         if self.debug:
             self.logger.debug(
-                "Found {num_policies} policies: {num_reachability} reachability/isolation, "
+                "Found {num_policies} policies for {num_subnets} subnets: {num_reachability} reachability/isolation, "
                 "{num_loadbalancing} loadbalancing, and {num_waypoints} waypoints.".format(
-                    num_policies=len(policies), num_reachability=num_reachability,
+                    num_policies=len(policies), num_subnets=len(dominator_graphs), num_reachability=num_reachability,
                     num_loadbalancing=num_loadbalancing, num_waypoints=num_waypoints))
+            self.logger.debug("Used {num_templates} templates for {num_subnets} subnets.".format(
+                num_templates=len(self.templates), num_subnets=len(dominator_graphs)))
+        self.templates = dict()
+        self.destination_index = dict()
 
-        return policies
+        # update the policies of the recomputed subnets and drop the ones of subnets which are gone
+        for subnet in dominator_graphs:
+            self.subnet_policies[subnet] = list()
+        for policy in policies:
+            self.subnet_policies[policy[1].subnet].append(policy)
+        for subnet in [subnet for subnet in self.subnet_policies if subnet not in all_dominator_graphs]:
+            del self.subnet_policies[subnet]
+
+        return [policy for subnet in all_dominator_graphs for policy in self.subnet_policies[subnet]]
 
     def get_reachability_policies(self, policies, forwarding_graphs, dominator_graphs, node_local_reachability=False):
 
@@ -63,7 +113,7 @@ class PolicyGuesser(object):
         start_time = time.time()
         for subnet, graph in dominator_graphs.items():
 
-            all_destinations, destinations, dst_routers = self.get_destination_interfaces_for_subnet(subnet, forwarding_graphs[subnet])
+            all_destinations, destinations, dst_routers = self.get_destination_interfaces_for_subnet(subnet, forwarding_graphs)
 
             # only use router specific subnets (e.g., subnets that are connected at a single interface, such as loopback
             # and host subnets). This removes all subnet that just exist between two routers (usually /31)
@@ -106,7 +156,7 @@ class PolicyGuesser(object):
 
         start_time = time.time()
         for subnet, graph in dominator_graphs.items():
-            all_destinations, destinations, dst_routers = self.get_destination_interfaces_for_subnet(subnet, forwarding_graphs[subnet])
+            all_destinations, destinations, dst_routers = self.get_destination_interfaces_for_subnet(subnet, forwarding_graphs)
 
             # TODO how to deal with Loadbalancing to same prefix, but last hop is different router?!
             # only use router specific subnets (e.g., subnets that are connected at a single interface, such as loopback
@@ -128,60 +178,63 @@ class PolicyGuesser(object):
 
                 policy_source = PolicySource(node)
 
-                all_paths = list(nx.all_simple_paths(forwarding_graphs[subnet], node, "sink"))
+                # the number of paths only depends on the forwarding graph
+                template = self.get_template(subnet, forwarding_graphs)
+                if "num_paths" not in template:
+                    template["num_paths"], template["loops"] = count_paths(forwarding_graphs[subnet], "sink")
+                    if template["loops"]:
+                        self.logger.warning("Forwarding loop for subnet {subnet} at {nodes}.".format(
+                            subnet=subnet, nodes=", ".join(sorted(template["loops"]))))
+                if template["loops"]:
+                    self.forwarding_loops[subnet] = template["loops"]
+                num_paths = template["num_paths"].get(node, 0)
 
                 # only continue if there is more than one path available
-                if len(all_paths) > 1:
+                if num_paths > 1:
                     # simple loadbalancing, more than a single path
                     if simple:
-                        policies.append((PolicyType.LoadBalancingSimple, policy_destination, len(all_paths), policy_source))
+                        policies.append((PolicyType.LoadBalancingSimple, policy_destination, num_paths, policy_source))
 
-                    # edge disjoint loadbalancing
+                    # all paths share the last hop to the sink, hence the disjoint paths are counted up to the
+                    # destination router. They are computed with a max-flow on a residual graph that is shared by all
+                    # sources of the same forwarding graph.
                     if edge_disjoint:
-                        edge_disjoint_paths = list()
-                        edge_union = set()
-                        for path in all_paths:
-                            edges = set([Link.get_name(path[i], path[i + 1]) for i in range(len(path)-1)])
-
-                            if not edge_union.intersection(edges):
-                                edge_union.union(edges)
-                                edge_disjoint_paths.append(path)
-
-                        if len(edge_disjoint_paths) > 1:
-                            self.logger.debug("There are {num_paths} edge-disjoint paths from {src} to {dst}.".format(
-                                num_paths=len(edge_disjoint_paths), src=node, dst=dst_router))
+                        num_disjoint_paths = self.get_disjoint_paths(
+                            template, "edge_disjoint", forwarding_graphs[subnet], dst_router).get(node)
+                        if num_disjoint_paths > 1:
+                            policies.append((PolicyType.LoadBalancingEdgeDisjoint, policy_destination,
+                                             num_disjoint_paths, policy_source))
 
-                            # TODO add policies
-
-                    # node disjoint loadbalancing
                     if node_disjoint:
-                        node_disjoint_paths = list()
-                        node_union = set()
-                        for path in all_paths:
-                            # need to remove the source and destination as all the paths will have them in common
-                            nodes = set(path[1:-1])
-
-                            if not node_union.intersection(nodes):
-                                node_union.union(nodes)
-                                node_disjoint_paths.append(path)
-
-                        if len(node_disjoint_paths) > 1:
-                            self.logger.debug("There are {num_paths} node-disjoint paths from {src} to {dst}.".format(
-                                 num_paths=len(node_disjoint_paths), src=node, dst=dst_router))
-
-                            # TODO add policies
+                        num_disjoint_paths = self.get_disjoint_paths(
+                            template, "node_disjoint", forwarding_graphs[subnet], dst_router).get(node)
+                        if num_disjoint_paths > 1:
+                            policies.append((PolicyType.LoadBalancingNodeDisjoint, policy_destination,
+                                             num_disjoint_paths, policy_source))
 
         self.logger.debug("Getting the loadbalancing policies from the forwarding graphs took {time:.4f}s.".format(
             time=time.time()-start_time, ))
 
         return policies
 
+    def get_disjoint_paths(self, template, disjointness, forwarding_graph, dst_router):
+        """
+        :param disjointness: either "edge_disjoint" or "node_disjoint"
+        :return: DisjointPaths to the destination router, shared by all subnets with identical forwarding graphs
+        """
+        if disjointness not in template:
+            template[disjointness] = dict()
+        if dst_router not in template[disjointness]:
+            template[disjointness][dst_router] = DisjointPaths(forwarding_graph, dst_router,
+                                                               node_disjoint=disjointness == "node_disjoint")
+        return template[disjointness][dst_router]
+
     def get_waypoint_policies(self, policies, forwarding_graphs, dominator_graphs, node_local_reachability=False):
 
         start_time = time.time()
         for subnet, graph in dominator_graphs.items():
 
-            all_destinations, destinations, dst_routers = self.get_destination_interfaces_for_subnet(subnet, forwarding_graphs[subnet])
+            all_destinations, destinations, dst_routers = self.get_destination_interfaces_for_subnet(subnet, forwarding_graphs)
 
             # TODO how to deal with Loadbalancing to same prefix, but last hop is different router?!
             # only use router specific subnets (e.g., subnets that are connected at a single interface, such as loopback
@@ -189,42 +242,82 @@ class PolicyGuesser(object):
             if len(all_destinations) > 1:
                 continue
 
-            for waypoint in self.waypoints:
-                if waypoint in graph:
-                    candidates = [waypoint]
-                    sources = [PolicySource(waypoint)]
-
-                    while candidates:
-                        current_node = candidates.pop()
-                        if current_node not in graph:
-                            self.logger.error(
-                                "Node {node} is not in the dominator graph for subnet {subnet}.".format(
-                                    node=current_node, subnet=subnet))
-                            break
-                        predecessors = list(graph.predecessors(current_node))
+            # the nodes behind a waypoint only depend on the dominator graph, which is the same for identical
+            # forwarding graphs
+            template = self.get_template(subnet, forwarding_graphs)
+            if "waypoint_sources" not in template:
+                template["waypoint_sources"] = self.get_waypoint_sources(DominatorTree.from_graph(graph))
 
-                        candidates.extend(predecessors)
-                        for predecessor in predecessors:
-
-                            # prevent policies within a single router (e.g., r1 can reach r1:loopback0)
-                            if not (not node_local_reachability and predecessor in dst_routers):
-                                sources.append(PolicySource(predecessor))
-
-                    for source in sources:
-                        if source.router not in dst_routers:
-                            for policy_destination in destinations[source.router]:
-                                policies.append((PolicyType.Waypoint, policy_destination, waypoint, source))
+            for source, waypoint in template["waypoint_sources"]:
+                # prevent policies within a single router (e.g., r1 can reach r1:loopback0)
+                if source.router not in dst_routers:
+                    for policy_destination in destinations[source.router]:
+                        policies.append((PolicyType.Waypoint, policy_destination, waypoint, source))
 
         self.logger.debug("Getting the waypoint policies from dominator and forwarding graph took {time:.4f}s.".format(
             time=time.time()-start_time, ))
 
         return policies
 
-    def get_destination_interfaces_for_subnet(self, subnet, forwarding_graph):
+    def get_waypoint_sources(self, dominator_tree):
+        """
+        Finds the sources of the policies of all waypoints in a single pass over the Euler tour of the dominator tree:
+        the waypoints that dominate a node are the ones whose range contains it.
+        :return: list of (PolicySource, waypoint) tuples of each waypoint and every node it dominates, including itself
+        """
+        waypoints = set(self.waypoints)
+        waypoint_sources = list()
+
+        # waypoints whose range contains the current position, the innermost on top
+        active_waypoints = list()
+        for position, node in enumerate(dominator_tree.order):
+            while active_waypoints and dominator_tree.exit[active_waypoints[-1]] <= position:
+                active_waypoints.pop()
+            if node in waypoints:
+                active_waypoints.append(node)
+
+            if active_waypoints:
+                source = PolicySource(node)
+                for waypoint in active_waypoints:
+                    waypoint_sources.append((source, waypoint))
+
+        return waypoint_sources
+
+    def get_template(self, subnet, forwarding_graphs):
+        """
+        :return: dict of the parts of the policies that only depend on the forwarding graph of the subnet, it is the
+        same dict for all subnets with identical forwarding graphs
+        """
+        if hasattr(forwarding_graphs, "get_fingerprint"):
+            key = forwarding_graphs.get_fingerprint(subnet)
+        else:
+            key = subnet
+
+        if key not in self.templates:
+            self.templates[key] = dict()
+        return self.templates[key]
+
+    def get_destination_interfaces_for_subnet(self, subnet, forwarding_graphs):
+        """
+        :return: all destinations of the subnet, dict mapping each node to the destinations it forwards to, and the
+        destination routers. It is computed once per subnet and guess, and shared by all policy types.
+        """
+        if subnet not in self.destination_index:
+            self.destination_index[subnet] = self.build_destination_index(subnet, forwarding_graphs)
+        return self.destination_index[subnet]
+
+    def build_destination_index(self, subnet, forwarding_graphs):
         dst_routers = set()  # all routers that are directly connected to the sink
         all_destinations = set()
         destinations = dict()
 
+        forwarding_graph = forwarding_graphs[subnet]
+
+        # all nodes that forward to the destination routers only depend on the forwarding graph
+        template = self.get_template(subnet, forwarding_graphs)
+        if "sources" not in template:
+            template["sources"] = self.get_sources(forwarding_graph)
+
         interfaces = list()
         for router in forwarding_graph.predecessors("sink"):
             interfaces.extend(self.network.get_interfaces_for_subnet(router, subnet))
@@ -234,10 +327,35 @@ class PolicyGuesser(object):
             policy_destination = PolicyDestination(dst_router, dst_interface, subnet)
             all_destinations.add(policy_destination)
 
-            for node, _ in nx.single_target_shortest_path_length(forwarding_graph, dst_router):
+            for node in template["sources"].get(dst_router, list()):
                 if node not in destinations:
                     destinations[node] = [policy_destination]
                 else:
                     destinations[node].append(policy_destination)
 
         return all_destinations, destinations, dst_routers
+
+    @staticmethod
+    def get_sources(forwarding_graph):
+        """
+        Finds the nodes that forward to each router connected to the sink with a single traversal of the reversed
+        forwarding graph from all of these routers at once. Every node is labeled with a bitmask of the routers it
+        reaches, it is only visited again if its label grows.
+        :return: dict mapping each router connected to the sink to the list of nodes that forward to it (including the
+        router itself)
+        """
+        dst_routers = list(forwarding_graph.predecessors("sink"))
+        labels = {router: 1 << i for i, router in enumerate(dst_routers)}
+
+        queue = deque(dst_routers)
+        while queue:
+            node = queue.popleft()
+            label = labels[node]
+            for predecessor in forwarding_graph.predecessors(node):
+                predecessor_label = labels.get(predecessor, 0)
+                if predecessor_label | label != predecessor_label:
+                    labels[predecessor] = predecessor_label | label
+                    queue.append(predecessor)
+
+        return {router: [node for node, label in labels.items() if label >> i & 1]
+                for i, router in enumerate(dst_routers)}
@@ -169,11 +169,12 @@ class SamplingOnly(object):
 
         if concrete_env:
             failed_edges = concrete_env.get_links(state=LinkState.DOWN)
-            fib_file_name = self.ms_manager.get_dataplane(failed_edges)
-            if fib_file_name:
-                forwarding_graphs = self.dp_engine.get_forwarding_graphs(fib_file_name)
-                dominator_graphs = self.dp_engine.get_dominator_graphs()
-                _, guess_size = self.policy_db.update_policies(9, forwarding_graphs, dominator_graphs)
+
+            sample_graphs = self.dp_engine.get_sample_graphs(failed_edges, self.ms_manager)
+            if sample_graphs is not None:
+                sample, forwarding_graphs, dominator_graphs, changed_subnets = sample_graphs
+                _, guess_size = self.policy_db.update_policies(sample, forwarding_graphs, dominator_graphs,
+                                                               changed_subnets=changed_subnets)
                 failure = False
 
                 self.prev_forwarding_graphs = forwarding_graphs
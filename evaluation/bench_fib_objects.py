@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# Author: Ruediger Birkner (Networked Systems Group at ETH Zurich)
+
+import argparse
+import gc
+import glob
+import os
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from ipaddress import IPv4Network
+
+from pytricia import PyTricia
+
+from evaluation.bench_fib_parser import get_next_hops
+from evaluation.bench_fib_parser import write_synthetic_fib
+from evaluation.utils.logger import get_logger
+
+from config2spec.dataplane.batfish_engine import BatfishEngine
+from config2spec.dataplane.fecs import EquivalenceClass
+from config2spec.dataplane.fecs import compute_fec_ranges
+from config2spec.dataplane.fib import ForwardingTable
+from config2spec.utils.logger import get_logger as get_c2s_logger
+
+
+class LegacyForwardingTable(object):
+    """
+    The forwarding table as it was before the slim objects, kept as the baseline for the benchmark.
+    """
+    def __init__(self):
+        self.logger = get_c2s_logger('FECFinder', 'INFO')
+        self.fib = PyTricia()
+
+    def add_entry(self, prefix, interface, route_type, next_hop):
+        fwd_entry = LegacyForwardingTableEntry(prefix, interface, route_type, next_hop)
+
+        if self.fib.has_key(prefix):
+            self.fib[prefix].append(fwd_entry)
+        else:
+            self.fib[prefix] = [fwd_entry]
+
+
+class LegacyForwardingTableEntry(object):
+    def __init__(self, prefix, interface, route_type, next_hop):
+        self.prefix = prefix
+        self.interface = interface
+        self.route_type = route_type
+        self.next_hop = next_hop
+
+
+class LegacyEquivalenceClass(object):
+    def __init__(self):
+        self.logger = get_c2s_logger('EquivalenceClass', 'INFO')
+        self.first = None
+        self.last = None
+        self.max_length = 32
+        self.current = 0
+
+    def add_range(self, first, last):
+        self.first = first
+        self.last = last
+
+
+def build_objects(tables, prefixes, table_class, fec_class):
+    """
+    Builds the forwarding tables and FECs of a sample the same way as BatfishEngine.read_fib_file().
+    """
+    networks = {(address, prefixlen): IPv4Network((address, prefixlen)) for address, prefixlen in prefixes.tolist()}
+
+    fibs = defaultdict(table_class)
+    for router, table in tables.items():
+        fib = fibs[router]
+        for address, prefixlen, interface, route_type, next_hop in table.entries():
+            fib.add_entry(networks[(address, prefixlen)], interface, route_type, next_hop)
+
+    fecs = list()
+    for first, last in zip(*[addresses.tolist() for addresses in compute_fec_ranges(prefixes)]):
+        fec = fec_class()
+        fec.add_range(first, last)
+        fecs.append(fec)
+
+    return fibs, fecs
+
+
+def measure(tables, prefixes, table_class, fec_class, repetitions):
+    """
+    :return: the fastest time to build the objects and the memory they occupy in bytes
+    """
+    times = list()
+    for _ in range(repetitions):
+        start_time = time.time()
+        build_objects(tables, prefixes, table_class, fec_class)
+        times.append(time.time() - start_time)
+
+    gc.collect()
+    tracemalloc.start()
+    snapshot = tracemalloc.take_snapshot()
+    result = build_objects(tables, prefixes, table_class, fec_class)
+    memory = sum(stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(snapshot, "filename"))
+    tracemalloc.stop()
+    del result
+
+    return min(times), memory
+
+
+''' main '''
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('scenarios', help='scenario directory, the number of routers is taken from its configs',
+                        nargs='?', default="scenarios")
+    parser.add_argument('-p', '--prefixes_per_router', help='number of prefixes per router in the synthetic FIB',
+                        type=int, default=10)
+    parser.add_argument('-r', '--repetitions', help='number of runs per scenario', type=int, default=3)
+    args = parser.parse_args()
+
+    logger = get_logger("FIBObjectsBenchmark", 'INFO')
+
+    # the scenarios only contain configs, hence the FIBs are generated for a network of the same size
+    config_dirs = sorted(os.path.dirname(path) for path in glob.glob(os.path.join(args.scenarios, "**", "configs", ""),
+                                                                    recursive=True))
+
+    tmp_dir = tempfile.TemporaryDirectory()
+    for config_dir in config_dirs:
+        num_routers = len(os.listdir(config_dir))
+        if num_routers == 0:
+            continue
+
+        fib_file = os.path.join(tmp_dir.name, "fib.txt")
+        write_synthetic_fib(fib_file, num_routers, num_routers * args.prefixes_per_router, 8006)
+
+        next_hops = get_next_hops(fib_file)
+        engine = BatfishEngine(list(next_hops.keys()), next_hops, None, tmp_dir.name)
+        tables, prefixes = engine.fib_parser.parse(fib_file)
+
+        legacy_time, legacy_memory = measure(tables, prefixes, LegacyForwardingTable, LegacyEquivalenceClass,
+                                             args.repetitions)
+        slim_time, slim_memory = measure(tables, prefixes, ForwardingTable, EquivalenceClass, args.repetitions)
+
+        logger.info("{scenario} ({routers} routers, {fecs} FECs): legacy {legacy_time:.3f}s {legacy_memory:.1f}MB, "
+                    "slim {slim_time:.3f}s ({speedup:.2f}x) {slim_memory:.1f}MB ({saving:.0%} less)".format(
+                        scenario=os.path.dirname(config_dir), routers=num_routers, fecs=len(prefixes),
+                        legacy_time=legacy_time, legacy_memory=legacy_memory / 2 ** 20,
+                        slim_time=slim_time, speedup=legacy_time / slim_time, slim_memory=slim_memory / 2 ** 20,
+                        saving=1 - slim_memory / legacy_memory))
+
+    tmp_dir.cleanup()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# Author: Ruediger Birkner (Networked Systems Group at ETH Zurich)
+
+import argparse
+import glob
+import os
+import random
+import re
+import tempfile
+import time
+from collections import defaultdict
+from ipaddress import IPv4Network
+
+from evaluation.utils.logger import get_logger
+
+from config2spec.dataplane.batfish_engine import BatfishEngine
+from config2spec.dataplane.fecs import FECFinder
+from config2spec.dataplane.fib import ForwardingTable
+
+
+def legacy_read_fib_file(fib_file, next_hops, vrf="default"):
+    """
+    The FIB parser as it was before the bulk parser, kept as the baseline for the benchmark.
+    """
+    fec_finder = FECFinder()
+    fibs = defaultdict(ForwardingTable)
+
+    with open(fib_file, "r") as infile:
+        router = "unknown"
+        current_vrf = "unknown"
+
+        for line in infile:
+            line = line.strip()
+
+            if line.startswith("# "):
+                router_match = re.match("^# Router:([a-zA-Z0-9\\-_&]+)$", line)
+                router = router_match.group(1) if router_match else "unknown"
+
+            elif line.startswith("## "):
+                vrf_match = re.match("^## VRF:([a-zA-Z0-9\\-]+)$", line)
+                current_vrf = vrf_match.group(1) if vrf_match else "unknown"
+
+            elif current_vrf == vrf:
+                raw_prefix, interface, route_type = line.split(';')
+
+                prefix = IPv4Network(raw_prefix)
+                fec_finder.insert_prefix(prefix)
+
+                if route_type == "ConnectedRoute":
+                    next_hop = "sink"
+                elif interface == "null_interface":
+                    continue
+                elif router in next_hops and interface in next_hops[router]:
+                    next_hop = next_hops[router][interface]
+                else:
+                    next_hop = "external"
+
+                fibs[router].add_entry(prefix, interface, route_type, next_hop)
+
+    fecs = fec_finder.get_all_fecs()
+
+    return fibs, fecs
+
+
+def get_next_hops(fib_file):
+    """
+    Without the topology, every interface of a router is mapped to a next hop of its own.
+    """
+    next_hops = defaultdict(dict)
+    router = "unknown"
+    with open(fib_file, "r") as infile:
+        for line in infile:
+            line = line.strip()
+            if line.startswith("# Router:"):
+                router = line[len("# Router:"):]
+            elif line and not line.startswith("#"):
+                interface = line.split(";")[1]
+                next_hops[router][interface] = "{}-{}".format(router, interface)
+    return next_hops
+
+
+def write_synthetic_fib(fib_file, num_routers, num_prefixes, seed):
+    rand = random.Random(seed)
+    prefixes = ["10.{}.{}.0/24".format(i // 256, i % 256) for i in range(num_prefixes)]
+    prefixes += ["172.16.{}.0/31".format(i) for i in range(min(num_routers, 256))]
+
+    with open(fib_file, "w") as outfile:
+        for r in range(num_routers):
+            outfile.write("# Router:r{}\n## VRF:default\n".format(r))
+            for i, prefix in enumerate(prefixes):
+                if i % num_routers == r:
+                    outfile.write("{};Loopback0;ConnectedRoute\n".format(prefix))
+                else:
+                    for interface in rand.sample(range(4), rand.randint(1, 2)):
+                        outfile.write("{};GigabitEthernet0/{};OspfRoute\n".format(prefix, interface))
+
+
+def compare(legacy_result, result, routers):
+    legacy_fibs, legacy_fecs = legacy_result
+    fibs, fecs = result
+
+    assert sorted((fec.first, fec.last) for fec in legacy_fecs) == sorted((fec.first, fec.last) for fec in fecs)
+    for router in routers:
+        for fec in fecs:
+            prefix = fec.get_prefix()
+            assert sorted(legacy_fibs[router].get_next_hop(prefix)) == sorted(fibs[router].get_next_hop(prefix))
+
+
+''' main '''
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('paths', help='FIB files or scenario directories with a fibs folder', nargs='*')
+    parser.add_argument('-s', '--synthetic', help='number of prefixes of a synthetic FIB file to add', type=int,
+                        default=5000)
+    parser.add_argument('-n', '--num_routers', help='number of routers in the synthetic FIB file', type=int,
+                        default=40)
+    parser.add_argument('-r', '--repetitions', help='number of runs per file', type=int, default=3)
+    parser.add_argument('-c', '--check', help='check that both parsers produce the same result', action='store_true')
+    args = parser.parse_args()
+
+    logger = get_logger("FIBParserBenchmark", 'INFO')
+
+    fib_files = list()
+    for path in args.paths:
+        if os.path.isdir(path):
+            fib_files.extend(sorted(glob.glob(os.path.join(path, "**", "fibs", "*"), recursive=True)))
+        else:
+            fib_files.append(path)
+
+    tmp_dir = tempfile.TemporaryDirectory()
+    if args.synthetic:
+        synthetic_file = os.path.join(tmp_dir.name, "fib-synthetic.txt")
+        write_synthetic_fib(synthetic_file, args.num_routers, args.synthetic, 8006)
+        fib_files.append(synthetic_file)
+
+    for fib_file in fib_files:
+        next_hops = get_next_hops(fib_file)
+        engine = BatfishEngine(list(next_hops.keys()), next_hops, None, os.path.dirname(fib_file))
+
+        legacy_times = list()
+        parse_times = list()
+        times = list()
+        for _ in range(args.repetitions):
+            start_time = time.time()
+            legacy_result = legacy_read_fib_file(fib_file, next_hops)
+            legacy_times.append(time.time() - start_time)
+
+            # only the parsing into array forwarding tables
+            start_time = time.time()
+            engine.fib_parser.parse(fib_file)
+            parse_times.append(time.time() - start_time)
+
+            # parsing including the forwarding tables and FECs
+            start_time = time.time()
+            result = engine.read_fib_file(fib_file)
+            times.append(time.time() - start_time)
+
+        if args.check:
+            compare(legacy_result, result, next_hops.keys())
+
+        logger.info("{file}: legacy {legacy:.3f}s, bulk parse {parse:.3f}s ({parse_speedup:.1f}x), "
+                    "bulk read_fib_file {bulk:.3f}s ({speedup:.1f}x)".format(
+                        file=fib_file, legacy=min(legacy_times), parse=min(parse_times),
+                        parse_speedup=min(legacy_times) / min(parse_times), bulk=min(times),
+                        speedup=min(legacy_times) / min(times)))
+
+    tmp_dir.cleanup()
@@ -43,21 +43,26 @@ class VerificationStats(object):
 
 
 class TrimmingStats(object):
-    def __init__(self, ttime, num_trimmed, num_verified, num_violated, num_unknown):
+    def __init__(self, ttime, num_trimmed, num_verified, num_violated, num_unknown, trim_counts=None):
         self.time = ttime
         self.num_trimmed = num_trimmed
         self.num_verified = num_verified
         self.num_violated = num_violated
         self.num_unknown = num_unknown
+        self.trim_counts = trim_counts if trim_counts else dict()  # number of trimmed policies per policy type
 
     @staticmethod
     def get_heading():
-        return "Num Trimmed, Num Verified, Num Violated, Num Unknown, Time,"
+        return "Num Trimmed, Num Verified, Num Violated, Num Unknown, Time, Trimmed per Type,"
 
     def __str__(self):
-        return "TR: {size}, {nver}, {nvio}, {nunk}, {time}".format(size=self.num_trimmed, nver=self.num_verified,
-                                                                   nvio=self.num_violated, nunk=self.num_unknown,
-                                                                   time=self.time)
+        trim_counts = "; ".join("{ptype}: {count}".format(ptype=ptype.name, count=count)
+                                for ptype, count in sorted(self.trim_counts.items()))
+        return "TR: {size}, {nver}, {nvio}, {nunk}, {time}, {types}".format(size=self.num_trimmed,
+                                                                            nver=self.num_verified,
+                                                                            nvio=self.num_violated,
+                                                                            nunk=self.num_unknown,
+                                                                            time=self.time, types=trim_counts)
 
 
 class SwitchStats(object):
@@ -162,8 +167,11 @@ class Pipeline(object):
         # pick the concrete env to use
         if first:
             concrete_env = self.sampler.get_all_up()
-        elif self.sampler.fwd_state_based:
+        elif self.sampler.fwd_state_based and self.prev_forwarding_graphs is not None:
             concrete_env = self.sampler.get_next_env(self.prev_forwarding_graphs)
+        elif self.sampler.fwd_state_based:
+            # after resuming, there are no forwarding graphs of a previous sample to base the choice on
+            concrete_env = self.sampler.get_next_unused_env()
         else:
             concrete_env = self.sampler.get_next_env()
 
@@ -174,12 +182,12 @@ class Pipeline(object):
 
         if concrete_env:
             failed_edges = concrete_env.get_links(state=LinkState.DOWN)
-            fib_file_name = self.ms_manager.get_dataplane(failed_edges)
-            if fib_file_name:
-                forwarding_graphs = self.dp_engine.get_forwarding_graphs(fib_file_name)
-                dominator_graphs = self.dp_engine.get_dominator_graphs()
 
-                _, guess_size = self.policy_db.update_policies(9, forwarding_graphs, dominator_graphs)
+            sample_graphs = self.dp_engine.get_sample_graphs(failed_edges, self.ms_manager)
+            if sample_graphs is not None:
+                sample, forwarding_graphs, dominator_graphs, changed_subnets = sample_graphs
+                _, guess_size = self.policy_db.update_policies(sample, forwarding_graphs, dominator_graphs,
+                                                               changed_subnets=changed_subnets)
                 failure = False
 
                 self.prev_forwarding_graphs = forwarding_graphs
@@ -242,20 +250,29 @@ class Pipeline(object):
         num_violated = self.policy_db.num_policies(status=PolicyStatus.HOLDSNOT)
         num_unknown = self.policy_db.num_policies(status=PolicyStatus.UNKNOWN)
 
-        self.stats.append(TrimmingStats(trim_time, num_trimmed, num_verified, num_violated, num_unknown))
+        self.stats.append(TrimmingStats(trim_time, num_trimmed, num_verified, num_violated, num_unknown,
+                                        trim_counts=self.policy_db.trim_counts))
 
-    def run(self, trim_policies=False):
-        self.logger.info("Start running the pipeline by computing the first sample.")
+    def run(self, trim_policies=False, resumed=False):
+        """
+        :param resumed: the policy db was restored from a checkpoint, hence it already contains the samples of the
+        previous run (including the one with all links up) and sampling continues with the next unused one
+        """
+        if resumed:
+            self.logger.info("Resume running the pipeline with the restored policies.")
+        else:
+            self.logger.info("Start running the pipeline by computing the first sample.")
 
-        # start actual policy learning with a first sample - all links up
-        success = self.sample(first=True)
-        if not success:
-            self.logger.info("Dataplane sampling failed...")
-            return
+            # start actual policy learning with a first sample - all links up
+            success = self.sample(first=True)
+            if not success:
+                self.logger.info("Dataplane sampling failed...")
+                return
 
         self.logger.info("Running a couple of queries to init the verification timer.")
         # run enough queries to Minesweeper to match the window size of the timers
-        while not self.verification_times.full_window():
+        while not self.verification_times.full_window() and \
+                self.policy_db.num_policies(status=PolicyStatus.UNKNOWN) > 0:
             success = self.verify()
 
         self.logger.info("Starting the actual loop.")
@@ -15,6 +15,7 @@ from config2spec.netenv.random_set_sampler import RandomPolicySetSampler
 from config2spec.netenv.random_sampler import RandomSampler
 from config2spec.netenv.set_sampler import PolicySetSampler
 from config2spec.netenv.sum_sampler import PolicySumSampler
+from config2spec.policies.array_policy_db import ArrayPolicyDB
 from config2spec.policies.policy_db import PolicyDB
 from config2spec.topology.builder.minesweeper_builder import BackendTopologyBuilder
 from config2spec.topology.links import Link
@@ -62,11 +63,12 @@ def build_network(backend, scenario_path, max_failures, waypoints_min, waypoints
     return network, netenv, waypoints
 
 
-def init_dp_engine(network, fib_path, debug=False):
+def init_dp_engine(network, fib_path, debug=False, dataplane_cache=None, num_workers=1):
     nodes = list(network.nodes())
     next_hops = network.next_hops
     simple_acls = network.simple_acls
-    dp_engine = BatfishEngine(nodes, next_hops, simple_acls, fib_path, debug=debug)
+    dp_engine = BatfishEngine(nodes, next_hops, simple_acls, fib_path, dataplane_cache=dataplane_cache,
+                              num_workers=num_workers, debug=debug)
 
     return dp_engine
 
@@ -96,5 +98,12 @@ def get_sampler(sampling_mode, netenv, policy_db, seed):
     return sampler
 
 
-def get_policy_db(network, waypoints=None, debug=False):
-    return PolicyDB(network, waypoints=waypoints, debug=debug)
+def get_policy_db(network, waypoints=None, debug=False, db_mode="array", checkpoint_path=None, edge_disjoint=False,
+                  node_disjoint=False):
+    if db_mode == "pandas":
+        policy_db = PolicyDB(network, waypoints=waypoints, debug=debug, edge_disjoint=edge_disjoint,
+                             node_disjoint=node_disjoint)
+    else:
+        policy_db = ArrayPolicyDB(network, waypoints=waypoints, debug=debug, checkpoint_path=checkpoint_path,
+                                  edge_disjoint=edge_disjoint, node_disjoint=node_disjoint)
+    return policy_db
@@ -21,6 +21,7 @@ from config2spec.netenv.random_set_sampler import RandomPolicySetSampler
 from config2spec.netenv.random_sampler import RandomSampler
 from config2spec.netenv.set_sampler import PolicySetSampler
 from config2spec.netenv.sum_sampler import PolicySumSampler
+from config2spec.policies.array_policy_db import ArrayPolicyDB
 from config2spec.policies.policy_db import PolicyDB
 from config2spec.policies.policy_db import PolicyStatus
 from config2spec.topology.builder.minesweeper_builder import BackendTopologyBuilder
@@ -91,11 +92,12 @@ def build_network(backend, scenario_path, max_failures, waypoints_min, waypoints
     return network, netenv, waypoints
 
 
-def init_dp_engine(network, fib_path, debug=False):
+def init_dp_engine(network, fib_path, debug=False, dataplane_cache=None, num_workers=1):
     nodes = list(network.nodes())
     next_hops = network.next_hops
     simple_acls = network.simple_acls
-    dp_engine = BatfishEngine(nodes, next_hops, simple_acls, fib_path, debug=debug)
+    dp_engine = BatfishEngine(nodes, next_hops, simple_acls, fib_path, dataplane_cache=dataplane_cache,
+                              num_workers=num_workers, debug=debug)
 
     return dp_engine
 
@@ -125,8 +127,15 @@ def get_sampler(sampling_mode, netenv, policy_db, seed):
     return sampler
 
 
-def get_policy_db(network, waypoints=None, debug=False):
-    return PolicyDB(network, waypoints=waypoints, debug=debug)
+def get_policy_db(network, waypoints=None, debug=False, db_mode="array", checkpoint_path=None, edge_disjoint=False,
+                  node_disjoint=False):
+    if db_mode == "pandas":
+        policy_db = PolicyDB(network, waypoints=waypoints, debug=debug, edge_disjoint=edge_disjoint,
+                             node_disjoint=node_disjoint)
+    else:
+        policy_db = ArrayPolicyDB(network, waypoints=waypoints, debug=debug, checkpoint_path=checkpoint_path,
+                                  edge_disjoint=edge_disjoint, node_disjoint=node_disjoint)
+    return policy_db
 
 
 class SlidingTimer(object):
@@ -198,8 +207,11 @@ class Pipeline(object):
         # pick the concrete env to use
         if first:
             concrete_env = self.sampler.get_all_up()
-        elif self.sampler.fwd_state_based:
+        elif self.sampler.fwd_state_based and self.prev_forwarding_graphs is not None:
             concrete_env = self.sampler.get_next_env(self.prev_forwarding_graphs)
+        elif self.sampler.fwd_state_based:
+            # after resuming, there are no forwarding graphs of a previous sample to base the choice on
+            concrete_env = self.sampler.get_next_unused_env()
         else:
             concrete_env = self.sampler.get_next_env()
 
@@ -208,12 +220,12 @@ class Pipeline(object):
 
         if concrete_env:
             failed_edges = concrete_env.get_links(state=LinkState.DOWN)
-            fib_file_name = self.ms_manager.get_dataplane(failed_edges)
-            if fib_file_name:
-                forwarding_graphs = self.dp_engine.get_forwarding_graphs(fib_file_name)
-                dominator_graphs = self.dp_engine.get_dominator_graphs()
 
-                _, guess_size = self.policy_db.update_policies(9, forwarding_graphs, dominator_graphs)
+            sample_graphs = self.dp_engine.get_sample_graphs(failed_edges, self.ms_manager)
+            if sample_graphs is not None:
+                sample, forwarding_graphs, dominator_graphs, changed_subnets = sample_graphs
+                _, guess_size = self.policy_db.update_policies(sample, forwarding_graphs, dominator_graphs,
+                                                               changed_subnets=changed_subnets)
 
                 self.prev_forwarding_graphs = forwarding_graphs
                 if self.prev_guess_size >= 0:
@@ -265,20 +277,30 @@ class Pipeline(object):
     def trim(self):
         connected_pairs = self.network.get_k_connected_routers(self.netenv.k_failures + 1)
         num_trimmed_policies = self.policy_db.trim_policies(connected_pairs)
-        self.logger.debug("Trim: trimmed {} policies".format(num_trimmed_policies))
-
-    def run(self, trim_policies=False):
-        self.logger.info("Start running the pipeline by computing the first sample.")
+        self.logger.debug("Trim: trimmed {} policies ({})".format(
+            num_trimmed_policies, ", ".join("{}: {}".format(ptype.name, count)
+                                            for ptype, count in sorted(self.policy_db.trim_counts.items()))))
+
+    def run(self, trim_policies=False, resumed=False):
+        """
+        :param resumed: the policy db was restored from a checkpoint, hence it already contains the samples of the
+        previous run (including the one with all links up) and sampling continues with the next unused one
+        """
+        if resumed:
+            self.logger.info("Resume running the pipeline with the restored policies.")
+        else:
+            self.logger.info("Start running the pipeline by computing the first sample.")
 
-        # start actual policy learning with a first sample - all links up
-        success = self.sample(first=True)
-        if not success:
-            self.logger.error("Dataplane sampling failed...")
-            return
+            # start actual policy learning with a first sample - all links up
+            success = self.sample(first=True)
+            if not success:
+                self.logger.error("Dataplane sampling failed...")
+                return
 
         self.logger.info("Running a couple of queries to init the verification timer.")
         # run enough queries to Minesweeper to match the window size of the timers
-        while not self.verification_times.full_window():
+        while not self.verification_times.full_window() and \
+                self.policy_db.num_policies(status=PolicyStatus.UNKNOWN) > 0:
             success = self.verify()
 
         self.logger.info("Starting the actual loop.")
@@ -12,6 +12,9 @@ from helper import init_backend
 from helper import init_dp_engine
 from helper import init_manager
 from helper import Pipeline
+from config2spec.dataplane.dataplane_cache import DataplaneCache
+from config2spec.dataplane.dataplane_cache import hash_configs
+from config2spec.policies.export import get_export_format
 from config2spec.policies.policy_db import PolicyStatus
 
 ''' main '''
@@ -24,8 +27,31 @@ if __name__ == '__main__':
     parser.add_argument('-d', '--debug', help='enable debug output', action='store_true')
     parser.add_argument('-bd', '--backend_debug', help='enable debug output for the backend', action='store_true')
     parser.add_argument('-mf', '--max_failures', help='maximum amount of failures to allow', type=int)
+    parser.add_argument('-db', '--policy_db', help='policy database implementation (array or pandas)', type=str,
+                        choices=['array', 'pandas'], default='array')
+    parser.add_argument('-cp', '--checkpoint', help='periodically store the policy database to this file', type=str)
+    parser.add_argument('-r', '--resume', help='resume from the checkpoint file', action='store_true')
+    parser.add_argument('-e', '--export', help='export the specification to this file (.csv, .jsonl, .parquet or '
+                                               '.arrow)', type=str)
+    parser.add_argument('-dc', '--dataplane_cache', help='directory to cache the parsed dataplanes in across runs',
+                        type=str)
+    parser.add_argument('-dcs', '--dataplane_cache_size', help='maximum size of the dataplane cache in MB', type=int,
+                        default=1024)
+    parser.add_argument('-w', '--workers', help='number of worker processes to compute the dataplane graphs', type=int,
+                        default=1)
+    parser.add_argument('-ed', '--edge_disjoint', help='also mine load balancing over edge-disjoint paths',
+                        action='store_true')
+    parser.add_argument('-nd', '--node_disjoint', help='also mine load balancing over node-disjoint paths',
+                        action='store_true')
     args = parser.parse_args()
 
+    # check the export format before running the whole pipeline
+    if args.export:
+        try:
+            get_export_format(args.export)
+        except (ValueError, ImportError) as e:
+            parser.error(str(e))
+
     # init logger
     debug = args.debug
     logger = get_logger("Config2Spec", 'DEBUG' if debug else 'INFO')
@@ -67,25 +93,55 @@ if __name__ == '__main__':
     # initialize all the data structures
     network, netenv, waypoints = build_network(ms_manager.backend, scenario_path, max_failures,
                                                waypoints_min, waypoints_fraction)
-    dp_engine = init_dp_engine(network, fib_path, debug=args.debug)
+    dataplane_cache = None
+    if args.dataplane_cache:
+        dataplane_cache = DataplaneCache(args.dataplane_cache, hash_configs(config_path),
+                                         max_size=args.dataplane_cache_size << 20, debug=debug)
+    dp_engine = init_dp_engine(network, fib_path, debug=args.debug, dataplane_cache=dataplane_cache,
+                               num_workers=args.workers)
 
     # init policy Database
-    policy_db = get_policy_db(network, waypoints=waypoints, debug=debug)
+    if (args.checkpoint or args.resume) and args.policy_db != 'array':
+        parser.error('checkpoints are only supported by the array policy database')
+    if args.resume and not (args.checkpoint and os.path.isfile(args.checkpoint)):
+        parser.error('cannot resume without an existing checkpoint file')
+
+    policy_db = get_policy_db(network, waypoints=waypoints, debug=debug, db_mode=args.policy_db,
+                              checkpoint_path=args.checkpoint, edge_disjoint=args.edge_disjoint,
+                              node_disjoint=args.node_disjoint)
 
     # get sampler
     sampler = get_sampler(sampling_mode, netenv, policy_db, seed)
 
+    # continue where the previous run stopped: skip all the samples that are already in the policy database
+    if args.resume:
+        policy_db.load(args.checkpoint)
+        num_used = sampler.use_failed_links(policy_db.environments.get_all_samples())
+        logger.info('Resumed from {} with {} samples already used.'.format(args.checkpoint, num_used))
+
     # run Config2Spec pipeline
     pipeline = Pipeline(policy_db, sampler, dp_engine, netenv, ms_manager, window_size, network, debug)
-    pipeline.run(trim_policies=trimming)
+    pipeline.run(trim_policies=trimming, resumed=args.resume)
 
-    # completely kill Minesweeper
+    # completely kill Minesweeper and stop the workers
     ms_manager.stop(0, force_stop=True)
+    dp_engine.close()
+
+    # keep the final state such that a later run can resume from it
+    if args.checkpoint:
+        policy_db.save(args.checkpoint)
 
     # store the specification
     dump_file = "policies.csv"
     dump_path = os.path.join(scenario_path, dump_file)
     policy_db.dump(dump_path)
 
+    if args.export:
+        policy_db.export(args.export, status=PolicyStatus.HOLDS)
+
+    if dataplane_cache:
+        logger.info('Dataplane cache: {hits} hits, {misses} misses and {evictions} evictions.'.format(
+            **dataplane_cache.get_statistics()))
+
     spec_size = policy_db.num_policies(status=PolicyStatus.HOLDS)
     logger.info('Done with everything - The specification consists of {} policies.'.format(spec_size))
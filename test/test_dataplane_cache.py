@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# Author: Ruediger Birkner (Networked Systems Group at ETH Zurich)
+
+import os
+import tempfile
+import unittest
+
+from config2spec.dataplane.batfish_engine import BatfishEngine
+from config2spec.dataplane.dataplane_cache import DataplaneCache
+from config2spec.dataplane.dataplane_cache import hash_configs
+from config2spec.topology.links import Link
+from config2spec.topology.links import LinkState
+
+
+FIB_FILE = """# Router:r1
+## VRF:default
+10.0.1.0/24;Loopback0;ConnectedRoute
+10.0.2.0/24;FastEthernet0/0;OspfRoute
+10.0.2.0/24;FastEthernet0/1;OspfRoute
+10.0.3.0/24;null_interface;StaticRoute
+# Router:r2
+## VRF:default
+10.0.1.0/24;FastEthernet0/0;OspfRoute
+10.0.2.0/24;Loopback0;ConnectedRoute
+# Router:r3
+## VRF:default
+10.0.1.0/24;FastEthernet0/0;OspfRoute
+"""
+
+
+class DummyManager(object):
+    def __init__(self, fib_file_name):
+        self.fib_file_name = fib_file_name
+        self.num_dataplanes = 0
+
+    def get_dataplane(self, failed_edges):
+        self.num_dataplanes += 1
+        return self.fib_file_name
+
+
+class DataplaneCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.tmp_dir.name, "fib.txt"), "w") as outfile:
+            outfile.write(FIB_FILE)
+
+        self.next_hops = {
+            "r1": {"FastEthernet0/0": "r2", "FastEthernet0/1": "r3"},
+            "r2": {"FastEthernet0/0": "r1"},
+            "r3": {"FastEthernet0/0": "r1"},
+        }
+
+        self.cache_path = os.path.join(self.tmp_dir.name, "cache")
+        self.cache = DataplaneCache(self.cache_path, "confighash")
+        self.engine = BatfishEngine(["r1", "r2", "r3"], self.next_hops, None, self.tmp_dir.name,
+                                    dataplane_cache=self.cache)
+
+        self.links = [Link("l0", ("r1", "r2"), LinkState.DOWN), Link("l1", ("r1", "r3"), LinkState.DOWN)]
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_hash_configs(self):
+        config_path = os.path.join(self.tmp_dir.name, "configs")
+        os.makedirs(config_path)
+        with open(os.path.join(config_path, "r1.cfg"), "w") as outfile:
+            outfile.write("hostname r1\n")
+        config_hash = hash_configs(config_path)
+
+        with open(os.path.join(config_path, "r1.cfg"), "a") as outfile:
+            outfile.write("interface Loopback0\n")
+        self.assertNotEqual(hash_configs(config_path), config_hash)
+
+    def test_get_key(self):
+        # the key only depends on the endpoints of the failed links, not on their names and order
+        renamed_links = [Link("l7", ("r3", "r1"), LinkState.DOWN), Link("l8", ("r2", "r1"), LinkState.DOWN)]
+        self.assertEqual(self.cache.get_key(self.links), self.cache.get_key(renamed_links))
+        self.assertNotEqual(self.cache.get_key(self.links), self.cache.get_key(self.links[:1]))
+        self.assertNotEqual(self.cache.get_key(self.links), self.cache.get_key(self.links, vrf="mgmt"))
+        self.assertNotEqual(self.cache.get_key(self.links),
+                            DataplaneCache(self.cache_path, "otherhash").get_key(self.links))
+
+    def test_put_get(self):
+        tables, prefixes = self.engine.fib_parser.parse(os.path.join(self.tmp_dir.name, "fib.txt"))
+
+        self.assertIsNone(self.cache.get(self.links))
+        self.cache.put(self.links, tables, prefixes)
+        cached_tables, cached_prefixes = self.cache.get(self.links)
+
+        self.assertEqual(cached_prefixes.tolist(), prefixes.tolist())
+        self.assertCountEqual(cached_tables.keys(), tables.keys())
+        for router, table in tables.items():
+            self.assertEqual(list(cached_tables[router].entries()), list(table.entries()))
+
+        self.assertEqual(self.cache.get_statistics(), {"hits": 1, "misses": 1, "evictions": 0, "hit_rate": 0.5})
+
+    def test_damaged_entry(self):
+        tables, prefixes = self.engine.fib_parser.parse(os.path.join(self.tmp_dir.name, "fib.txt"))
+        self.cache.put(self.links, tables, prefixes)
+
+        # a half-written entry counts as a miss and is removed
+        file_path = self.cache.get_file_path(self.cache.get_key(self.links))
+        with open(file_path, "rb") as infile:
+            data = infile.read()
+        with open(file_path, "wb") as outfile:
+            outfile.write(data[:len(data) // 2])
+
+        self.assertIsNone(self.cache.get(self.links))
+        self.assertFalse(os.path.exists(file_path))
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_cached_forwarding_graphs(self):
+        self.assertIsNone(self.engine.get_cached_forwarding_graphs(self.links))
+        forwarding_graphs = self.engine.get_forwarding_graphs("fib.txt", failed_links=self.links)
+        edges = {prefix: sorted(forwarding_graphs[prefix].edges) for prefix in forwarding_graphs}
+
+        # the cached dataplane does not need the FIB file anymore
+        os.remove(os.path.join(self.tmp_dir.name, "fib.txt"))
+        cached_graphs = self.engine.get_cached_forwarding_graphs(self.links)
+        self.assertEqual({prefix: sorted(cached_graphs[prefix].edges) for prefix in cached_graphs}, edges)
+
+    def test_get_sample_graphs(self):
+        ms_manager = DummyManager("fib.txt")
+
+        sample, forwarding_graphs, dominator_graphs, changed_subnets = self.engine.get_sample_graphs(self.links,
+                                                                                                     ms_manager)
+        self.assertEqual(sample, tuple(sorted(link.name for link in self.links)))
+        self.assertIsNone(changed_subnets)
+        self.assertEqual(set(dominator_graphs.keys()), set(forwarding_graphs.keys()))
+
+        # the repeated sample does not ask the backend again
+        _, _, _, changed_subnets = self.engine.get_sample_graphs(self.links, ms_manager)
+        self.assertEqual(ms_manager.num_dataplanes, 1)
+        self.assertEqual(changed_subnets, set())
+
+        self.assertIsNone(self.engine.get_sample_graphs(self.links[:1], DummyManager(None)))
+
+    def test_evict(self):
+        tables, prefixes = self.engine.fib_parser.parse(os.path.join(self.tmp_dir.name, "fib.txt"))
+        self.cache.max_size = 1
+
+        # the newest entry is always kept
+        self.cache.put(self.links, tables, prefixes)
+        self.cache.put(self.links[:1], tables, prefixes)
+        self.assertEqual(len(os.listdir(self.cache_path)), 1)
+        self.assertIsNone(self.cache.get(self.links))
+        self.assertIsNotNone(self.cache.get(self.links[:1]))
+        self.assertEqual(self.cache.evictions, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
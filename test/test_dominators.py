@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# Author: Ruediger Birkner (Networked Systems Group at ETH Zurich)
+
+import unittest
+
+import networkx as nx
+
+from config2spec.dataplane.dominators import DominatorGraphs
+from config2spec.dataplane.dominators import DominatorTree
+from config2spec.dataplane.dominators import immediate_dominators
+from config2spec.dataplane.forwarding_graphs import ForwardingGraphs
+
+
+class DominatorsTest(unittest.TestCase):
+    def setUp(self):
+        # loadbalancing from r4 over r2 and r3, r5 forwards in a loop with r6 and r6 is blackholed
+        graph1 = nx.DiGraph([("r1", "sink"), ("r2", "r1"), ("r3", "r1"), ("r4", "r2"), ("r4", "r3"), ("r5", "r4"),
+                             ("r5", "r6"), ("r6", "r5")])
+        graph1.add_node("r7")
+
+        # a loop without the sink
+        graph2 = nx.DiGraph([("r1", "r2"), ("r2", "r1")])
+
+        self.graphs = {"graph1": graph1, "graph2": graph2}
+        self.forwarding_graphs = ForwardingGraphs.from_graphs(self.graphs)
+        self.sink = self.forwarding_graphs.nodes.index("sink")
+
+    def get_parents(self):
+        return immediate_dominators(self.forwarding_graphs.graph_ptr, self.forwarding_graphs.srcs,
+                                    self.forwarding_graphs.dsts, [0, 1], len(self.forwarding_graphs.nodes), self.sink)
+
+    def test_immediate_dominators(self):
+        parents = self.get_parents()
+        nodes = self.forwarding_graphs.nodes
+
+        idoms = {nodes[node]: nodes[parent] for node, parent in enumerate(parents[0].tolist()) if parent >= 0}
+        self.assertEqual(idoms, {"sink": "sink", "r1": "sink", "r2": "r1", "r3": "r1", "r4": "r1", "r5": "r4",
+                                 "r6": "r5"})
+
+        # without the sink in the graph, not even the sink has a parent
+        self.assertTrue((parents[1] < 0).all())
+
+    def test_same_as_networkx(self):
+        parents = self.get_parents()
+        dominator_graphs = DominatorGraphs(self.forwarding_graphs.nodes, self.sink, {"graph1": 0}, {0: parents[0]})
+
+        dominators = set(nx.immediate_dominators(self.graphs["graph1"].reverse(copy=True), "sink").items())
+        dominators.remove(("sink", "sink"))
+
+        self.assertCountEqual(dominator_graphs["graph1"].edges, dominators)
+        self.assertNotIn("r7", dominator_graphs["graph1"])
+        self.assertNotIn("graph2", dominator_graphs)
+
+    def test_dominator_tree(self):
+        parents = self.get_parents()
+        dominator_graphs = DominatorGraphs(self.forwarding_graphs.nodes, self.sink, {"graph1": 0}, {0: parents[0]})
+        tree = DominatorTree.from_graph(dominator_graphs["graph1"])
+
+        self.assertEqual(len(tree), 7)
+        self.assertEqual(tree.order[0], "sink")
+        self.assertCountEqual(tree.get_dominated("r1"), ["r2", "r3", "r4", "r5", "r6"])
+        self.assertCountEqual(tree.get_dominated("r4"), ["r5", "r6"])
+        self.assertEqual(tree.get_dominated("r6"), list())
+
+        self.assertTrue(tree.dominates("r4", "r6"))
+        self.assertTrue(tree.dominates("r4", "r4"))
+        self.assertFalse(tree.dominates("r2", "r4"))
+        self.assertNotIn("r7", tree)
+
+
+if __name__ == "__main__":
+    unittest.main()
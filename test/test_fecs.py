@@ -6,6 +6,7 @@ import unittest
 from ipaddress import IPv4Network
 from ipaddress import IPv4Address
 
+from config2spec.dataplane.fecs import compute_fec_ranges
 from config2spec.dataplane.fecs import FECFinder
 from config2spec.dataplane.fecs import EquivalenceClass
 from config2spec.dataplane.fecs import DisjointECException
@@ -103,6 +104,35 @@ class FECTest(unittest.TestCase):
 
         self.assertCountEqual(all_fecs, fecs)
 
+    def test_compute_fec_ranges(self):
+        prefixes = [
+            "10.0.0.0/8",
+            "10.0.0.0/16",
+            "10.0.1.0/24",
+            "10.0.2.0/24",
+            "10.255.255.255/32",
+            "10.0.1.0/24",
+        ]
+
+        # the /16 is split into three parts by its two adjacent /24, the /8 ends right before the /32
+        starts_ends = [
+            (167772160, 167772415),
+            (167772416, 167772671),
+            (167772672, 167772927),
+            (167772928, 167837695),
+            (167837696, 184549374),
+            (184549375, 184549375),
+        ]
+
+        networks = [IPv4Network(prefix) for prefix in prefixes]
+        firsts, lasts = compute_fec_ranges([(int(prefix.network_address), prefix.prefixlen) for prefix in networks])
+
+        self.assertEqual(list(zip(firsts.tolist(), lasts.tolist())), starts_ends)
+
+        empty_firsts, empty_lasts = compute_fec_ranges([])
+        self.assertEqual(len(empty_firsts), 0)
+        self.assertEqual(len(empty_lasts), 0)
+
     def test_get_all_prefixes(self):
         prefixes = [
             IPv4Network("1.1.1.1/32"),
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# Author: Ruediger Birkner (Networked Systems Group at ETH Zurich)
+
+import os
+import tempfile
+import unittest
+
+from ipaddress import IPv4Network
+
+from config2spec.dataplane.batfish_engine import BatfishEngine
+from config2spec.dataplane.fib_parser import FIBParser
+from config2spec.dataplane.fib_parser import parse_prefix
+
+
+FIB_FILE = """# Router:r1
+## VRF:default
+10.0.1.0/24;Loopback0;ConnectedRoute
+10.0.2.0/24;FastEthernet0/0;OspfRoute
+10.0.2.0/24;FastEthernet0/1;OspfRoute
+10.0.3.0/24;null_interface;StaticRoute
+## VRF:mgmt
+192.168.0.0/16;FastEthernet1/0;StaticRoute
+# Router:r2
+## VRF:default
+10.0.1.0/24;FastEthernet0/0;OspfRoute
+10.0.2.0/24;Loopback0;ConnectedRoute
+"""
+
+
+class FIBParserTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.fib_file = os.path.join(self.tmp_dir.name, "fib.txt")
+        with open(self.fib_file, "w") as outfile:
+            outfile.write(FIB_FILE)
+
+        self.next_hops = {
+            "r1": {"FastEthernet0/0": "r2", "FastEthernet0/1": "r3"},
+            "r2": {"FastEthernet0/0": "r1"},
+        }
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_parse_prefix(self):
+        for raw_prefix in ["10.0.1.0/24", "0.0.0.0/0", "1.1.1.1/32", "64.57.18.192/29"]:
+            prefix = IPv4Network(raw_prefix)
+            self.assertEqual(parse_prefix(raw_prefix), (int(prefix.network_address), prefix.prefixlen))
+
+    def test_parse(self):
+        tables, prefixes = FIBParser(self.next_hops).parse(self.fib_file)
+
+        self.assertCountEqual(tables.keys(), ["r1", "r2"])
+
+        # the blackholed prefix is not part of the table, but it is a prefix for the FECs
+        self.assertEqual(len(tables["r1"]), 3)
+        self.assertEqual(tables["r1"].next_hops, ["sink", "r2", "r3"])
+        self.assertEqual(tables["r2"].next_hops, ["r1", "sink"])
+        self.assertEqual([tuple(prefix) for prefix in prefixes.tolist()],
+                         [parse_prefix("10.0.1.0/24"), parse_prefix("10.0.2.0/24"), parse_prefix("10.0.3.0/24")])
+
+    def test_parse_vrf(self):
+        tables, prefixes = FIBParser(self.next_hops).parse(self.fib_file, vrf="mgmt")
+
+        self.assertCountEqual(tables.keys(), ["r1"])
+        self.assertEqual(tables["r1"].next_hops, ["external"])
+        self.assertEqual(list(tables["r1"].entries())[0][:2], parse_prefix("192.168.0.0/16"))
+
+    def test_parse_vrfs(self):
+        dataplanes = FIBParser(self.next_hops).parse_vrfs(self.fib_file)
+        self.assertCountEqual(dataplanes.keys(), ["default", "mgmt"])
+
+        # the single pass yields the same tables as parsing each VRF on its own
+        for vrf, (tables, prefixes) in dataplanes.items():
+            vrf_tables, vrf_prefixes = FIBParser(self.next_hops).parse(self.fib_file, vrf=vrf)
+            self.assertEqual(prefixes.tolist(), vrf_prefixes.tolist())
+            self.assertEqual({router: list(table.entries()) for router, table in tables.items()},
+                             {router: list(table.entries()) for router, table in vrf_tables.items()})
+
+        self.assertCountEqual(FIBParser(self.next_hops).parse_vrfs(self.fib_file, vrfs=["mgmt"]).keys(), ["mgmt"])
+
+        tables, prefixes = FIBParser(self.next_hops).parse(self.fib_file, vrf="unknown")
+        self.assertEqual(tables, dict())
+        self.assertEqual(prefixes.shape, (0, 2))
+
+    def test_vrf_forwarding_graphs(self):
+        engine = BatfishEngine(["r1", "r2"], self.next_hops, None, self.tmp_dir.name)
+        vrf_graphs = engine.get_vrf_forwarding_graphs("fib.txt")
+
+        default_graphs = BatfishEngine(["r1", "r2"], self.next_hops, None, self.tmp_dir.name).get_forwarding_graphs(
+            "fib.txt")
+        self.assertCountEqual(vrf_graphs.vrfs, ["default", "mgmt"])
+        for prefix in default_graphs:
+            self.assertEqual(sorted(vrf_graphs["default", prefix].edges), sorted(default_graphs[prefix].edges))
+
+        mgmt_prefix = IPv4Network("192.168.0.0/16")
+        self.assertIn(("mgmt", mgmt_prefix), vrf_graphs)
+        self.assertNotIn(("default", mgmt_prefix), vrf_graphs)
+        self.assertEqual(list(vrf_graphs["mgmt", mgmt_prefix].edges), [("r1", "external")])
+        self.assertIsNone(engine.vrf_changed_subnets)
+
+        # the mgmt prefix leaves the network, hence it has no dominator graph
+        dominator_graphs = engine.get_vrf_dominator_graphs()
+        self.assertEqual(set(dominator_graphs.keys()), set(vrf_graphs.keys()) - {("mgmt", mgmt_prefix)})
+
+        # the second sample only reports the changed (vrf, prefix) pairs
+        engine.get_vrf_forwarding_graphs("fib.txt")
+        self.assertEqual(engine.vrf_changed_subnets, set())
+
+        # the prefixes of a VRF that disappeared are reported as changed
+        with open(os.path.join(self.tmp_dir.name, "fib-default.txt"), "w") as outfile:
+            outfile.write(FIB_FILE.replace("## VRF:mgmt\n192.168.0.0/16;FastEthernet1/0;StaticRoute\n", ""))
+        vrf_graphs = engine.get_vrf_forwarding_graphs("fib-default.txt")
+        self.assertEqual(vrf_graphs.vrfs, ["default"])
+        self.assertEqual(engine.vrf_changed_subnets, {("mgmt", mgmt_prefix)})
+
+    def test_read_fib_file(self):
+        engine = BatfishEngine(["r1", "r2"], self.next_hops, None, self.tmp_dir.name)
+        fibs, fecs = engine.read_fib_file(self.fib_file)
+
+        self.assertEqual(len(fecs), 3)
+        self.assertCountEqual(fibs["r1"].get_next_hop(IPv4Network("10.0.2.0/24")), ["r2", "r3"])
+        self.assertEqual(fibs["r2"].get_next_hop(IPv4Network("10.0.2.0/24")), ["sink"])
+        self.assertEqual(fibs["r1"].get_next_hop(IPv4Network("10.0.3.0/24")), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
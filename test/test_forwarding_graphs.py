@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# Author: Ruediger Birkner (Networked Systems Group at ETH Zurich)
+
+import os
+import tempfile
+import unittest
+
+from ipaddress import IPv4Network
+
+from pytricia import PyTricia
+
+from config2spec.dataplane import parallel
+from config2spec.dataplane.batfish_engine import BatfishEngine
+from config2spec.dataplane.forwarding_graphs import get_fec_prefix
+from config2spec.dataplane.fecs import EquivalenceClass
+
+
+FIB_FILE = """# Router:r1
+## VRF:default
+0.0.0.0/0;FastEthernet0/0;StaticRoute
+10.0.1.0/24;Loopback0;ConnectedRoute
+10.0.2.0/24;FastEthernet0/0;OspfRoute
+10.0.2.0/24;FastEthernet0/1;OspfRoute
+# Router:r2
+## VRF:default
+10.0.0.0/16;FastEthernet0/0;OspfRoute
+10.0.1.0/24;FastEthernet0/0;OspfRoute
+10.0.2.0/24;Loopback0;ConnectedRoute
+10.0.2.128/25;null_interface;StaticRoute
+# Router:r3
+## VRF:default
+10.0.1.0/24;FastEthernet0/0;OspfRoute
+10.0.1.0/24;FastEthernet0/1;OspfRoute
+10.0.2.0/24;FastEthernet0/0;OspfRoute
+"""
+
+# r1 no longer load balances 10.0.2.0/24 over r2 and r3
+CHANGED_FIB_FILE = FIB_FILE.replace("10.0.2.0/24;FastEthernet0/1;OspfRoute\n", "")
+
+
+class ForwardingGraphsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.tmp_dir.name, "fib.txt"), "w") as outfile:
+            outfile.write(FIB_FILE)
+        with open(os.path.join(self.tmp_dir.name, "fib-changed.txt"), "w") as outfile:
+            outfile.write(CHANGED_FIB_FILE)
+
+        next_hops = {
+            "r1": {"FastEthernet0/0": "r2", "FastEthernet0/1": "r3"},
+            "r2": {"FastEthernet0/0": "r1"},
+            "r3": {"FastEthernet0/0": "r1", "FastEthernet0/1": "r1"},
+        }
+
+        simple_acls = PyTricia()
+        simple_acls["10.0.1.0/24"] = [("r3", "r1")]
+
+        self.engine = BatfishEngine(["r1", "r2", "r3"], next_hops, simple_acls, self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def legacy_forwarding_graphs(self):
+        fibs, fecs = self.engine.read_fib_file(os.path.join(self.tmp_dir.name, "fib.txt"))
+
+        forwarding_graphs = dict()
+        for fec in fecs:
+            prefix = fec.get_prefix()
+            blocked_edges = self.engine.simple_acls[prefix] if prefix in self.engine.simple_acls else None
+            forwarding_graph = self.engine.build_forwarding_graph(prefix, blocked_edges, fibs)
+            if forwarding_graph.edges:
+                forwarding_graphs[prefix] = forwarding_graph
+        return forwarding_graphs
+
+    def test_get_fec_prefix(self):
+        for first, last in [(0, 0), (0, 255), (0, 6), (167772416, 167772927), (167772800, 4294967295)]:
+            fec = EquivalenceClass()
+            fec.add_range(first, last)
+            self.assertEqual(get_fec_prefix(first, last), fec.get_prefix())
+
+    def test_same_as_legacy(self):
+        legacy_graphs = self.legacy_forwarding_graphs()
+        forwarding_graphs = self.engine.get_forwarding_graphs("fib.txt")
+
+        self.assertCountEqual(forwarding_graphs.keys(), legacy_graphs.keys())
+        for prefix, legacy_graph in legacy_graphs.items():
+            self.assertCountEqual(forwarding_graphs[prefix].nodes, legacy_graph.nodes)
+            self.assertCountEqual(forwarding_graphs[prefix].edges, legacy_graph.edges)
+
+    def test_forwarding_graphs(self):
+        forwarding_graphs = self.engine.get_forwarding_graphs("fib.txt")
+
+        # the networkx graphs are only built when they are accessed
+        self.assertEqual(len(forwarding_graphs.graphs), 0)
+
+        subnet1 = IPv4Network("10.0.1.0/24")
+        self.assertIn(subnet1, forwarding_graphs)
+        self.assertCountEqual(forwarding_graphs[subnet1].edges, [("r1", "sink"), ("r2", "r1")])
+        self.assertEqual(len(forwarding_graphs.graphs), 1)
+
+        # the blackholed route at r2 is a FEC of its own, but r2 falls back to its connected /24
+        blackholed = IPv4Network("10.0.2.128/25")
+        self.assertCountEqual(forwarding_graphs[blackholed].edges,
+                              [("r1", "r2"), ("r1", "r3"), ("r2", "sink"), ("r3", "r1")])
+
+        srcs, dsts = forwarding_graphs.get_edges(IPv4Network("10.0.2.0/25"))
+        self.assertEqual(len(srcs), 4)
+        self.assertEqual(list(srcs), sorted(srcs))
+
+    def test_incremental_forwarding_graphs(self):
+        forwarding_graphs = self.engine.get_forwarding_graphs("fib.txt")
+        self.assertIsNone(self.engine.changed_subnets)
+
+        subnet1 = IPv4Network("10.0.1.0/24")
+        subnet2 = IPv4Network("10.0.2.0/25")
+        graph1 = forwarding_graphs[subnet1]
+        forwarding_graphs[subnet2]
+        self.engine.get_dominator_graphs()
+        dominator_graph1 = self.engine.dominator_graphs[subnet1]
+
+        changed_graphs = self.engine.get_forwarding_graphs("fib-changed.txt")
+        self.assertCountEqual(self.engine.changed_subnets, [subnet2, IPv4Network("10.0.2.128/25")])
+
+        # the graphs of unchanged FECs are taken over, the changed ones are rebuilt
+        self.assertIs(changed_graphs[subnet1], graph1)
+        self.assertNotIn(changed_graphs.get_fingerprint(subnet2), changed_graphs.graphs)
+        self.assertCountEqual(changed_graphs[subnet2].edges, [("r1", "r2"), ("r2", "sink"), ("r3", "r1")])
+
+        self.engine.get_dominator_graphs()
+        self.assertIs(self.engine.dominator_graphs[subnet1], dominator_graph1)
+
+    def test_deduplicate_forwarding_graphs(self):
+        forwarding_graphs = self.engine.get_forwarding_graphs("fib.txt")
+
+        subnet1 = IPv4Network("10.0.2.0/25")
+        subnet2 = IPv4Network("10.0.2.128/25")
+        graph_classes = forwarding_graphs.get_graph_classes()
+        self.assertIn([subnet1, subnet2], graph_classes.values())
+        self.assertEqual(len(graph_classes), 4)
+        self.assertEqual(forwarding_graphs.get_fingerprint(subnet1), forwarding_graphs.get_fingerprint(subnet2))
+
+        # identical forwarding graphs share their graph and the dominators are only computed once
+        self.assertIs(forwarding_graphs[subnet1], forwarding_graphs[subnet2])
+        dominator_graphs = self.engine.get_dominator_graphs()
+        self.assertIs(dominator_graphs[subnet1], dominator_graphs[subnet2])
+        self.assertEqual(self.engine.dedup_ratio, len(forwarding_graphs) / 4)
+
+    def test_memory_usage(self):
+        # only the graphs of the current sample are kept
+        for fib_file in ["fib.txt", "fib-changed.txt"] * 3:
+            forwarding_graphs = self.engine.get_forwarding_graphs(fib_file)
+            dominator_graphs = self.engine.get_dominator_graphs()
+            for subnet in dominator_graphs:
+                forwarding_graphs[subnet]
+                dominator_graphs[subnet]
+
+            # the two graphs without the sink have no dominator graph, hence they are never built
+            memory_usage = self.engine.get_memory_usage()
+            num_classes = len(forwarding_graphs.get_graph_classes())
+            self.assertEqual(memory_usage["forwarding_graphs"]["cached_graphs"], num_classes - 2)
+            self.assertEqual(memory_usage["dominator_graphs"]["cached_graphs"], num_classes - 2)
+            self.assertEqual(memory_usage["forwarding_graphs"]["array_bytes"],
+                             forwarding_graphs.srcs.nbytes * 2 + forwarding_graphs.graph_ptr.nbytes)
+
+    def test_bounded_graph_cache(self):
+        self.engine.max_cached_edges = 4
+        forwarding_graphs = self.engine.get_forwarding_graphs("fib.txt")
+
+        # graphs are rebuilt once they have been evicted
+        graph1 = forwarding_graphs[IPv4Network("10.0.1.0/24")]
+        graph2 = forwarding_graphs[IPv4Network("10.0.2.0/25")]
+        self.assertEqual(len(forwarding_graphs.graphs), 1)
+        self.assertEqual(forwarding_graphs.graphs.num_edges, 4)
+        self.assertIsNot(forwarding_graphs[IPv4Network("10.0.1.0/24")], graph1)
+        self.assertCountEqual(forwarding_graphs[IPv4Network("10.0.1.0/24")].edges, graph1.edges)
+        self.assertIsNot(forwarding_graphs[IPv4Network("10.0.2.0/25")], graph2)
+
+    def test_worker_pool(self):
+        self.check_worker_pool()
+
+    def test_worker_pool_without_shared_memory(self):
+        # before Python 3.8, the arrays are pickled instead of shared
+        shared_memory = parallel.shared_memory
+        parallel.shared_memory = None
+        try:
+            self.check_worker_pool()
+        finally:
+            parallel.shared_memory = shared_memory
+
+    def check_worker_pool(self):
+        forwarding_graphs = self.engine.get_forwarding_graphs("fib.txt")
+        dominator_graphs = self.engine.get_dominator_graphs()
+
+        engine = BatfishEngine(["r1", "r2", "r3"], self.engine.next_hops, self.engine.simple_acls, self.tmp_dir.name,
+                               num_workers=2)
+        try:
+            parallel_forwarding_graphs = engine.get_forwarding_graphs("fib.txt")
+            parallel_dominator_graphs = engine.get_dominator_graphs()
+        finally:
+            engine.close()
+
+        self.assertEqual(parallel_forwarding_graphs.prefixes, forwarding_graphs.prefixes)
+        self.assertEqual(parallel_forwarding_graphs.graph_ptr.tolist(), forwarding_graphs.graph_ptr.tolist())
+        self.assertEqual(parallel_forwarding_graphs.srcs.tolist(), forwarding_graphs.srcs.tolist())
+        self.assertEqual(parallel_forwarding_graphs.dsts.tolist(), forwarding_graphs.dsts.tolist())
+        for subnet in dominator_graphs:
+            self.assertEqual(parallel_dominator_graphs.get_parents(subnet).tolist(),
+                             dominator_graphs.get_parents(subnet).tolist())
+
+
+if __name__ == "__main__":
+    unittest.main()
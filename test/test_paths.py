@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# Author: Ruediger Birkner (Networked Systems Group at ETH Zurich)
+
+import random
+import unittest
+
+import networkx as nx
+
+from config2spec.dataplane.paths import DisjointPaths
+from config2spec.dataplane.paths import count_paths
+
+
+class PathsTest(unittest.TestCase):
+    def test_count_paths(self):
+        # loadbalancing from r4 over r2 and r3 and from r5 over r4 and r3, r6 is blackholed
+        graph = nx.DiGraph([("r1", "sink"), ("r2", "r1"), ("r3", "r1"), ("r4", "r2"), ("r4", "r3"), ("r5", "r4"),
+                            ("r5", "r3")])
+        graph.add_node("r6")
+
+        num_paths, loop_nodes = count_paths(graph)
+
+        self.assertEqual(num_paths, {"sink": 1, "r1": 1, "r2": 1, "r3": 1, "r4": 2, "r5": 3})
+        self.assertEqual(loop_nodes, set())
+
+    def test_count_paths_loop(self):
+        # r4 and r5 forward in a loop, but r5 can also reach the sink over r2, r6 forwards into the loop
+        graph = nx.DiGraph([("r1", "sink"), ("r2", "r1"), ("r3", "r1"), ("r4", "r3"), ("r4", "r5"), ("r5", "r4"),
+                            ("r5", "r2"), ("r6", "r5"), ("r7", "r8"), ("r8", "r7")])
+
+        num_paths, loop_nodes = count_paths(graph)
+
+        # the loop between r7 and r8 never reaches the sink
+        self.assertEqual(loop_nodes, {"r4", "r5"})
+        self.assertEqual(num_paths, {"sink": 1, "r1": 1, "r2": 1, "r3": 1, "r4": 2, "r5": 2, "r6": 2})
+
+    def test_no_target(self):
+        self.assertEqual(count_paths(nx.DiGraph([("r1", "r2")])), (dict(), set()))
+
+    def test_same_as_simple_paths(self):
+        rand = random.Random(8006)
+        for _ in range(200):
+            graph = nx.gnp_random_graph(8, 0.3, seed=rand.randint(0, 10000), directed=True)
+            graph = nx.relabel_nodes(graph, {0: "sink"})
+
+            num_paths, _ = count_paths(graph)
+            for node in graph.nodes():
+                if node != "sink":
+                    self.assertEqual(num_paths.get(node, 0), len(list(nx.all_simple_paths(graph, node, "sink"))))
+
+    def test_disjoint_paths(self):
+        # r4 has two edge-disjoint paths to r1, which both pass through r3
+        graph = nx.DiGraph([("r1", "sink"), ("r2", "r1"), ("r5", "r1"), ("r3", "r2"), ("r3", "r5"), ("r4", "r3"),
+                            ("r4", "r6"), ("r6", "r3")])
+
+        edge_disjoint_paths = DisjointPaths(graph, "r1")
+        node_disjoint_paths = DisjointPaths(graph, "r1", node_disjoint=True)
+
+        self.assertEqual(edge_disjoint_paths.get("r4"), 2)
+        self.assertEqual(node_disjoint_paths.get("r4"), 1)
+        self.assertEqual(node_disjoint_paths.get("r3"), 2)
+        self.assertEqual(edge_disjoint_paths.get("r1"), 0)
+        self.assertEqual(edge_disjoint_paths.get("r7"), 0)
+
+    def test_disjoint_paths_same_as_networkx(self):
+        rand = random.Random(8006)
+        for _ in range(100):
+            graph = nx.gnp_random_graph(8, 0.35, seed=rand.randint(0, 10000), directed=True)
+            graph = nx.relabel_nodes(graph, {0: "sink"})
+            reaching_graph = nx.DiGraph(graph)
+            reaching_graph.remove_edges_from(list(graph.out_edges("sink")))
+
+            edge_disjoint_paths = DisjointPaths(graph)
+            node_disjoint_paths = DisjointPaths(graph, node_disjoint=True)
+            for node in graph.nodes():
+                if node == "sink" or not nx.has_path(reaching_graph, node, "sink"):
+                    continue
+
+                self.assertEqual(edge_disjoint_paths.get(node), nx.edge_connectivity(reaching_graph, node, "sink"))
+                if not reaching_graph.has_edge(node, "sink"):
+                    self.assertEqual(node_disjoint_paths.get(node),
+                                     len(list(nx.node_disjoint_paths(reaching_graph, node, "sink"))))
+
+
+if __name__ == "__main__":
+    unittest.main()
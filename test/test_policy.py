@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# Author: Ruediger Birkner (Networked Systems Group at ETH Zurich)
+
+import copy
+import pickle
+import unittest
+
+from ipaddress import IPv4Network
+
+from config2spec.policies.policy import PolicyDestination
+from config2spec.policies.policy import PolicySource
+
+
+class PolicyTest(unittest.TestCase):
+    def test_source_interning(self):
+        s1 = PolicySource("r1")
+        s2 = PolicySource("r1")
+        s3 = PolicySource("r2")
+
+        self.assertIs(s1, s2)
+        self.assertEqual(s1, s2)
+        self.assertNotEqual(s1, s3)
+        self.assertNotEqual(s1.id, s3.id)
+        self.assertIs(PolicySource.from_id(s3.id), s3)
+
+    def test_destination_interning(self):
+        d1 = PolicyDestination("r1", "Loopback0", IPv4Network("10.0.0.0/24"))
+        d2 = PolicyDestination("r1", "Loopback0", IPv4Network("10.0.0.0/24"))
+        d3 = PolicyDestination("r1", "Loopback1", IPv4Network("10.0.0.0/24"))
+
+        self.assertIs(d1, d2)
+        self.assertNotEqual(d1, d3)
+        self.assertEqual(len({d1, d2, d3}), 2)
+        self.assertIs(PolicyDestination.from_id(d1.id), d1)
+
+    def test_copy_and_pickle(self):
+        source = PolicySource("r1")
+        destination = PolicyDestination("r2", "Loopback0", IPv4Network("10.0.0.0/24"))
+
+        self.assertIs(copy.deepcopy(source), source)
+        self.assertIs(copy.copy(destination), destination)
+        self.assertIs(pickle.loads(pickle.dumps(source)), source)
+        self.assertIs(pickle.loads(pickle.dumps(destination)), destination)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,299 @@
+#!/usr/bin/env python
+# Author: Ruediger Birkner (Networked Systems Group at ETH Zurich)
+
+import csv
+import json
+import os
+import tempfile
+import unittest
+
+from ipaddress import IPv4Network
+
+import numpy as np
+
+from config2spec.policies.array_policy_db import ArrayPolicyDB
+from config2spec.policies.array_policy_db import SampleBitmap
+from config2spec.policies.policy import PolicyDestination
+from config2spec.policies.policy import PolicySource
+from config2spec.policies.policy import PolicyType
+from config2spec.policies.policy_db import PolicyDB
+from config2spec.policies.policy_db import PolicyStatus
+
+
+class PolicyDBTest(unittest.TestCase):
+    def setUp(self):
+        self.subnet1 = IPv4Network("10.0.1.0/24")
+        self.subnet2 = IPv4Network("10.0.2.0/24")
+
+        self.destination1 = PolicyDestination("r1", "FastEthernet0/0", self.subnet1)
+        self.destination2 = PolicyDestination("r2", "FastEthernet0/0", self.subnet2)
+
+        # all links up
+        self.sample1 = [
+            (PolicyType.Reachability, self.destination1, 0, PolicySource("r2")),
+            (PolicyType.Reachability, self.destination1, 0, PolicySource("r3")),
+            (PolicyType.Reachability, self.destination1, 0, PolicySource("r4")),
+            (PolicyType.Reachability, self.destination2, 0, PolicySource("r1")),
+            (PolicyType.Reachability, self.destination2, 0, PolicySource("r3")),
+            (PolicyType.Isolation, self.destination2, 0, PolicySource("r4")),
+            (PolicyType.Waypoint, self.destination1, "r2", PolicySource("r3")),
+            (PolicyType.Waypoint, self.destination1, "r2", PolicySource("r4")),
+            (PolicyType.LoadBalancingSimple, self.destination1, 2, PolicySource("r4")),
+        ]
+
+        # r4 lost its second path and r3 doesn't go through r2 anymore
+        self.sample2 = [
+            (PolicyType.Reachability, self.destination1, 0, PolicySource("r2")),
+            (PolicyType.Reachability, self.destination1, 0, PolicySource("r3")),
+            (PolicyType.Reachability, self.destination1, 0, PolicySource("r4")),
+            (PolicyType.Reachability, self.destination2, 0, PolicySource("r1")),
+            (PolicyType.Reachability, self.destination2, 0, PolicySource("r3")),
+            (PolicyType.Isolation, self.destination2, 0, PolicySource("r4")),
+            (PolicyType.Waypoint, self.destination1, "r2", PolicySource("r4")),
+            (PolicyType.Waypoint, self.destination1, "r3", PolicySource("r4")),
+        ]
+
+    def get_policy_dbs(self):
+        policy_dbs = [PolicyDB(None), ArrayPolicyDB(None)]
+        for policy_db in policy_dbs:
+            policy_db.update_policies2(self.sample1, 1)
+            policy_db.update_policies2(self.sample2, 2)
+        return policy_dbs
+
+    def test_update_policies(self):
+        for policy_db in [PolicyDB(None), ArrayPolicyDB(None)]:
+            change, size = policy_db.update_policies2(self.sample1, 1)
+            self.assertEqual(change, 1.0)
+            self.assertEqual(size, 9)
+
+            change, size = policy_db.update_policies2(self.sample2, 2)
+            self.assertAlmostEqual(change, 2.0/9.0)
+            self.assertEqual(size, 7)
+
+            self.assertEqual(policy_db.num_policies(), 10)
+            self.assertEqual(policy_db.num_policies(status=PolicyStatus.UNKNOWN), 7)
+            self.assertEqual(policy_db.num_policies(status=PolicyStatus.HOLDSNOT), 3)
+            self.assertEqual(policy_db.num_policies(status=PolicyStatus.HOLDS), 0)
+
+    def test_update_policies_growing(self):
+        # enough policies to exceed the initial capacity of the array based db multiple times
+        destinations = [PolicyDestination("r0", "FastEthernet0/0", IPv4Network("10.{}.{}.0/24".format(i // 256, i % 256)))
+                        for i in range(500)]
+        sources = [PolicySource("r{}".format(i)) for i in range(1, 6)]
+
+        samples = list()
+        for sample in range(4):
+            samples.append([(PolicyType.Reachability, destination, 0, source)
+                            for i, destination in enumerate(destinations) for source in sources
+                            if (i + sample) % 7 != 0])
+
+        for policy_db in [PolicyDB(None), ArrayPolicyDB(None)]:
+            sizes = [policy_db.update_policies2(policies, sample)[1] for sample, policies in enumerate(samples)]
+
+            self.assertEqual(policy_db.num_policies(), 2500)
+            self.assertEqual(sizes, [2140, 1785, 1430, 1075])
+            self.assertEqual(policy_db.num_policies(status=PolicyStatus.UNKNOWN), 1075)
+
+    def test_update_policy(self):
+        for policy_db in self.get_policy_dbs():
+            policy_db.update_policy(PolicyType.Reachability, self.subnet1, 0, PolicyStatus.HOLDS,
+                                    source=PolicySource("r3"))
+            policy_db.update_policy(PolicyType.Reachability, self.subnet2, 0, PolicyStatus.HOLDSNOT)
+
+            self.assertEqual(policy_db.num_policies(status=PolicyStatus.HOLDS), 1)
+            self.assertEqual(policy_db.num_policies(status=PolicyStatus.HOLDSNOT), 5)
+
+            policy_db.change_status(PolicyStatus.UNKNOWN, PolicyStatus.HOLDS)
+            self.assertEqual(policy_db.num_policies(status=PolicyStatus.UNKNOWN), 0)
+            self.assertEqual(policy_db.num_policies(status=PolicyStatus.HOLDS), 5)
+
+    def test_get_raw_policy_group(self):
+        raw_policies = [policy_db.get_raw_policy(status=PolicyStatus.UNKNOWN, group=True)
+                        for policy_db in self.get_policy_dbs()]
+
+        pandas_policy, array_policy = raw_policies
+        self.assertEqual(pandas_policy[0], array_policy[0])
+        self.assertCountEqual(pandas_policy[1], array_policy[1])
+        self.assertEqual(pandas_policy[2], array_policy[2])
+        self.assertEqual(pandas_policy[3], array_policy[3])
+
+    def test_get_raw_policy_queue(self):
+        all_groups = list()
+        for policy_db in self.get_policy_dbs():
+            groups = list()
+            while policy_db.num_policies(status=PolicyStatus.UNKNOWN) > 0:
+                raw_policy = policy_db.get_raw_policy(status=PolicyStatus.UNKNOWN, group=True)
+                policy_type, sources, destinations, specifics = raw_policy
+                subnet = list(destinations)[0].subnet
+                groups.append((policy_type, subnet, specifics, len(sources)))
+
+                # the first source is violated, all the others hold
+                policy_db.update_policy(policy_type, subnet, specifics, PolicyStatus.HOLDSNOT, source=sources[0])
+                for source in sources[1:]:
+                    policy_db.update_policy(policy_type, subnet, specifics, PolicyStatus.HOLDS, source=source)
+
+            self.assertEqual(policy_db.num_policies(status=PolicyStatus.HOLDS), 3)
+            all_groups.append(groups)
+
+        pandas_groups, array_groups = all_groups
+        self.assertCountEqual(pandas_groups, array_groups)
+        self.assertEqual(len(array_groups), 4)
+
+    def test_get_source_counts(self):
+        pandas_counts, array_counts = [policy_db.get_source_counts(status=PolicyStatus.UNKNOWN)
+                                       for policy_db in self.get_policy_dbs()]
+        self.assertEqual(pandas_counts, array_counts)
+
+    def test_get_source_counts_incremental(self):
+        policy_dbs = self.get_policy_dbs()
+        for policy_db in policy_dbs:
+            policy_db.create_checkpoint()
+            policy_db.update_policy(PolicyType.Reachability, self.subnet1, 0, PolicyStatus.HOLDS)
+            policy_db.update_policy(PolicyType.Waypoint, self.subnet1, "r2", PolicyStatus.HOLDSNOT,
+                                    source=PolicySource("r4"))
+
+        pandas_db, array_db = policy_dbs
+        for status in PolicyStatus:
+            self.assertEqual(array_db.get_source_counts(status=status), pandas_db.get_source_counts(status=status))
+        self.assertEqual(array_db.get_source_counts(status=PolicyStatus.UNKNOWN),
+                         {self.subnet2: {PolicySource("r1"): 1, PolicySource("r3"): 1, PolicySource("r4"): 1}})
+
+        # restoring a checkpoint changes the status of many policies at once
+        array_db.restore_checkpoint()
+        self.assertEqual(sum(len(counts) for counts in array_db.get_source_counts(status=PolicyStatus.HOLDS)), 0)
+        self.assertEqual(sum(sum(counts.values()) for counts in array_db.get_source_counts().values()), 10)
+
+    def test_trim_policies(self):
+        k_connected_pairs = {("r1", "r2"), ("r1", "r3"), ("r2", "r3")}
+
+        for policy_db in self.get_policy_dbs():
+            num_trimmed = policy_db.trim_policies(k_connected_pairs)
+
+            # r4 is not well connected to anybody, but the isolation policy is not affected by trimming
+            self.assertEqual(num_trimmed, 2)
+            self.assertEqual(policy_db.num_policies(status=PolicyStatus.UNKNOWN), 5)
+            self.assertEqual(policy_db.trim_counts, {PolicyType.Reachability: 1, PolicyType.Waypoint: 1})
+
+    def test_environments(self):
+        policy_db = ArrayPolicyDB(None)
+        for sample in range(100):
+            policy_db.update_policies2(self.sample1 if sample % 2 == 0 else self.sample2, sample)
+
+        reachability = (PolicyType.Reachability, self.subnet1, 0, PolicySource("r2"))
+        waypoint = (PolicyType.Waypoint, self.subnet1, "r2", PolicySource("r4"))
+        loadbalancing = (PolicyType.LoadBalancingSimple, self.subnet1, 2, PolicySource("r4"))
+
+        self.assertEqual(policy_db.num_environments(*reachability), 100)
+        self.assertEqual(policy_db.num_environments(*loadbalancing), 50)
+        self.assertCountEqual(policy_db.get_environments([waypoint, loadbalancing]), range(0, 100, 2))
+
+    def test_sample_bitmap(self):
+        bitmap = SampleBitmap()
+        bitmap.reserve(2, 0)
+
+        # samples at the bit and word boundaries
+        for sample in range(140):
+            rows = np.array([0, 1]) if sample in [0, 7, 8, 63, 64, 130] else np.array([0])
+            bitmap.add(rows, "s{}".format(sample))
+
+        self.assertEqual(bitmap.get_samples(np.array([1])), ["s0", "s7", "s8", "s63", "s64", "s130"])
+        self.assertEqual(len(bitmap.get_samples(np.array([0]))), 140)
+        self.assertEqual(bitmap.count(np.array([0, 1])).tolist(), [140, 6])
+
+    def test_checkpoint(self):
+        for policy_db in self.get_policy_dbs():
+            policy_db.create_checkpoint()
+            policy_db.change_status(PolicyStatus.UNKNOWN, PolicyStatus.HOLDS)
+            policy_db.restore_checkpoint()
+
+            self.assertEqual(policy_db.num_policies(status=PolicyStatus.UNKNOWN), 7)
+            self.assertEqual(policy_db.num_policies(status=PolicyStatus.HOLDS), 0)
+
+    def test_checkpoint_added_rows(self):
+        policy_db = self.get_policy_dbs()[1]
+        policy_db.create_checkpoint()
+
+        # a new policy shows up after the checkpoint
+        sample3 = self.sample2 + [(PolicyType.Reachability, self.destination2, 0, PolicySource("r5"))]
+        policy_db.update_policies2(sample3, 3)
+        policy_db.change_status(PolicyStatus.UNKNOWN, PolicyStatus.HOLDS)
+        policy_db.restore_checkpoint()
+
+        self.assertEqual(policy_db.num_policies(), 11)
+        self.assertEqual(policy_db.num_policies(status=PolicyStatus.UNKNOWN), 8)
+        self.assertEqual(policy_db.num_policies(status=PolicyStatus.HOLDSNOT), 3)
+        self.assertEqual(policy_db.num_policies(status=PolicyStatus.HOLDS), 0)
+
+    def test_save_load(self):
+        policy_db = ArrayPolicyDB(None)
+        policy_db.update_policies2(self.sample1, ("l1", ))
+        policy_db.update_policies2(self.sample2, ("l1", "l2"))
+        policy_db.update_policy(PolicyType.Reachability, self.subnet1, 0, PolicyStatus.HOLDS,
+                                source=PolicySource("r3"))
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = os.path.join(tmp_dir, "policy_db.npz")
+            policy_db.save(file_path)
+
+            restored_db = ArrayPolicyDB(None)
+            restored_db.load(file_path)
+
+        for status in PolicyStatus:
+            self.assertEqual(restored_db.num_policies(status=status), policy_db.num_policies(status=status))
+        self.assertCountEqual(restored_db.get_all_policies(), policy_db.get_all_policies())
+        self.assertEqual(restored_db.environments.get_all_samples(), [("l1", ), ("l1", "l2")])
+
+        # the restored db continues exactly like the original one
+        waypoint = (PolicyType.Waypoint, self.subnet1, "r2", PolicySource("r4"))
+        self.assertEqual(restored_db.num_environments(*waypoint), 2)
+        self.assertEqual(restored_db.update_policies2(self.sample1, ("l3", )),
+                         policy_db.update_policies2(self.sample1, ("l3", )))
+        self.assertEqual(restored_db.get_raw_policy(status=PolicyStatus.UNKNOWN, group=True),
+                         policy_db.get_raw_policy(status=PolicyStatus.UNKNOWN, group=True))
+
+    def test_export(self):
+        for policy_db in self.get_policy_dbs():
+            policy_db.update_policy(PolicyType.Reachability, self.subnet1, 0, PolicyStatus.HOLDS,
+                                    source=PolicySource("r3"))
+            policy_db.update_policy(PolicyType.Waypoint, self.subnet1, "r2", PolicyStatus.HOLDS,
+                                    source=PolicySource("r4"))
+
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                csv_path = os.path.join(tmp_dir, "spec.csv")
+                self.assertEqual(policy_db.export(csv_path, status=PolicyStatus.HOLDS, chunk_size=1), 2)
+                with open(csv_path) as infile:
+                    rows = list(csv.DictReader(infile))
+
+                jsonl_path = os.path.join(tmp_dir, "spec.jsonl")
+                self.assertEqual(policy_db.export(jsonl_path, policy_types=[PolicyType.Waypoint]), 3)
+                with open(jsonl_path) as infile:
+                    lines = [json.loads(line) for line in infile]
+
+            self.assertCountEqual([(row["type"], row["source"]) for row in rows],
+                                  [("Reachability", "r3"), ("Waypoint", "r4")])
+            self.assertTrue(all(row["status"] == "holds" for row in rows))
+
+            waypoint = [line for line in lines if line["status"] == "holds"][0]
+            self.assertEqual(waypoint["specifics"], "r2")
+            self.assertEqual(waypoint["destinations"], ["r1:FastEthernet0/0"])
+            self.assertEqual(waypoint["environments"], 2)
+            self.assertCountEqual([(line["specifics"], line["source"]) for line in lines],
+                                  [("r2", "r3"), ("r2", "r4"), ("r3", "r4")])
+
+    def test_disjoint_policies(self):
+        sample = self.sample1 + [
+            (PolicyType.LoadBalancingEdgeDisjoint, self.destination1, 2, PolicySource("r4")),
+            (PolicyType.LoadBalancingNodeDisjoint, self.destination1, 2, PolicySource("r4")),
+        ]
+
+        for policy_db in [PolicyDB(None, edge_disjoint=True, node_disjoint=True),
+                          ArrayPolicyDB(None, edge_disjoint=True, node_disjoint=True)]:
+            self.assertTrue(policy_db.policy_guesser.edge_disjoint)
+            self.assertTrue(policy_db.policy_guesser.node_disjoint)
+
+            policy_db.update_policies2(sample, 1)
+            self.assertEqual(policy_db.num_policies(), len(sample))
+
+
+if __name__ == "__main__":
+    unittest.main()
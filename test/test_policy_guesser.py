@@ -27,6 +27,24 @@ class DummyNetwork(object):
         return self.all_nodes
 
 
+class DummyForwardingGraphs(dict):
+    def get_fingerprint(self, subnet):
+        return id(self[subnet])
+
+
+class DummyDominatorGraphs(dict):
+    def __init__(self, *args):
+        super(DummyDominatorGraphs, self).__init__(*args)
+        self.lookups = list()
+
+    def __getitem__(self, subnet):
+        self.lookups.append(subnet)
+        return super(DummyDominatorGraphs, self).__getitem__(subnet)
+
+    def items(self):
+        return [(subnet, self[subnet]) for subnet in self]
+
+
 class PolicyGuessTest(unittest.TestCase):
     def get_simple_network(self, local=False):
         subnet = IPv4Network("10.0.0.0/24")
@@ -240,6 +258,79 @@ class PolicyGuessTest(unittest.TestCase):
 
         self.assertCountEqual(test_policies, correct_policies)
 
+    def test_get_loadbalancing_policies_disjoint(self):
+        network, fwd_graphs, dom_graphs, policy_destination, _ = self.get_disconnected_network()
+
+        # r4 forwards directly and over r2 to r1
+        correct_policies = [
+            (PolicyType.LoadBalancingEdgeDisjoint, policy_destination, 2, PolicySource("r4")),
+            (PolicyType.LoadBalancingNodeDisjoint, policy_destination, 2, PolicySource("r4")),
+        ]
+
+        test_policies = list()
+        pg = PolicyGuesser(network)
+        pg.get_loadbalancing_policies(test_policies, fwd_graphs, dom_graphs, simple=False, edge_disjoint=True,
+                                      node_disjoint=True, node_local_reachability=False)
+
+        self.assertCountEqual(test_policies, correct_policies)
+
+        # the two paths of r5 share the edge from r2 to r1
+        network, fwd_graphs, dom_graphs, policy_destination, _ = self.get_simple_network()
+        test_policies = list()
+        pg = PolicyGuesser(network)
+        pg.get_loadbalancing_policies(test_policies, fwd_graphs, dom_graphs, simple=False, edge_disjoint=True,
+                                      node_disjoint=True, node_local_reachability=False)
+
+        self.assertEqual(test_policies, list())
+
+    def test_get_loadbalancing_policies_edge_disjoint(self):
+        network, fwd_graphs, dom_graphs, policy_destination, _ = self.get_simple_network()
+        subnet = policy_destination.subnet
+
+        # r6 has two edge-disjoint paths to r1, but both pass through r3. r5 has two paths, which share its only
+        # next hop.
+        fwd_graph = nx.DiGraph([("r1", "sink"), ("r2", "r1"), ("r4", "r1"), ("r3", "r2"), ("r3", "r4"), ("r5", "r3"),
+                                ("r6", "r5"), ("r6", "r3")])
+        dom_graph = nx.DiGraph([("r1", "sink"), ("r2", "r1"), ("r4", "r1"), ("r3", "r1"), ("r5", "r3"), ("r6", "r3")])
+
+        correct_policies = [
+            (PolicyType.LoadBalancingEdgeDisjoint, policy_destination, 2, PolicySource("r3")),
+            (PolicyType.LoadBalancingEdgeDisjoint, policy_destination, 2, PolicySource("r6")),
+            (PolicyType.LoadBalancingNodeDisjoint, policy_destination, 2, PolicySource("r3")),
+        ]
+
+        test_policies = list()
+        pg = PolicyGuesser(network, edge_disjoint=True, node_disjoint=True)
+        pg.get_loadbalancing_policies(test_policies, {subnet: fwd_graph}, {subnet: dom_graph}, simple=False,
+                                      edge_disjoint=pg.edge_disjoint, node_disjoint=pg.node_disjoint)
+
+        self.assertCountEqual(test_policies, correct_policies)
+
+    def test_get_sources(self):
+        # r1 and r3 are both connected to the sink and r2 forwards to both of them
+        fwd_graph = nx.DiGraph([("r1", "sink"), ("r3", "sink"), ("r2", "r1"), ("r2", "r3"), ("r4", "r2"), ("r5", "r3"),
+                                ("r6", "r7"), ("r7", "r6")])
+
+        sources = PolicyGuesser.get_sources(fwd_graph)
+
+        self.assertCountEqual(sources.keys(), ["r1", "r3"])
+        self.assertCountEqual(sources["r1"], ["r1", "r2", "r4"])
+        self.assertCountEqual(sources["r3"], ["r3", "r2", "r4", "r5"])
+
+    def test_destination_index(self):
+        network, fwd_graphs, dom_graphs, policy_destination, _ = self.get_simple_network()
+        subnet = policy_destination.subnet
+
+        pg = PolicyGuesser(network)
+        all_destinations, destinations, dst_routers = pg.get_destination_interfaces_for_subnet(subnet, fwd_graphs)
+
+        self.assertEqual(all_destinations, {policy_destination})
+        self.assertEqual(dst_routers, {"r1"})
+        self.assertEqual(destinations, {node: [policy_destination] for node in ["r1", "r2", "r3", "r4", "r5", "r6"]})
+
+        # all policy types share the destinations of a subnet
+        self.assertIs(pg.get_destination_interfaces_for_subnet(subnet, fwd_graphs)[1], destinations)
+
     def test_get_waypoint_policies(self):
 
         network, fwd_graphs, dom_graphs, policy_destination, reachability_policies = self.get_disconnected_network()
@@ -255,6 +346,25 @@ class PolicyGuessTest(unittest.TestCase):
 
         self.assertCountEqual(test_policies, correct_policies)
 
+    def test_get_waypoint_policies_nested(self):
+        network, fwd_graphs, dom_graphs, policy_destination, _ = self.get_simple_network()
+
+        # r5 is dominated by both waypoints
+        correct_policies = [
+            (PolicyType.Waypoint, policy_destination, "r2", PolicySource("r2")),
+            (PolicyType.Waypoint, policy_destination, "r2", PolicySource("r4")),
+            (PolicyType.Waypoint, policy_destination, "r2", PolicySource("r5")),
+            (PolicyType.Waypoint, policy_destination, "r5", PolicySource("r5")),
+            (PolicyType.Waypoint, policy_destination, "r3", PolicySource("r3")),
+            (PolicyType.Waypoint, policy_destination, "r3", PolicySource("r6")),
+        ]
+
+        test_policies = list()
+        pg = PolicyGuesser(network, waypoints=["r2", "r3", "r5", "r7"])
+        pg.get_waypoint_policies(test_policies, fwd_graphs, dom_graphs, node_local_reachability=False)
+
+        self.assertCountEqual(test_policies, correct_policies)
+
     def test_get_waypoint_policies_simple(self):
         network, fwd_graphs, dom_graphs, policy_destination, _ = self.get_simple_network()
 
@@ -272,6 +382,64 @@ class PolicyGuessTest(unittest.TestCase):
 
         self.assertCountEqual(test_policies, correct_policies)
 
+    def test_get_policies_changed_subnets(self):
+        network, fwd_graphs, dom_graphs, policy_destination, _ = self.get_simple_network()
+        subnet = IPv4Network("10.0.0.0/24")
+
+        pg = PolicyGuesser(network)
+        policies = pg.get_policies(fwd_graphs, dom_graphs)
+
+        # the policies of unchanged subnets are taken over from the previous guess
+        removed_graph = dom_graphs[subnet].copy()
+        removed_graph.remove_node("r6")
+        self.assertCountEqual(pg.get_policies(fwd_graphs, {subnet: removed_graph}, changed_subnets=set()), policies)
+
+        # changed subnets are recomputed
+        changed_policies = pg.get_policies(fwd_graphs, {subnet: removed_graph}, changed_subnets={subnet})
+        self.assertIn((PolicyType.Isolation, policy_destination, 0, PolicySource("r6")), changed_policies)
+        self.assertNotIn((PolicyType.Reachability, policy_destination, 0, PolicySource("r6")), changed_policies)
+
+        # subnets without a forwarding graph are dropped
+        self.assertEqual(pg.get_policies(fwd_graphs, dict(), changed_subnets=set()), list())
+
+    def test_get_policies_changed_subnets_lookups(self):
+        network, fwd_graphs, dom_graphs, _, _ = self.get_simple_network()
+        subnet = IPv4Network("10.0.0.0/24")
+
+        pg = PolicyGuesser(network)
+        pg.get_policies(fwd_graphs, dom_graphs)
+
+        # the dominator graphs of unchanged subnets are never built
+        lazy_dom_graphs = DummyDominatorGraphs(dom_graphs)
+        pg.get_policies(fwd_graphs, lazy_dom_graphs, changed_subnets=set())
+        self.assertEqual(lazy_dom_graphs.lookups, list())
+
+        pg.get_policies(fwd_graphs, lazy_dom_graphs, changed_subnets={subnet})
+        self.assertEqual(lazy_dom_graphs.lookups, [subnet])
+
+    def test_get_policies_identical_graphs(self):
+        network, fwd_graphs, dom_graphs, policy_destination, _ = self.get_simple_network()
+        subnet1 = IPv4Network("10.0.0.0/24")
+        subnet2 = IPv4Network("10.0.1.0/24")
+
+        # a second subnet with the same forwarding graph behind the same router
+        dst_interface = Interface("FastEthernet0/1")
+        dst_interface.set_ip_address(next(subnet2.hosts()), subnet2)
+        network.interfaces[subnet2] = [("r1", dst_interface)]
+        fwd_graphs = DummyForwardingGraphs({subnet1: fwd_graphs[subnet1], subnet2: fwd_graphs[subnet1]})
+        dom_graphs = {subnet1: dom_graphs[subnet1], subnet2: dom_graphs[subnet1]}
+
+        pg = PolicyGuesser(network, waypoints=["r2"])
+        policies = pg.get_policies(fwd_graphs, dom_graphs)
+
+        policy_destination2 = PolicyDestination("r1", dst_interface, subnet2)
+        policies1 = [policy for policy in policies if policy[1] == policy_destination]
+        policies2 = [policy for policy in policies if policy[1] == policy_destination2]
+        self.assertEqual(len(policies1) + len(policies2), len(policies))
+        self.assertCountEqual([(policy[0], policy[2], policy[3]) for policy in policies1],
+                              [(policy[0], policy[2], policy[3]) for policy in policies2])
+        self.assertIn((PolicyType.LoadBalancingSimple, policy_destination2, 2, PolicySource("r5")), policies2)
+
 
 if __name__ == "__main__":
     unittest.main()